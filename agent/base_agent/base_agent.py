@@ -8,7 +8,7 @@ import json
 import os
 # Import project tools
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -84,6 +84,7 @@ class DeepSeekChatOpenAI(ChatOpenAI):
 from prompts.agent_prompt import STOP_SIGNAL, get_agent_system_prompt
 from tools.general_tools import (extract_conversation, extract_tool_messages,
                                  get_config_value, write_config_value)
+from tools.index_constituents import static_universe
 from tools.price_tools import add_no_trade_record
 
 # Load environment variables
@@ -257,6 +258,8 @@ class BaseAgent:
                 self.stock_symbols = self.DEFAULT_STOCK_SYMBOLS
         else:
             self.stock_symbols = stock_symbols
+        # Default index universe: use the point-in-time members of each trading day
+        self.track_index_universe = stock_symbols is None or list(stock_symbols) == static_universe(market)
 
         self.max_steps = max_steps
         self.max_retries = max_retries
@@ -413,7 +416,9 @@ class BaseAgent:
         self.agent = create_agent(
             self.model,
             tools=self.tools,
-            system_prompt=get_agent_system_prompt(today_date, self.signature, self.market, self.stock_symbols),
+            system_prompt=get_agent_system_prompt(
+                today_date, self.signature, self.market, None if self.track_index_universe else self.stock_symbols
+            ),
         )
 
         # Initial user query
@@ -520,7 +525,7 @@ class BaseAgent:
         Returns:
             List of trading dates (excluding weekends and holidays)
         """
-        from tools.price_tools import is_trading_day
+        from tools.price_tools import get_trading_calendar
 
         dates = []
         max_date = None
@@ -549,16 +554,9 @@ class BaseAgent:
         if end_date_obj <= max_date_obj:
             return []
 
-        # Generate trading date list, filtered by actual trading days
-        trading_dates = []
-        current_date = max_date_obj + timedelta(days=1)
-
-        while current_date <= end_date_obj:
-            date_str = current_date.strftime("%Y-%m-%d")
-            # Check if this is an actual trading day in merged.jsonl
-            if is_trading_day(date_str, market=self.market):
-                trading_dates.append(date_str)
-            current_date += timedelta(days=1)
+        # Trading days after max_date up to end_date, looked up in the calendar built from merged.jsonl
+        calendar = get_trading_calendar(market=self.market)
+        trading_dates = calendar.range(max_date, end_date, include_start=False)
 
         return trading_dates
 
@@ -621,20 +619,22 @@ class BaseAgent:
         if not os.path.exists(self.position_file):
             return {"error": "Position file does not exist"}
 
-        positions = []
-        with open(self.position_file, "r") as f:
-            for line in f:
-                positions.append(json.loads(line))
+        from tools.position_ledger import get_position_ledger
 
-        if not positions:
+        # 通过 PositionLedger 读取，增量记录（POSITION_FORMAT_VERSION=2）也能还原完整持仓
+        ledger = get_position_ledger(self.signature)
+        dates = ledger.dates() if ledger.refresh() else []
+        if not dates:
             return {"error": "No position records"}
 
-        latest_position = positions[-1]
+        positions, _ = ledger.latest_position("9999-12-31")
+        with open(self.position_file, "rb") as f:
+            total_records = sum(1 for line in f if line.strip())
         return {
             "signature": self.signature,
-            "latest_date": latest_position.get("date"),
-            "positions": latest_position.get("positions", {}),
-            "total_records": len(positions),
+            "latest_date": dates[-1],
+            "positions": positions,
+            "total_records": total_records,
         }
 
     def __str__(self) -> str:
@@ -8,7 +8,6 @@ import json
 import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
-from pathlib import Path
 
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_openai import ChatOpenAI
@@ -135,33 +134,14 @@ class BaseAgent_Hour(BaseAgent):
         else:
             raise ValueError("Only support hour-level trading. Please use YYYY-MM-DD HH:MM:SS format.")
         
-        # Get merged.jsonl path
-        base_dir = Path(__file__).resolve().parents[2]
-        merged_file = base_dir / "data" / "merged.jsonl"
-        
-        if not merged_file.exists():
-            return []
-        
-        # Collect all timestamps from merged.jsonl
-        all_timestamps = set()
-        
-        with merged_file.open("r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                try:
-                    doc = json.loads(line)
-                    # 查找所有以 "Time Series" 开头的键
-                    for key, value in doc.items():
-                        if key.startswith("Time Series"):
-                            if isinstance(value, dict):
-                                all_timestamps.update(value.keys())
-                            break
-                except Exception:
-                    continue
-        
-        if not all_timestamps:
+        from tools.price_tools import get_trading_calendar
+
+        # Hour-level trading timestamps, looked up in the calendar built from merged.jsonl
+        calendar = get_trading_calendar(market=self.market, resolution="intraday")
+
+        if not calendar:
             return []
+
         # Determine min_datetime based on init_date and last processed date in position file
         min_datetime = init_dt
         
@@ -205,34 +185,10 @@ class BaseAgent_Hour(BaseAgent):
             if not has_time:
                 last_processed_dt = last_processed_dt.date()
         
-        # Filter timestamps within the range
-        trading_times = []
-        if not has_time:
-            min_datetime = min_datetime.date()
-            end_dt = end_dt.date()
-    
-        for ts_str in all_timestamps:
-            try:
-                if has_time:
-                    ts_dt = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-                else:
-                    ts_dt = datetime.strptime(ts_str, "%Y-%m-%d").date()
-                # Check if timestamp is in range with boundary rules
-                in_lower = False
-                if last_processed_dt is None:
-                    in_lower = ts_dt >= min_datetime
-                else:
-                    in_lower = ts_dt > min_datetime
-                if in_lower and ts_dt <= end_dt:
-                    trading_times.append(ts_str)
-                    
-            except Exception as e:
-                print(f"❌ Error processing timestamp: {ts_str}")
-                print(e)
-                continue
-        
-        # Sort and remove duplicates
-        trading_times = sorted(list(set(trading_times)))
+        # Filter timestamps within the range: strictly after the last processed time if any
+        lower = min_datetime.strftime("%Y-%m-%d %H:%M:%S")
+        upper = end_dt.strftime("%Y-%m-%d %H:%M:%S")
+        trading_times = calendar.range(lower, upper, include_start=last_processed_dt is None)
         if REGISTER:
             print("REGISTER date will not be considered")
             trading_times = trading_times[1:]
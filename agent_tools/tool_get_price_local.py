@@ -1,9 +1,10 @@
 import json
 import os
 import sys
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from fastmcp import FastMCP
@@ -21,6 +22,23 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from tools.general_tools import get_config_value
+from tools.merged_index import lookup_symbol_doc
+from tools.merged_schema import IDENTITY_FIELD_KEYS, doc_symbol, series_for
+from tools.price_sqlite import get_sqlite_db
+from tools.price_store import BAR_FIELDS, get_price_store
+from tools.resample import bucket_labeler, get_resampled_cube
+from tools.symbol_registry import market_for_symbol
+
+PRICE_FIELDS = list(BAR_FIELDS.values())
+DEFAULT_HISTORY_MAX_ROWS = 500
+
+
+def _history_max_rows() -> int:
+    """Row cap for get_price_history, configurable through PRICE_HISTORY_MAX_ROWS."""
+    try:
+        return max(1, int(get_config_value("PRICE_HISTORY_MAX_ROWS", DEFAULT_HISTORY_MAX_ROWS)))
+    except (TypeError, ValueError):
+        return DEFAULT_HISTORY_MAX_ROWS
 
 
 def _workspace_data_path(filename: str, symbol: Optional[str] = None) -> Path:
@@ -37,7 +55,7 @@ def _workspace_data_path(filename: str, symbol: Optional[str] = None) -> Path:
     base_dir = Path(__file__).resolve().parents[1]
 
     # Auto-detect market type from symbol
-    if symbol and (symbol.endswith(".SH") or symbol.endswith(".SZ")):
+    if symbol and market_for_symbol(symbol) == "cn":
         # Chinese A-shares
         return base_dir / "data" / "A_stock" / filename
     else:
@@ -45,6 +63,142 @@ def _workspace_data_path(filename: str, symbol: Optional[str] = None) -> Path:
         return base_dir / "data" / filename
 
 
+def _load_symbol_doc(data_path: Path, symbol: str) -> Optional[Dict[str, Any]]:
+    """Load the merged.jsonl line for one symbol.
+
+    Seeks straight to the line through the merged.idx sidecar; falls back to a
+    line-by-line scan when the index is missing or stale.
+
+    Returns:
+        Parsed JSON object for the symbol, or None if the symbol is not in the file
+    """
+    index_used, doc = lookup_symbol_doc(data_path, symbol)
+    if index_used:
+        return doc
+
+    with data_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            doc = json.loads(line)
+            if doc_symbol(doc) == symbol:
+                return doc
+    return None
+
+
+def _load_day(
+    data_path: Path, symbol: str, date: str, resolution: str
+) -> Tuple[Optional[str], Optional[Dict[str, Any]], Dict[str, str]]:
+    """Load one bar from merged.sqlite (PRICE_BACKEND=sqlite) or merged.jsonl.
+
+    Args:
+        data_path: Path to merged.jsonl
+        symbol: Stock symbol
+        date: Bar timestamp
+        resolution: "daily" or "60min"
+
+    Returns:
+        (error, bar, field_keys): error is None on success; field_keys maps
+        "open"/"high"/"low"/"close"/"volume" to the keys used inside bar
+    """
+    db = get_sqlite_db(data_path)
+    if db is not None:
+        if not db.has_symbol(symbol):
+            return f"No records found for stock {symbol} in local data", None, {}
+        day = db.get_bar(symbol, date)
+        keys = IDENTITY_FIELD_KEYS
+        sample_dates = db.latest_timestamps(symbol, 5) if day is None else []
+    else:
+        if not data_path.exists():
+            return f"Data file not found: {data_path}", None, {}
+        doc = _load_symbol_doc(data_path, symbol)
+        if doc is None:
+            return f"No records found for stock {symbol} in local data", None, {}
+        series, keys = series_for(doc, resolution)
+        day = series.get(date)
+        sample_dates = sorted(series.keys(), reverse=True)[:5] if day is None else []
+
+    if day is None:
+        return (
+            f"Data not found for date {date}. Please verify the date exists in data. Sample available dates: {sample_dates}",
+            None,
+            keys,
+        )
+    return None, day, keys
+
+
+def _resampled_bars(
+    data_path: Path, symbol: str, interval: str, before: Optional[str] = None
+) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+    """Resample one symbol's bars in data_path to interval.
+
+    Returns:
+        (labels, {field: list of values aligned with labels}), or ([], None) when
+        symbol is not in the file
+    """
+    store = get_price_store(data_path)
+    if not store.refresh() or symbol not in store.bars:
+        return [], None
+    cube = get_resampled_cube(market_for_symbol(symbol), interval, before=before, merged_path=str(data_path))
+    row = cube.symbol_index.get(symbol)
+    if row is None:
+        return [], None
+    return cube.timestamps, {field: cube.field(field)[row].tolist() for field in PRICE_FIELDS}
+
+
+def _resampled_window(
+    data_path: Path,
+    symbol: str,
+    interval: str,
+    before: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    include_end: bool,
+    limit: int,
+) -> List[Tuple[str, Dict[str, float]]]:
+    """Resampled counterpart of PriceStore.bars_between(); bucket labels are compared with start/end."""
+    labels, values = _resampled_bars(data_path, symbol, interval, before)
+    if values is None:
+        return []
+    lo = bisect_left(labels, start) if start is not None else 0
+    hi = len(labels)
+    if end is not None:
+        hi = bisect_right(labels, end) if include_end else bisect_left(labels, end)
+    window = []
+    for col in range(lo, hi):
+        bar = {field: values[field][col] for field in PRICE_FIELDS if values[field][col] == values[field][col]}
+        if bar:
+            window.append((labels[col], bar))
+    return window[-limit:]
+
+
+def _resampled_daily_bar(
+    data_path: Path, symbol: str, date: str, before: Optional[str] = None
+) -> Optional[Dict[str, float]]:
+    """Daily bar for date aggregated from the 60-minute bars strictly before `before`, or None.
+
+    On the day of `before` the bar only covers the earlier hours; when none of
+    them is earlier (daily TODAY_DATE, or the day's first bar), only the day's
+    open is returned.
+    """
+    labels, values = _resampled_bars(data_path, symbol, "1d", before)
+    if values is not None and date in labels:
+        col = labels.index(date)
+        bar = {field: values[field][col] for field in PRICE_FIELDS if values[field][col] == values[field][col]}
+        if "volume" in bar:
+            bar["volume"] = int(bar["volume"])
+        if bar:
+            return bar
+    if before is not None and before[:10] == date:
+        # 当天还没有完整的 bar：开盘价就是第一根 bar 的开盘价，此时已知
+        labels, values = _resampled_bars(data_path, symbol, "1d")
+        if values is not None and date in labels:
+            open_price = values["open"][labels.index(date)]
+            if open_price == open_price:
+                return {"open": open_price}
+    return None
+
+
 def _validate_date_daily(date_str: str) -> None:
     try:
         datetime.strptime(date_str, "%Y-%m-%d")
@@ -112,53 +266,39 @@ def get_price_local_daily(symbol: str, date: str) -> Dict[str, Any]:
         return {"error": str(e), "symbol": symbol, "date": date}
 
     data_path = _workspace_data_path(filename, symbol)
-    if not data_path.exists():
-        return {"error": f"Data file not found: {data_path}", "symbol": symbol, "date": date}
-
-    with data_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            doc = json.loads(line)
-            meta = doc.get("Meta Data", {})
-            if meta.get("2. Symbol") != symbol:
-                continue
-            series = doc.get("Time Series (Daily)", {})
-            day = series.get(date)
-            if day is None:
-                sample_dates = sorted(series.keys(), reverse=True)[:5]
-                return {
-                    "error": f"Data not found for date {date}. Please verify the date exists in data. Sample available dates: {sample_dates}",
-                    "symbol": symbol,
-                    "date": date,
-                }
-            if date == get_config_value("TODAY_DATE"):
-                return {
-                    "symbol": symbol,
-                    "date": date,
-                    "ohlcv": {
-                        "open": day.get("1. buy price"),
-                        "high": "You can not get the current high price",
-                        "low": "You can not get the current low price", 
-                        "close": "You can not get the next close price",
-                        "volume": "You can not get the current volume",
-                    },
-                }
-            else:
-                return {
-                    "symbol": symbol,
-                    "date": date,
-                    "ohlcv": {
-                        "open": day.get("1. buy price"),
-                        "high": day.get("2. high"),
-                        "low": day.get("3. low"), 
-                        "close": day.get("4. sell price"),
-                        "volume": day.get("5. volume"),
-                    },
-                }
-
-
-    return {"error": f"No records found for stock {symbol} in local data", "symbol": symbol, "date": date}
+    today_date = get_config_value("TODAY_DATE") or ""
+    error, day, keys = _load_day(data_path, symbol, date, "daily")
+    if error is not None:
+        # 只有小时级数据时，由当前时刻之前的 60 分钟 bar 聚合出日线
+        day = _resampled_daily_bar(data_path, symbol, date, before=today_date or None)
+        if day is None:
+            return {"error": error, "symbol": symbol, "date": date}
+        keys = IDENTITY_FIELD_KEYS
+    # 小时级运行时 TODAY_DATE 带时间，按日期部分判断是否为当天
+    if date == today_date[:10]:
+        return {
+            "symbol": symbol,
+            "date": date,
+            "ohlcv": {
+                "open": day.get(keys["open"]),
+                "high": "You can not get the current high price",
+                "low": "You can not get the current low price", 
+                "close": "You can not get the next close price",
+                "volume": "You can not get the current volume",
+            },
+        }
+    else:
+        return {
+            "symbol": symbol,
+            "date": date,
+            "ohlcv": {
+                "open": day.get(keys["open"]),
+                "high": day.get(keys["high"]),
+                "low": day.get(keys["low"]), 
+                "close": day.get(keys["close"]),
+                "volume": day.get(keys["volume"]),
+            },
+        }
 
 
 def get_price_local_hourly(symbol: str, date: str) -> Dict[str, Any]:
@@ -178,52 +318,302 @@ def get_price_local_hourly(symbol: str, date: str) -> Dict[str, Any]:
         return {"error": str(e), "symbol": symbol, "date": date}
 
     data_path = _workspace_data_path(filename)
-    if not data_path.exists():
-        return {"error": f"Data file not found: {data_path}", "symbol": symbol, "date": date}
+    error, day, keys = _load_day(data_path, symbol, date, "60min")
+    if error is not None:
+        return {"error": error, "symbol": symbol, "date": date}
+    if date == get_config_value("TODAY_DATE"):
+        return {
+            "symbol": symbol,
+            "date": date,
+            "ohlcv": {
+                "open": day.get(keys["open"]),
+                "high": "You can not get the current high price",
+                "low": "You can not get the current low price", 
+                "close": "You can not get the next close price",
+                "volume": "You can not get the current volume",
+            },
+        }
+    else:
+        return {
+            "symbol": symbol,
+            "date": date,
+            "ohlcv": {
+                "open": day.get(keys["open"]),
+                "high": day.get(keys["high"]),
+                "low": day.get(keys["low"]), 
+                "close": day.get(keys["close"]),
+                "volume": day.get(keys["volume"]),
+            },
+        }
 
-    with data_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            doc = json.loads(line)
-            meta = doc.get("Meta Data", {})
-            if meta.get("2. Symbol") != symbol:
+
+
+@mcp.tool()
+def get_prices_batch(symbols: List[str], date: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Read OHLCV data for many stocks on one date in a single call.
+
+    Prefer this over calling get_price_local once per symbol.
+
+    Args:
+        symbols: Stock symbols, e.g. ['AAPL', 'MSFT'] or ['600519.SH', '601318.SH'].
+        date: Date in 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' format. Based on your current time format.
+        fields: Subset of ['open', 'high', 'low', 'close', 'volume']; all fields if omitted.
+
+    Returns:
+        Compact table: {"date", "columns", "rows": [[symbol, value, ...], ...], "missing": [symbols without data]}.
+        For the current date only "open" is available; other fields are null.
+    """
+    try:
+        if ' ' in date:
+            _validate_date_hourly(date)
+        else:
+            _validate_date_daily(date)
+    except ValueError as e:
+        return {"error": str(e), "date": date}
+
+    fields = list(fields) if fields else PRICE_FIELDS
+    unknown = [f for f in fields if f not in PRICE_FIELDS]
+    if unknown:
+        return {"error": f"Unknown fields {unknown}. Valid fields: {PRICE_FIELDS}", "date": date}
+
+    today_date = get_config_value("TODAY_DATE") or ""
+    # 日线查询只和 TODAY_DATE 的日期部分比较（小时级运行时 TODAY_DATE 带时间）
+    current = today_date if ' ' in date else today_date[:10]
+    if today_date and date > current:
+        return {"error": f"Cannot query {date}: it is after the current date {today_date}.", "date": date}
+    is_today = date == current
+
+    rows = []
+    missing = []
+    for symbol in dict.fromkeys(symbols):
+        data_path = _workspace_data_path("merged.jsonl", symbol)
+        store = get_price_store(data_path)
+        bar = store.get_bar(symbol, date) if store.refresh() else None
+        if bar is None and ' ' not in date:
+            # 与 get_price_local 一致：只有小时级数据时，由当前时刻之前的 60 分钟 bar 聚合出日线
+            bar = _resampled_daily_bar(data_path, symbol, date, before=today_date or None)
+        if bar is None:
+            missing.append(symbol)
+            continue
+        row = [symbol]
+        for field in fields:
+            value = bar.get(field)
+            if is_today and field != "open":
+                value = None
+            elif field == "volume" and value is not None:
+                value = int(value)
+            row.append(value)
+        rows.append(row)
+
+    result = {"date": date, "columns": ["symbol"] + fields, "rows": rows, "missing": missing}
+    if is_today:
+        result["note"] = "Only the open price is available for the current date."
+    return result
+
+
+@mcp.tool()
+def get_price_history(
+    symbols: List[str],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    last_n: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    interval: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Read historical OHLCV bars for one or more stocks in a single call.
+
+    Either give a window (start_date and/or end_date) or last_n to get the latest N bars.
+    Only bars strictly before the current date are returned; use get_price_local for today's open price.
+    Set interval to aggregate hourly bars into coarser bars, labelled by the start of each bucket;
+    the current bucket only contains bars before the current date.
+
+    Args:
+        symbols: Stock symbols, e.g. ['AAPL'] or ['600519.SH', '601318.SH'].
+        start_date: Inclusive start, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'.
+        end_date: Inclusive end, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'. Defaults to the current date.
+        last_n: Return only the latest N bars of the window for each symbol.
+        fields: Subset of ['open', 'high', 'low', 'close', 'volume']; all fields if omitted.
+        interval: Optional bar size for hourly data: 'Nh' (e.g. '2h', '4h'), '1d' or '1w'.
+
+    Returns:
+        {"columns": ["date", ...fields], "history": {symbol: [[date, value, ...], ...]}, "missing": [...]}.
+        Total rows are capped; "truncated" is true when older bars were dropped to fit the cap, and
+        symbols beyond the cap are listed in "omitted_symbols".
+    """
+    try:
+        for value in (start_date, end_date):
+            if value is None:
                 continue
-            series = doc.get("Time Series (60min)", {})
-            day = series.get(date)
-            if day is None:
-                sample_dates = sorted(series.keys(), reverse=True)[:5]
-                return {
-                    "error": f"Data not found for date {date}. Please verify the date exists in data. Sample available dates: {sample_dates}",
-                    "symbol": symbol,
-                    "date": date
-                }
-            if date == get_config_value("TODAY_DATE"):
-                return {
-                    "symbol": symbol,
-                    "date": date,
-                    "ohlcv": {
-                        "open": day.get("1. buy price"),
-                        "high": "You can not get the current high price",
-                        "low": "You can not get the current low price", 
-                        "close": "You can not get the next close price",
-                        "volume": "You can not get the current volume",
-                    },
-                }
+            if ' ' in value:
+                _validate_date_hourly(value)
             else:
-                return {
-                    "symbol": symbol,
-                    "date": date,
-                    "ohlcv": {
-                        "open": day.get("1. buy price"),
-                        "high": day.get("2. high"),
-                        "low": day.get("3. low"), 
-                        "close": day.get("4. sell price"),
-                        "volume": day.get("5. volume"),
-                    },
-                }
+                _validate_date_daily(value)
+    except ValueError as e:
+        return {"error": str(e), "start_date": start_date, "end_date": end_date}
+
+    fields = list(fields) if fields else PRICE_FIELDS
+    unknown = [f for f in fields if f not in PRICE_FIELDS]
+    if unknown:
+        return {"error": f"Unknown fields {unknown}. Valid fields: {PRICE_FIELDS}"}
+    if last_n is not None and last_n <= 0:
+        return {"error": "last_n must be a positive integer"}
+    if start_date is None and last_n is None:
+        return {"error": "Provide start_date or last_n"}
+    if interval is not None:
+        try:
+            bucket_labeler(interval)
+        except ValueError as e:
+            return {"error": str(e)}
+
+    # 日期参数只到天时，窗口包含这一天的全部小时级 bar
+    upper = end_date
+    if upper is not None and ' ' not in upper:
+        upper = f"{upper} 23:59:59"
+    today_date = get_config_value("TODAY_DATE")
+    include_end = True
+    if today_date and (upper is None or upper >= today_date):
+        # 不允许看到当前及未来的数据
+        upper = today_date
+        include_end = False
+
+    symbols = list(dict.fromkeys(symbols))
+    max_rows = _history_max_rows()
+    # 每个 symbol 至少一行：symbol 数超过行数上限时只处理前 max_rows 个
+    omitted = symbols[max_rows:]
+    symbols = symbols[:max_rows]
+    per_symbol = max(1, max_rows // max(1, len(symbols)))
+    limit = per_symbol if last_n is None else min(last_n, per_symbol)
+
+    history: Dict[str, List[List[Any]]] = {}
+    missing = []
+    truncated = bool(omitted)
+    for symbol in symbols:
+        data_path = _workspace_data_path("merged.jsonl", symbol)
+        store = get_price_store(data_path)
+        if not store.refresh() or symbol not in store.bars:
+            missing.append(symbol)
+            continue
+        if interval is None:
+            window = store.bars_between(symbol, start_date, upper, include_end=include_end, limit=limit + 1)
+        else:
+            window = _resampled_window(data_path, symbol, interval, today_date, start_date, upper, include_end, limit + 1)
+        if len(window) > limit:
+            window = window[1:]
+            truncated = truncated or last_n is None or last_n > per_symbol
+        rows = []
+        for ts, bar in window:
+            row = [ts]
+            for field in fields:
+                value = bar.get(field)
+                if field == "volume" and value is not None:
+                    value = int(value)
+                row.append(value)
+            rows.append(row)
+        history[symbol] = rows
+
+    result = {"columns": ["date"] + fields, "history": history, "missing": missing}
+    if truncated:
+        result["truncated"] = True
+        result["note"] = f"Row cap {max_rows} reached; only the latest {limit} bars per symbol are returned."
+    if omitted:
+        result["omitted_symbols"] = omitted
+        result["note"] += f" Only the first {max_rows} symbols are returned; request the omitted ones separately."
+    return result
 
-    return {"error": f"No records found for stock {symbol} in local data", "symbol": symbol, "date": date}
+
+@mcp.tool()
+def get_indicators(
+    indicator: str,
+    symbols: Optional[List[str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Compute a technical indicator for many stocks at once, using bars before the current date.
+
+    Indicators and default params:
+    - sma: {"window": 20}
+    - ema: {"span": 20}
+    - rsi: {"window": 14}
+    - macd: {"fast": 12, "slow": 26, "signal": 9} (returns macd, signal, hist)
+    - atr: {"window": 14}
+    - realized_vol: {"window": 20, "annualize": true}
+
+    Args:
+        indicator: Indicator name from the list above.
+        symbols: Stock symbols, e.g. ['AAPL', 'MSFT']. All stocks of the current market if omitted.
+        params: Optional overrides of the default params.
+
+    Returns:
+        {"indicator", "params", "as_of_bar": last bar used, "columns": ["symbol", ...], "rows": [...], "missing": [...]}.
+    """
+    from tools.indicators import get_indicator_snapshot, indicator_table
+    from tools.price_tools import get_market_type
+
+    if symbols and all(market_for_symbol(s) == "cn" for s in symbols):
+        market = "cn"
+    elif symbols:
+        market = "us"
+    else:
+        market = get_market_type()
+
+    try:
+        snapshot = get_indicator_snapshot(market, indicator, params, as_of=get_config_value("TODAY_DATE"))
+    except (ValueError, FileNotFoundError) as e:
+        return {"error": str(e), "indicator": indicator}
+
+    result = {"indicator": indicator, "params": params or {}, "as_of_bar": snapshot["as_of_bar"]}
+    result.update(indicator_table(snapshot, symbols))
+    return result
+
+
+@mcp.tool()
+def screen_universe(
+    date: str,
+    metric: str,
+    top_n: int = 10,
+    lookback: int = 5,
+    ascending: bool = False,
+    filters: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """Rank all stocks of the current market by a metric and return the top N.
+
+    Metrics (lookback is in bars: days for daily data, hours for hourly data):
+    - return: close-to-close return over the last `lookback` bars
+    - gap: current open vs. previous close
+    - volume_spike: last bar volume / average volume of the `lookback` bars before it
+    - dist_from_high: last close vs. highest high of the last `lookback` bars (<= 0)
+    - dist_from_low: last close vs. lowest low of the last `lookback` bars (>= 0)
+
+    Args:
+        date: Current date, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'.
+        metric: Metric name from the list above.
+        top_n: Number of stocks to return.
+        lookback: Window length in bars.
+        ascending: If true, rank smallest values first (e.g. biggest losers).
+        filters: Optional {"min_price": float, "max_price": float, "min_volume": float} on the last completed bar.
+
+    Returns:
+        {"date", "metric", "as_of_bar", "columns": ["symbol", metric, "last_close"], "rows": [...], "universe_size"}.
+    """
+    from tools.price_tools import get_market_type
+    from tools.screener import screen_universe as _screen_universe
+
+    try:
+        if ' ' in date:
+            _validate_date_hourly(date)
+        else:
+            _validate_date_daily(date)
+    except ValueError as e:
+        return {"error": str(e), "date": date}
+
+    today_date = get_config_value("TODAY_DATE")
+    if today_date and date > today_date:
+        return {"error": f"Cannot screen {date}: it is after the current date {today_date}.", "date": date}
+
+    try:
+        result = _screen_universe(get_market_type(), date, metric, top_n, lookback, ascending, filters)
+    except (ValueError, FileNotFoundError) as e:
+        return {"error": str(e), "date": date, "metric": metric}
+    return {"date": date, "metric": metric, **result}
 
 
 def get_price_local_function(symbol: str, date: str, filename: str = "merged.jsonl") -> Dict[str, Any]:
@@ -1,44 +1,32 @@
 import os
 import sys
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastmcp import FastMCP
 
 from typing import Dict, List, Optional, Any
-import fcntl
-from pathlib import Path
 # Add project root directory to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 import json
 
+import numpy as np
+
 from tools.general_tools import get_config_value, write_config_value
+from tools.position_ledger import get_position_ledger, get_position_lock
 from tools.price_tools import (get_latest_position, get_open_prices,
                                get_yesterday_date,
                                get_yesterday_open_and_close_price,
                                get_yesterday_profit)
+from tools.symbol_registry import lot_size_for_symbol, market_for_symbol
 
 mcp = FastMCP("TradeTools")
 
-def _position_lock(signature: str):
-    """Context manager for file-based lock to serialize position updates per signature."""
-    class _Lock:
-        def __init__(self, name: str):
-            base_dir = Path(project_root) / "data" / "agent_data" / name
-            base_dir.mkdir(parents=True, exist_ok=True)
-            self.lock_path = base_dir / ".position.lock"
-            # Ensure lock file exists
-            self._fh = open(self.lock_path, "a+")
-        def __enter__(self):
-            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
-            return self
-        def __exit__(self, exc_type, exc, tb):
-            try:
-                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
-            finally:
-                self._fh.close()
-    return _Lock(signature)
 
+def _order_error(result: Dict[str, Any], today_date: str) -> Dict[str, Any]:
+    """Turn a rejected _execute_orders() result into the {"error": ..., "symbol", "date"} dict of buy()/sell()."""
+    details = {key: value for key, value in result.items() if key not in ("error", "action", "status")}
+    return {"error": result["error"], **details, "date": today_date}
 
 
 @mcp.tool()
@@ -81,136 +69,66 @@ def buy(symbol: str, amount: int) -> Dict[str, Any]:
     # Get current trading date from environment variable
     today_date = get_config_value("TODAY_DATE")
 
-    # Auto-detect market type based on symbol format
-    market = "cn" if symbol.endswith((".SH", ".SZ")) else "us"
-
-    # 🇨🇳 Chinese A-shares trading rule: Must trade in lots of 100 shares (一手 = 100股)
-    if market == "cn" and amount % 100 != 0:
-        return {
-            "error": f"Chinese A-shares must be traded in multiples of 100 shares (1 lot = 100 shares). You tried to buy {amount} shares.",
-            "symbol": symbol,
-            "amount": amount,
-            "date": today_date,
-            "suggestion": f"Please use {(amount // 100) * 100} or {((amount // 100) + 1) * 100} shares instead.",
-        }
-
-    # Step 2: Get current latest position and operation ID
-    # get_latest_position returns two values: position dictionary and current maximum operation ID
-    # This ID is used to ensure each operation has a unique identifier
-    # Acquire lock for atomic read-modify-write on positions
-    with _position_lock(signature):
-        try:
-            current_position, current_action_id = get_latest_position(today_date, signature)
-        except Exception as e:
-            print(e)
-            print(today_date, signature)
-            return {"error": f"Failed to load latest position: {e}", "symbol": symbol, "date": today_date}
-    # Step 3: Get stock opening price for the day
-    # Use get_open_prices function to get the opening price of specified stock for the day
-    # If stock symbol does not exist or price data is missing, KeyError exception will be raised
-    try:
-        this_symbol_price = get_open_prices(today_date, [symbol], market=market)[f"{symbol}_price"]
-    except KeyError:
-        # Stock symbol does not exist or price data is missing, return error message
-        return {
-            "error": f"Symbol {symbol} not found! This action will not be allowed.",
-            "symbol": symbol,
-            "date": today_date,
-        }
-
-    # Step 4: Validate buy conditions
-    # Calculate cash required for purchase: stock price × buy quantity
-    try:
-        cash_left = current_position["CASH"] - this_symbol_price * amount
-    except Exception as e:
-        print(current_position, "CASH", this_symbol_price, amount)
-
-    # Check if cash balance is sufficient for purchase
-    if cash_left < 0:
-        # Insufficient cash, return error message
-        return {
-            "error": "Insufficient cash! This action will not be allowed.",
-            "required_cash": this_symbol_price * amount,
-            "cash_available": current_position.get("CASH", 0),
-            "symbol": symbol,
-            "date": today_date,
-        }
-    else:
-        # Step 5: Execute buy operation, update position
-        # Create a copy of current position to avoid directly modifying original data
-        new_position = current_position.copy()
-
-        # Decrease cash balance
-        new_position["CASH"] = cash_left
-
-        # Increase stock position quantity
-        new_position[symbol] += amount
-
-        # Step 6: Record transaction to position.jsonl file
-        # Build file path: {project_root}/data/{log_path}/{signature}/position/position.jsonl
-        # Use append mode ("a") to write new transaction record
-        # Each operation ID increments by 1, ensuring uniqueness of operation sequence
-        log_path = get_config_value("LOG_PATH", "./data/agent_data")
-        if log_path.startswith("./data/"):
-            log_path = log_path[7:]  # Remove "./data/" prefix
-        position_file_path = os.path.join(project_root, "data", log_path, signature, "position", "position.jsonl")
-        with open(position_file_path, "a") as f:
-            # Write JSON format transaction record, containing date, operation ID, transaction details and updated position
-            print(
-                f"Writing to position.jsonl: {json.dumps({'date': today_date, 'id': current_action_id + 1, 'this_action':{'action':'buy','symbol':symbol,'amount':amount},'positions': new_position})}"
-            )
-            f.write(
-                json.dumps(
-                    {
-                        "date": today_date,
-                        "id": current_action_id + 1,
-                        "this_action": {"action": "buy", "symbol": symbol, "amount": amount},
-                        "positions": new_position,
-                    }
-                )
-                + "\n"
-            )
-        # Step 7: Return updated position
-        write_config_value("IF_TRADE", True)
-        print("IF_TRADE", get_config_value("IF_TRADE"))
-        return new_position
+    # Steps 2-6: the order engine prices the order, then reads the latest position and
+    # operation ID, validates the order, updates the position and appends the record to
+    # position.jsonl while holding the signature's position lock, so concurrent orders
+    # never see the same position or reuse an operation ID
+    results, new_position = _execute_orders([{"action": "buy", "symbol": symbol, "amount": amount}], today_date, signature)
+    result = results[0]
+    if result["status"] != "filled":
+        return _order_error(result, today_date)
 
+    # Step 7: Return updated position
+    write_config_value("IF_TRADE", True)
+    print("IF_TRADE", get_config_value("IF_TRADE"))
+    return new_position
+
+
+def _sellable_positions(positions: Dict[str, float], bought_today: Dict[str, int]) -> Dict[str, float]:
+    """Shares that can be sold now per held symbol; A-shares bought today are locked until tomorrow (T+1)."""
+    sellable = {}
+    for symbol, quantity in positions.items():
+        if symbol == "CASH" or quantity <= 0:
+            continue
+        locked = bought_today.get(symbol, 0) if market_for_symbol(symbol) == "cn" else 0
+        sellable[symbol] = max(0, quantity - locked)
+    return sellable
 
-def _get_today_buy_amount(symbol: str, today_date: str, signature: str) -> int:
+
+@mcp.tool()
+def get_sellable_positions() -> Dict[str, Any]:
     """
-    Helper function to get the total amount bought today for T+1 restriction check
+    Get the quantity of every held stock that can be sold today
 
-    Args:
-        symbol: Stock symbol
-        today_date: Trading date
-        signature: Model signature
+    Chinese A-shares (symbols ending with .SH or .SZ) bought today cannot be sold
+    until the next trading day (T+1 rule), so they are excluded from the sellable
+    quantity. US stocks are fully sellable.
 
     Returns:
-        Total shares bought today
+        Dict[str, Any]:
+          - "date": Current trading date
+          - "sellable": {symbol: sellable shares} for every held symbol
+          - "bought_today": {symbol: shares bought today}
+          - "CASH": Cash balance
+
+    Example:
+        >>> result = get_sellable_positions()
+        >>> print(result)  # {"date": "2025-10-15", "sellable": {"600519.SH": 100}, "bought_today": {"600519.SH": 200}, "CASH": 5000.0}
     """
-    log_path = get_config_value("LOG_PATH", "./data/agent_data")
-    if log_path.startswith("./data/"):
-        log_path = log_path[7:]  # Remove "./data/" prefix
-    position_file_path = os.path.join(project_root, "data", log_path, signature, "position", "position.jsonl")
-
-    if not os.path.exists(position_file_path):
-        return 0
-
-    total_bought_today = 0
-    with open(position_file_path, "r") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                record = json.loads(line)
-                if record.get("date") == today_date:
-                    this_action = record.get("this_action", {})
-                    if this_action.get("action") == "buy" and this_action.get("symbol") == symbol:
-                        total_bought_today += this_action.get("amount", 0)
-            except Exception:
-                continue
+    signature = get_config_value("SIGNATURE")
+    if signature is None:
+        raise ValueError("SIGNATURE environment variable is not set")
+    today_date = get_config_value("TODAY_DATE")
 
-    return total_bought_today
+    ledger = get_position_ledger(signature)
+    current_position, _ = ledger.latest_position(today_date)
+    bought_today = ledger.bought_on(today_date)
+    return {
+        "date": today_date,
+        "sellable": _sellable_positions(current_position, bought_today),
+        "bought_today": bought_today,
+        "CASH": current_position.get("CASH", 0),
+    }
 
 
 @mcp.tool()
@@ -254,112 +172,324 @@ def sell(symbol: str, amount: int) -> Dict[str, Any]:
     # Get current trading date from environment variable
     today_date = get_config_value("TODAY_DATE")
 
-    # Auto-detect market type based on symbol format
-    market = "cn" if symbol.endswith((".SH", ".SZ")) else "us"
-
-    # 🇨🇳 Chinese A-shares trading rule: Must trade in lots of 100 shares (一手 = 100股)
-    if market == "cn" and amount % 100 != 0:
-        return {
-            "error": f"Chinese A-shares must be traded in multiples of 100 shares (1 lot = 100 shares). You tried to sell {amount} shares.",
-            "symbol": symbol,
-            "amount": amount,
-            "date": today_date,
-            "suggestion": f"Please use {(amount // 100) * 100} or {((amount // 100) + 1) * 100} shares instead.",
-        }
-
-    # Step 2: Get current latest position and operation ID
-    # get_latest_position returns two values: position dictionary and current maximum operation ID
-    # This ID is used to ensure each operation has a unique identifier
-    current_position, current_action_id = get_latest_position(today_date, signature)
-
-    # Step 3: Get stock opening price for the day
-    # Use get_open_prices function to get the opening price of specified stock for the day
-    # If stock symbol does not exist or price data is missing, KeyError exception will be raised
-    try:
-        this_symbol_price = get_open_prices(today_date, [symbol], market=market)[f"{symbol}_price"]
-    except KeyError:
-        # Stock symbol does not exist or price data is missing, return error message
-        return {
-            "error": f"Symbol {symbol} not found! This action will not be allowed.",
-            "symbol": symbol,
-            "date": today_date,
-        }
-
-    # Step 4: Validate sell conditions
-    # Check if holding this stock
-    if symbol not in current_position:
-        return {
-            "error": f"No position for {symbol}! This action will not be allowed.",
-            "symbol": symbol,
-            "date": today_date,
-        }
-
-    # Check if position quantity is sufficient for selling
-    if current_position[symbol] < amount:
-        return {
-            "error": "Insufficient shares! This action will not be allowed.",
-            "have": current_position.get(symbol, 0),
-            "want_to_sell": amount,
-            "symbol": symbol,
-            "date": today_date,
-        }
-
-    # 🇨🇳 Chinese A-shares T+1 trading rule: Cannot sell shares bought on the same day
-    if market == "cn":
-        bought_today = _get_today_buy_amount(symbol, today_date, signature)
-        if bought_today > 0:
-            # Calculate sellable quantity (total position - bought today)
-            sellable_amount = current_position[symbol] - bought_today
-            if amount > sellable_amount:
-                return {
-                    "error": f"T+1 restriction violated! You bought {bought_today} shares of {symbol} today and cannot sell them until tomorrow.",
-                    "symbol": symbol,
-                    "total_position": current_position[symbol],
-                    "bought_today": bought_today,
-                    "sellable_today": max(0, sellable_amount),
-                    "want_to_sell": amount,
-                    "date": today_date,
-                }
+    # Steps 2-6: the order engine prices the order, then reads the latest position and
+    # operation ID, validates the order, updates the position and appends the record to
+    # position.jsonl while holding the signature's position lock, so concurrent orders
+    # never see the same position or reuse an operation ID
+    results, new_position = _execute_orders([{"action": "sell", "symbol": symbol, "amount": amount}], today_date, signature)
+    result = results[0]
+    if result["status"] != "filled":
+        return _order_error(result, today_date)
+
+    # Step 7: Return updated position
+    write_config_value("IF_TRADE", True)
+    return new_position
+
+
+def _batch_open_prices(today_date: str, symbols: List[str]) -> Dict[str, float]:
+    """Opening prices of symbols for today_date, one get_open_prices lookup per market; missing symbols are left out."""
+    by_market: Dict[str, List[str]] = {}
+    for symbol in dict.fromkeys(symbols):
+        by_market.setdefault(market_for_symbol(symbol), []).append(symbol)
+    prices = {}
+    for market, market_symbols in by_market.items():
+        for key, price in get_open_prices(today_date, market_symbols, market=market).items():
+            if price is not None:
+                prices[key[: -len("_price")]] = price
+    return prices
 
-    # Step 5: Execute sell operation, update position
-    # Create a copy of current position to avoid directly modifying original data
-    new_position = current_position.copy()
-
-    # Decrease stock position quantity
-    new_position[symbol] -= amount
-
-    # Increase cash balance: sell price × sell quantity
-    # Use get method to ensure CASH field exists, default to 0 if not present
-    new_position["CASH"] = new_position.get("CASH", 0) + this_symbol_price * amount
-
-    # Step 6: Record transaction to position.jsonl file
-    # Build file path: {project_root}/data/{log_path}/{signature}/position/position.jsonl
-    # Use append mode ("a") to write new transaction record
-    # Each operation ID increments by 1, ensuring uniqueness of operation sequence
-    log_path = get_config_value("LOG_PATH", "./data/agent_data")
-    if log_path.startswith("./data/"):
-        log_path = log_path[7:]  # Remove "./data/" prefix
-    position_file_path = os.path.join(project_root, "data", log_path, signature, "position", "position.jsonl")
-    with open(position_file_path, "a") as f:
-        # Write JSON format transaction record, containing date, operation ID and updated position
-        print(
-            f"Writing to position.jsonl: {json.dumps({'date': today_date, 'id': current_action_id + 1, 'this_action':{'action':'sell','symbol':symbol,'amount':amount},'positions': new_position})}"
-        )
-        f.write(
-            json.dumps(
+
+def _execute_orders(
+    orders: List[Dict[str, Any]], today_date: str, signature: str, atomic: bool = False
+) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """
+    Validate and record a list of orders for one signature as a single batch
+
+    This is the single write path of buy(), sell(), submit_orders() and
+    rebalance_to_weights(). Prices are looked up first; then, under the
+    signature's position lock, the latest position is read, orders are
+    validated in order against one in-memory position (each accepted order
+    updates the cash and holdings seen by the next one) and all accepted
+    orders are appended to position.jsonl with one write. Orders of other
+    signatures do not wait for the lock.
+
+    Args:
+        orders: [{"action": "buy" | "sell", "symbol": str, "amount": int}, ...]
+        today_date: Trading date
+        signature: Model signature
+        atomic: If True, nothing is recorded when any order is rejected
+
+    Returns:
+        (results, positions): one result per order ({"status": "filled", ...} or
+        {"status": "rejected", "error": ...}) and the position after the batch
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(orders)
+    valid: List[Tuple[int, str, str, int]] = []
+    for i, order in enumerate(orders):
+        action = str(order.get("action", "")).lower() if isinstance(order, dict) else ""
+        symbol = order.get("symbol") if isinstance(order, dict) else None
+        amount = order.get("amount") if isinstance(order, dict) else None
+        if action not in ("buy", "sell") or not isinstance(symbol, str) or not symbol:
+            results[i] = {"error": "Each order needs action 'buy' or 'sell' and a symbol.", "order": order}
+        elif isinstance(amount, bool) or not isinstance(amount, int) or amount <= 0:
+            results[i] = {"error": "Amount must be a positive integer.", "order": order}
+        elif market_for_symbol(symbol) == "cn" and amount % lot_size_for_symbol(symbol) != 0:
+            lot_size = lot_size_for_symbol(symbol)
+            results[i] = {
+                "error": f"Chinese A-shares must be traded in multiples of {lot_size} shares (1 lot = {lot_size} shares). You tried to {action} {amount} shares.",
+                "suggestion": f"Please use {(amount // lot_size) * lot_size} or {((amount // lot_size) + 1) * lot_size} shares instead.",
+            }
+        else:
+            valid.append((i, action, symbol, amount))
+
+    # Step 1: Price every order with one lookup per market
+    prices = _batch_open_prices(today_date, [symbol for _, _, symbol, _ in valid])
+
+    ledger = get_position_ledger(signature)
+    with get_position_lock(signature):
+        # Step 2: Validate in order against one in-memory position
+        current_position, current_action_id = get_latest_position(today_date, signature)
+        position = current_position.copy()
+        bought_today = ledger.bought_on(today_date)
+        records = []
+        for i, action, symbol, amount in valid:
+            price = prices.get(symbol)
+            if price is None:
+                results[i] = {"error": f"Symbol {symbol} not found! This action will not be allowed."}
+                continue
+            if action == "buy":
+                cash_left = position.get("CASH", 0) - price * amount
+                if cash_left < 0:
+                    results[i] = {
+                        "error": "Insufficient cash! This action will not be allowed.",
+                        "required_cash": price * amount,
+                        "cash_available": position.get("CASH", 0),
+                    }
+                    continue
+                position["CASH"] = cash_left
+                position[symbol] = position.get(symbol, 0) + amount
+                bought_today[symbol] = bought_today.get(symbol, 0) + amount
+            else:
+                if symbol not in position:
+                    results[i] = {"error": f"No position for {symbol}! This action will not be allowed."}
+                    continue
+                if position[symbol] < amount:
+                    results[i] = {
+                        "error": "Insufficient shares! This action will not be allowed.",
+                        "have": position.get(symbol, 0),
+                        "want_to_sell": amount,
+                    }
+                    continue
+                # 🇨🇳 T+1: shares bought today (including earlier orders of this batch) cannot be sold
+                if market_for_symbol(symbol) == "cn":
+                    sellable_amount = position[symbol] - bought_today.get(symbol, 0)
+                    if amount > sellable_amount:
+                        results[i] = {
+                            "error": f"T+1 restriction violated! You bought {bought_today.get(symbol, 0)} shares of {symbol} today and cannot sell them until tomorrow.",
+                            "total_position": position[symbol],
+                            "bought_today": bought_today.get(symbol, 0),
+                            "sellable_today": max(0, sellable_amount),
+                            "want_to_sell": amount,
+                        }
+                        continue
+                position[symbol] -= amount
+                position["CASH"] = position.get("CASH", 0) + price * amount
+
+            records.append(
                 {
                     "date": today_date,
-                    "id": current_action_id + 1,
-                    "this_action": {"action": "sell", "symbol": symbol, "amount": amount},
-                    "positions": new_position,
+                    "id": current_action_id + len(records) + 1,
+                    "this_action": {"action": action, "symbol": symbol, "amount": amount},
+                    "positions": position.copy(),
                 }
             )
-            + "\n"
-        )
+            results[i] = {"status": "filled", "price": price, "id": records[-1]["id"]}
+
+        rejected = any("error" in result for result in results)
+        if atomic and rejected:
+            records = []
+            position = current_position
+        # Step 3: Record all accepted orders with a single write
+        seq = ledger.append_many(records, sync=False)
+    # fsync 在释放锁之后等待，同一窗口内的并发订单共用一次 fsync
+    ledger.sync(seq)
+    for record in records:
+        print(f"Wrote to position.jsonl: {json.dumps(record)}")
+
+    for i, order in enumerate(orders):
+        result = results[i]
+        if "error" in result:
+            result["status"] = "rejected"
+        elif not records:
+            result = {"status": "cancelled", "error": "Not executed because another order in the atomic batch was rejected."}
+        base = {key: order.get(key) for key in ("action", "symbol", "amount")} if isinstance(order, dict) else {}
+        results[i] = {**base, **result}
+    return results, position
 
-    # Step 7: Return updated position
-    write_config_value("IF_TRADE", True)
-    return new_position
+
+@mcp.tool()
+def submit_orders(orders: List[Dict[str, Any]], atomic: bool = False) -> Dict[str, Any]:
+    """
+    Submit several buy/sell orders in one call
+
+    Orders are executed in the given order against today's opening prices, each
+    one seeing the cash and holdings left by the previous ones (put sells first
+    to free cash for buys). The same rules as buy() and sell() apply, including
+    100-share lots and T+1 for Chinese A-shares. Rejected orders do not stop the
+    others unless atomic is True.
+
+    Args:
+        orders: List of orders, e.g. [{"action": "sell", "symbol": "AAPL", "amount": 10},
+                {"action": "buy", "symbol": "MSFT", "amount": 5}]
+        atomic: If True, execute either all orders or none of them
+
+    Returns:
+        Dict[str, Any]:
+          - "results": One entry per order with "status" ("filled", "rejected" or "cancelled"),
+            the fill "price" or an "error" message
+          - "positions": Position after the batch
+          - "filled": Number of filled orders
+
+    Raises:
+        ValueError: Raised when SIGNATURE environment variable is not set
+
+    Example:
+        >>> result = submit_orders([{"action": "sell", "symbol": "AAPL", "amount": 10}, {"action": "buy", "symbol": "MSFT", "amount": 5}])
+        >>> print(result["results"])  # [{"action": "sell", "symbol": "AAPL", "amount": 10, "status": "filled", "price": 255.0, "id": 12}, ...]
+    """
+    signature = get_config_value("SIGNATURE")
+    if signature is None:
+        raise ValueError("SIGNATURE environment variable is not set")
+    today_date = get_config_value("TODAY_DATE")
+
+    if not isinstance(orders, list) or not orders:
+        return {"error": "orders must be a non-empty list of {action, symbol, amount}", "date": today_date}
+
+    results, positions = _execute_orders(orders, today_date, signature, atomic=atomic)
+    filled = sum(1 for result in results if result["status"] == "filled")
+    if filled:
+        write_config_value("IF_TRADE", True)
+    return {"date": today_date, "results": results, "positions": positions, "filled": filled}
+
+
+def _rebalance_orders(
+    weights: Dict[str, float],
+    cash_buffer: float,
+    positions: Dict[str, float],
+    prices: Dict[str, float],
+    bought_today: Dict[str, int],
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Compute the orders that move positions to target weights
+
+    Target shares are floor(weight * investable value / price), rounded down to
+    the lot size (100 shares for .SH/.SZ), where the investable value is the
+    portfolio value at today's opening prices times (1 - cash_buffer). Held
+    symbols missing from weights get a target of 0; symbols without a price
+    today are left unchanged. Sells of A-shares are capped at the T+1 sellable
+    quantity, and buys are scaled down when the cash freed by sells falls short.
+
+    Returns:
+        (orders, summary): sells first, then buys; summary holds the portfolio
+        value, the investable value and the symbols skipped for lack of a price
+    """
+    held = [symbol for symbol, quantity in positions.items() if symbol != "CASH" and quantity > 0]
+    symbols = list(dict.fromkeys(list(weights) + held))
+    unpriced = [symbol for symbol in symbols if symbol not in prices]
+    symbols = [symbol for symbol in symbols if symbol in prices]
+
+    price = np.array([prices[symbol] for symbol in symbols], dtype=np.float64)
+    current = np.array([positions.get(symbol, 0) for symbol in symbols], dtype=np.int64)
+    weight = np.array([weights.get(symbol, 0.0) for symbol in symbols], dtype=np.float64)
+    lot = np.array([lot_size_for_symbol(symbol) for symbol in symbols], dtype=np.int64)
+    t1_locked = np.array(
+        [bought_today.get(symbol, 0) if market_for_symbol(symbol) == "cn" else 0 for symbol in symbols], dtype=np.int64
+    )
+
+    portfolio_value = float(positions.get("CASH", 0) + np.dot(current, price))
+    investable = portfolio_value * (1 - cash_buffer)
+    target = np.floor(weight * investable / price / lot).astype(np.int64) * lot
+    delta = target - current
+    # T+1：今日买入的 A 股不能卖出，卖出量以可卖数量为上限
+    delta = np.maximum(delta, -np.maximum(current - t1_locked, 0) // lot * lot)
+    # 卖出受限时可用现金变少，按比例缩减买入量
+    buy = delta > 0
+    cash_after_sells = positions.get("CASH", 0) - float(np.dot(np.minimum(delta, 0), price))
+    buy_cost = float(np.dot(delta[buy], price[buy]))
+    if buy_cost > cash_after_sells:
+        scale = max(cash_after_sells, 0) / buy_cost
+        delta[buy] = np.floor(delta[buy] * scale / lot[buy]).astype(np.int64) * lot[buy]
+
+    sells = [
+        {"action": "sell", "symbol": symbols[i], "amount": int(-delta[i])} for i in np.flatnonzero(delta < 0).tolist()
+    ]
+    buys = [{"action": "buy", "symbol": symbols[i], "amount": int(delta[i])} for i in np.flatnonzero(delta > 0).tolist()]
+    summary = {"portfolio_value": portfolio_value, "investable_value": investable, "unpriced": unpriced}
+    return sells + buys, summary
+
+
+@mcp.tool()
+def rebalance_to_weights(weights: Dict[str, float], cash_buffer: float = 0.0) -> Dict[str, Any]:
+    """
+    Rebalance the portfolio to target weights in one call
+
+    Computes the share changes needed to hold each symbol at its target weight of
+    the portfolio value (cash plus holdings at today's opening prices) and executes
+    them as one transaction: sells first to free cash, then buys. Share counts are
+    rounded down to whole shares, or to 100-share lots for Chinese A-shares
+    (.SH/.SZ). Held symbols not listed in weights are sold; A-shares bought today
+    are not sold (T+1). If any order would be rejected, nothing is executed.
+
+    Args:
+        weights: Target weight per symbol, e.g. {"AAPL": 0.3, "MSFT": 0.2}; weights must be
+                 non-negative and sum to at most 1
+        cash_buffer: Fraction of the portfolio value kept in cash before applying weights,
+                     e.g. 0.05 invests 95% of the portfolio value according to weights
+
+    Returns:
+        Dict[str, Any]:
+          - "orders": Executed orders with their status and fill price
+          - "positions": Position after the rebalance
+          - "portfolio_value" / "investable_value": Values used to size the orders
+          - "unpriced": Symbols left unchanged because they have no price today
+          - Failure: {"error": error message, ...}
+
+    Raises:
+        ValueError: Raised when SIGNATURE environment variable is not set
+
+    Example:
+        >>> result = rebalance_to_weights({"AAPL": 0.5, "MSFT": 0.4}, cash_buffer=0.02)
+        >>> print(result["orders"])  # [{"action": "sell", "symbol": "NVDA", "amount": 10, "status": "filled", ...}, ...]
+    """
+    signature = get_config_value("SIGNATURE")
+    if signature is None:
+        raise ValueError("SIGNATURE environment variable is not set")
+    today_date = get_config_value("TODAY_DATE")
+
+    if not isinstance(weights, dict) or any(
+        isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0 for weight in weights.values()
+    ):
+        return {"error": "weights must map symbols to non-negative numbers", "date": today_date}
+    if sum(weights.values()) > 1 + 1e-9:
+        return {"error": f"Weights sum to {sum(weights.values()):.4f}; they must sum to at most 1.", "date": today_date}
+    if not 0 <= cash_buffer < 1:
+        return {"error": "cash_buffer must be in [0, 1).", "date": today_date}
+
+    ledger = get_position_ledger(signature)
+    # 从读取持仓、计算目标到写入全程持锁，订单按最新持仓计算
+    with get_position_lock(signature):
+        current_position, _ = get_latest_position(today_date, signature)
+        held = [symbol for symbol, quantity in current_position.items() if symbol != "CASH" and quantity > 0]
+        prices = _batch_open_prices(today_date, list(weights) + held)
+        orders, summary = _rebalance_orders(weights, cash_buffer, current_position, prices, ledger.bought_on(today_date))
+        if not orders:
+            return {"date": today_date, "orders": [], "positions": current_position, "filled": 0, **summary}
+
+        results, positions = _execute_orders(orders, today_date, signature, atomic=True)
+    filled = sum(1 for result in results if result["status"] == "filled")
+    if filled:
+        write_config_value("IF_TRADE", True)
+    return {"date": today_date, "orders": results, "positions": positions, "filled": filled, **summary}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+"""
+position.jsonl append throughput per durability mode (POSITION_FSYNC).
+
+Worker threads append single-trade records the way the order engine does:
+read the latest position and append under the signature's position lock, then
+wait for durability after releasing it. Each mode is run on fresh files, and
+the table reports records/sec and the number of fsyncs issued. The
+"per-commit (sync under lock)" row waits inside the lock, i.e. one fsync per
+record, for comparison with grouped fsyncs.
+
+Files are written below data/ so fsync hits the same filesystem as the real
+ledgers.
+
+Usage:
+    python benchmarks/bench_ledger_writer.py [--signatures 4] [--workers-per-signature 4] [--records 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.ledger_writer import flush_all
+from tools.position_ledger import get_position_ledger, get_position_lock
+
+_real_fsync = os.fsync
+fsync_count = 0
+
+
+def _counting_fsync(fd):
+    global fsync_count
+    fsync_count += 1
+    _real_fsync(fd)
+
+
+def run_worker(signature: str, n_records: int, sync_under_lock: bool) -> None:
+    ledger = get_position_ledger(signature)
+    for _ in range(n_records):
+        with get_position_lock(signature):
+            positions, last_id = ledger.latest_position("2025-10-02")
+            positions["AAPL"] = positions.get("AAPL", 0) + 1
+            positions["CASH"] = positions.get("CASH", 0) - 250.0
+            record = {
+                "date": "2025-10-02",
+                "id": last_id + 1,
+                "this_action": {"action": "buy", "symbol": "AAPL", "amount": 1},
+                "positions": positions,
+            }
+            seq = ledger.append(record, sync=sync_under_lock)
+        ledger.sync(seq)
+
+
+def main():
+    global fsync_count
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--signatures", type=int, default=4)
+    parser.add_argument("--workers-per-signature", type=int, default=4)
+    parser.add_argument("--records", type=int, default=200, help="Records per worker")
+    parser.add_argument("--interval-ms", type=int, default=100)
+    args = parser.parse_args()
+
+    os.fsync = _counting_fsync
+    os.environ["POSITION_FSYNC_INTERVAL_MS"] = str(args.interval_ms)
+    n_workers = args.signatures * args.workers_per_signature
+    total = n_workers * args.records
+    print(f"📝 {args.signatures} signatures x {args.workers_per_signature} workers x {args.records} records = {total} records")
+    print()
+    print(f"{'mode':<32}{'seconds':>9}{'records/s':>11}{'fsyncs':>8}")
+    print("-" * 60)
+    runs = (
+        ("none", "none", False),
+        ("per-commit (sync under lock)", "per-commit", True),
+        ("per-commit", "per-commit", False),
+        (f"interval ({args.interval_ms} ms)", "interval", False),
+    )
+    data_dir = os.path.join(project_root, "data")
+    for label, mode, sync_under_lock in runs:
+        with tempfile.TemporaryDirectory(dir=data_dir, prefix=".bench_ledger_") as tmp:
+            os.environ["POSITION_FSYNC"] = mode
+            os.environ["LOG_PATH"] = tmp
+            os.environ["RUNTIME_ENV_PATH"] = os.path.join(tmp, "runtime_env.json")
+            signatures = [f"sig_{i}" for i in range(args.signatures)]
+            for signature in signatures:
+                get_position_ledger(signature).append(
+                    {"date": "2025-10-01", "id": 0, "this_action": {"action": "no_trade", "symbol": "", "amount": 0}, "positions": {"CASH": 1e9}}
+                )
+            flush_all()
+
+            fsync_count = 0
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                futures = [
+                    executor.submit(run_worker, signature, args.records, sync_under_lock)
+                    for signature in signatures
+                    for _ in range(args.workers_per_signature)
+                ]
+                for future in futures:
+                    future.result()
+            seconds = time.perf_counter() - start
+            # interval 模式下剩余的写入在这里补一次 fsync，不计入耗时
+            flush_all()
+
+            for signature in signatures:
+                _, last_id = get_position_ledger(signature).latest_position("2025-10-03")
+                assert last_id == args.workers_per_signature * args.records, f"{signature}: last id {last_id}"
+            print(f"{label:<32}{seconds:>9.2f}{total / seconds:>11.0f}{fsync_count:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Order throughput of the TradeTools order engine with concurrent signatures.
+
+Every worker sends single buy/sell orders through agent_tools/tool_trade.py's
+_execute_orders(), the path behind buy() and sell(), for its own signature. All
+signatures write to a temporary LOG_PATH, seeded with cash and shares so every
+order fills. Workers of one signature serialize on its position lock, while
+different signatures run in parallel. After each run the position files are
+checked for duplicate action ids and for final holdings that differ from the
+filled orders.
+
+Usage:
+    python benchmarks/bench_order_engine.py [--signatures 1,8,64] [--orders 200] [--workers-per-signature 1] [--processes]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+SEED_SHARES = 1_000_000
+
+
+def run_worker(signature: str, worker: int, n_orders: int, symbols: List[str], today: str, start_at: float) -> Tuple[float, float, Dict[str, int]]:
+    """Send n_orders alternating buy/sell orders; returns (start, end, net filled shares per symbol)."""
+    from agent_tools.tool_trade import _execute_orders
+
+    net: Dict[str, int] = {}
+    time.sleep(max(0.0, start_at - time.time()))
+    start = time.time()
+    for k in range(n_orders):
+        symbol = symbols[(worker + k // 2) % len(symbols)]
+        action = "buy" if k % 2 == 0 else "sell"
+        results, _ = _execute_orders([{"action": action, "symbol": symbol, "amount": 1}], today, signature)
+        if results[0]["status"] == "filled":
+            net[symbol] = net.get(symbol, 0) + (1 if action == "buy" else -1)
+        else:
+            net.setdefault("_rejected", 0)
+            net["_rejected"] += 1
+    return start, time.time(), net
+
+
+def check_signature(signature: str, symbols: List[str], net: Dict[str, int], filled: int) -> bool:
+    """True if action ids are unique and consecutive and holdings match the filled orders."""
+    from tools.position_ledger import PositionLedger, _decode, get_position_file_path
+
+    path = get_position_file_path(signature)
+    records, _ = _decode(path.read_bytes(), None)
+    ids = [record["id"] for record in records if not record.get("checkpoint")]
+    if sorted(ids) != list(range(filled + 1)):
+        return False
+    positions, _ = PositionLedger(path).latest_position("9999-12-31")
+    return all(positions.get(symbol) == SEED_SHARES + net.get(symbol, 0) for symbol in symbols)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--signatures", default="1,8,64", help="Comma-separated numbers of concurrent signatures")
+    parser.add_argument("--orders", type=int, default=200, help="Orders per worker")
+    parser.add_argument("--workers-per-signature", type=int, default=1)
+    parser.add_argument("--processes", action="store_true", help="Run workers as processes instead of threads")
+    parser.add_argument("--market", default="us", choices=("us", "cn"))
+    parser.add_argument("--date", default=None, help="Trading date with prices; a recent default per market")
+    parser.add_argument("--symbols", default=None, help="Comma-separated symbols with prices on --date")
+    args = parser.parse_args()
+
+    today = args.date or ("2025-10-02 10:00:00" if args.market == "us" else "2025-10-15")
+    symbols = (args.symbols or ("AAPL,MSFT,NVDA,AMZN" if args.market == "us" else "600519.SH,601318.SH")).split(",")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 所有签名写入临时目录，不影响 data/agent_data
+        os.environ["LOG_PATH"] = os.path.join(tmp, "agent_data")
+        os.environ["RUNTIME_ENV_PATH"] = os.path.join(tmp, "runtime_env.json")
+        from agent_tools.tool_trade import _batch_open_prices
+        from tools.position_ledger import get_position_ledger
+
+        prices = _batch_open_prices(today, symbols)
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            print(f"⚠️  Warning: no {args.market} opening price on {today} for {', '.join(missing)}")
+            return
+
+        mode = "processes" if args.processes else "threads"
+        print(f"📝 {args.orders} orders per worker, {args.workers_per_signature} worker(s) per signature, {mode}")
+        print()
+        print(f"{'signatures':>10}{'workers':>9}{'orders':>9}{'seconds':>10}{'orders/s':>11}  check")
+        print("-" * 56)
+        for run, n_signatures in enumerate(int(n) for n in args.signatures.split(",")):
+            signatures = [f"_bench_{run}_{i}" for i in range(n_signatures)]
+            for signature in signatures:
+                seed = {symbol: SEED_SHARES for symbol in symbols}
+                seed["CASH"] = 1e12
+                get_position_ledger(signature).append(
+                    {"date": "2000-01-01", "id": 0, "this_action": {"action": "no_trade", "symbol": "", "amount": 0}, "positions": seed}
+                )
+
+            jobs = [(signature, worker) for signature in signatures for worker in range(args.workers_per_signature)]
+            executor_cls = ProcessPoolExecutor if args.processes else ThreadPoolExecutor
+            with executor_cls(max_workers=len(jobs)) as executor:
+                start_at = time.time() + (2.0 if args.processes else 0.2)
+                futures = [
+                    (signature, executor.submit(run_worker, signature, worker, args.orders, symbols, today, start_at))
+                    for signature, worker in jobs
+                ]
+                outcomes = [(signature, future.result()) for signature, future in futures]
+
+            start = min(outcome[0] for _, outcome in outcomes)
+            end = max(outcome[1] for _, outcome in outcomes)
+            net_by_signature: Dict[str, Dict[str, int]] = {signature: {} for signature in signatures}
+            for signature, (_, _, net) in outcomes:
+                for symbol, count in net.items():
+                    net_by_signature[signature][symbol] = net_by_signature[signature].get(symbol, 0) + count
+
+            total = len(jobs) * args.orders
+            ok = all(
+                check_signature(
+                    signature,
+                    symbols,
+                    net,
+                    args.orders * args.workers_per_signature - net.get("_rejected", 0),
+                )
+                for signature, net in net_by_signature.items()
+            )
+            seconds = end - start
+            print(f"{n_signatures:>10}{len(jobs):>9}{total:>9}{seconds:>10.2f}{total / seconds:>11.0f}  {'✅' if ok else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+position.jsonl size and cold read time per ledger format.
+
+Writes the same synthetic trading history (register_agent seed + buy/sell/no_trade
+records over a 100-symbol universe) as format version 1 (full positions per
+record) and version 2 (delta records), each with and without checkpoints, then
+times a fresh PositionLedger answering what get_latest_position and
+get_daily_portfolio_values ask for.
+
+Usage:
+    python benchmarks/bench_position_ledger.py [--symbols 100] [--years 5] [--trades-per-day 3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic_data import synthetic_position_records
+from tools.position_ledger import PositionLedger, encode_records
+
+
+def cold_ms(path: Path, query, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query(PositionLedger(path))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--trades-per-day", type=int, default=3)
+    parser.add_argument("--checkpoint-every", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = synthetic_position_records(args.symbols, args.years, args.trades_per_day)
+    today = "9999-12-31"
+    print(f"📝 {len(records)} records, {args.symbols} symbols")
+    print()
+    print(f"{'format':<28}{'size KB':>10}{'latest ms':>12}{'all dates ms':>14}")
+    print("-" * 64)
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for version, every in ((1, 0), (1, args.checkpoint_every), (2, 0), (2, args.checkpoint_every)):
+            path = Path(tmp) / f"v{version}_{every}.jsonl"
+            with path.open("w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(line) + "\n" for line in encode_records(records, version, every)))
+
+            # 所有格式还原出的持仓必须一致
+            result = {date: r["positions"] for date, r in PositionLedger(path).latest_by_date().items()}
+            if baseline is None:
+                baseline = result
+            assert result == baseline, f"version {version} rebuilt different positions"
+
+            latest_ms = cold_ms(path, lambda ledger: ledger.latest_position(today), args.repeat)
+            history_ms = cold_ms(path, lambda ledger: ledger.latest_by_date(), args.repeat)
+            label = f"v{version} " + (f"checkpoint every {every}" if every else "no checkpoints")
+            print(f"{label:<28}{path.stat().st_size / 1024:>10.0f}{latest_ms:>12.2f}{history_ms:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
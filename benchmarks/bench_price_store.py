@@ -0,0 +1,101 @@
+"""
+Per-call latency of the price helpers before and after the shared PriceStore.
+
+"before" replays the original full-file scan (json.loads on every line per
+call); "after" goes through tools.price_tools, which parses the file once.
+
+Usage:
+    python benchmarks/bench_price_store.py [--symbols 500] [--years 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic_data import write_synthetic_merged
+from tools.price_tools import (get_open_prices, get_yesterday_date,
+                               get_yesterday_open_and_close_price)
+
+
+def legacy_get_open_prices(today_date, symbols, merged_file):
+    """Original implementation: scan and parse the whole file on every call."""
+    wanted = set(symbols)
+    results = {}
+    with open(merged_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            doc = json.loads(line)
+            sym = doc.get("Meta Data", {}).get("2. Symbol")
+            if sym not in wanted:
+                continue
+            series = None
+            for key, value in doc.items():
+                if key.startswith("Time Series"):
+                    series = value
+                    break
+            bar = series.get(today_date) if isinstance(series, dict) else None
+            if isinstance(bar, dict):
+                open_val = bar.get("1. buy price")
+                results[f"{sym}_price"] = float(open_val) if open_val is not None else None
+    return results
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--legacy-repeat", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        merged_file = Path(tmp) / "merged.jsonl"
+        print(f"📝 Writing synthetic file: {args.symbols} symbols x {args.years} years ...")
+        symbols = write_synthetic_merged(merged_file, args.symbols, args.years)
+        print(f"   {merged_file.stat().st_size / 1024 / 1024:.1f} MB")
+
+        date = "2020-06-15"
+        wanted = symbols[:100]
+        path = str(merged_file)
+
+        legacy_ms = timed(lambda: legacy_get_open_prices(date, wanted, path), args.legacy_repeat)
+
+        start = time.perf_counter()
+        get_open_prices(date, wanted, merged_path=path)
+        first_ms = (time.perf_counter() - start) * 1000
+
+        store_ms = timed(lambda: get_open_prices(date, wanted, merged_path=path), args.repeat)
+        yesterday_ms = timed(
+            lambda: get_yesterday_open_and_close_price(date, wanted, merged_path=path), args.repeat
+        )
+        prev_ms = timed(lambda: get_yesterday_date(date, merged_path=path), args.repeat)
+
+        print()
+        print(f"{'call':<45}{'ms/call':>12}")
+        print("-" * 57)
+        print(f"{'get_open_prices (before, full scan)':<45}{legacy_ms:>12.3f}")
+        print(f"{'get_open_prices (after, first call + load)':<45}{first_ms:>12.3f}")
+        print(f"{'get_open_prices (after, warm)':<45}{store_ms:>12.3f}")
+        print(f"{'get_yesterday_open_and_close_price (warm)':<45}{yesterday_ms:>12.3f}")
+        print(f"{'get_yesterday_date (warm)':<45}{prev_ms:>12.3f}")
+        print(f"\n⚡ Warm speedup for get_open_prices: {legacy_ms / store_ms:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
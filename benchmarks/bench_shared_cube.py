@@ -0,0 +1,96 @@
+"""
+Memory of N model subprocesses with and without the shared-memory price cube.
+
+Each child loads prices through tools.price_tools (as the agents do), reads
+the open price of every symbol on every trading day and reports its private
+memory and PSS from /proc/self/smaps_rollup (Linux only). "own copy" children
+parse merged.jsonl themselves; "shared" children attach the cube published by
+the parent in PRICE_SHARED_CUBES.
+
+Usage:
+    python benchmarks/bench_shared_cube.py [--symbols 300] [--years 5] [--children 5 20 50]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic_data import write_synthetic_merged
+from tools.shared_cube import SHARED_CUBES_ENV, publish_price_cubes, release_blocks
+
+CHILD = """
+import json, sys
+sys.path.insert(0, {root!r})
+from tools.price_tools import get_open_prices, get_price_cube
+merged = {merged!r}
+cube = get_price_cube(merged_path=merged)
+for date in cube.timestamps:
+    get_open_prices(date, cube.symbols, merged_path=merged)
+mem = {{}}
+with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+        key, _, value = line.partition(":")
+        if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+            mem[key] = int(value.split()[0])
+print(json.dumps(mem))
+"""
+
+
+def run_children(code: str, n: int, env: dict) -> dict:
+    procs = [
+        subprocess.Popen([sys.executable, "-c", code], env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(n)
+    ]
+    reports = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+    return {
+        "pss_mb": sum(r["Pss"] for r in reports) / 1024,
+        "private_mb": sum(r["Private_Clean"] + r["Private_Dirty"] for r in reports) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--children", type=int, nargs="+", default=[5, 20, 50])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        merged_file = Path(tmp) / "merged.jsonl"
+        print(f"📝 Writing synthetic file: {args.symbols} symbols x {args.years} years ...")
+        write_synthetic_merged(merged_file, args.symbols, args.years)
+        code = CHILD.format(root=project_root, merged=str(merged_file))
+
+        base_env = dict(os.environ, PRICE_SNAPSHOT="0")
+        base_env.pop(SHARED_CUBES_ENV, None)
+        start = time.perf_counter()
+        shared_cubes, blocks = publish_price_cubes([merged_file])
+        print(f"   published cube in {time.perf_counter() - start:.1f}s")
+        shared_env = dict(base_env, **{SHARED_CUBES_ENV: shared_cubes})
+
+        print()
+        print(f"{'children':>10}{'own PSS MB':>14}{'own priv MB':>14}{'shared PSS MB':>16}{'shared priv MB':>16}")
+        print("-" * 70)
+        try:
+            for n in args.children:
+                own = run_children(code, n, base_env)
+                shared = run_children(code, n, shared_env)
+                print(
+                    f"{n:>10}{own['pss_mb']:>14.1f}{own['private_mb']:>14.1f}"
+                    f"{shared['pss_mb']:>16.1f}{shared['private_mb']:>16.1f}"
+                )
+        finally:
+            release_blocks(blocks)
+
+
+if __name__ == "__main__":
+    main()
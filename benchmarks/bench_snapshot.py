@@ -0,0 +1,77 @@
+"""
+Cold start of PriceStore with and without the warm-start snapshot.
+
+"parse" opens a fresh PriceStore with snapshots disabled (full json.loads of
+merged.jsonl); "snapshot" opens one from merged.snapshot. Both include the
+first get_open_prices-style lookup of 100 symbols.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--symbols 500] [--years 10]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic_data import write_synthetic_merged
+from tools.price_snapshot import build_snapshot, get_snapshot_path
+from tools.price_store import PriceStore
+
+
+def cold_start_ms(merged_file: Path, symbols, date: str, use_snapshot: bool) -> float:
+    start = time.perf_counter()
+    store = PriceStore(merged_file, use_snapshot=use_snapshot)
+    store.refresh()
+    {sym: store.get_bar(sym, date) for sym in symbols}
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        merged_file = Path(tmp) / "merged.jsonl"
+        print(f"📝 Writing synthetic file: {args.symbols} symbols x {args.years} years ...")
+        symbols = write_synthetic_merged(merged_file, args.symbols, args.years)
+        date = "2020-06-15"
+        wanted = symbols[:100]
+
+        # 与合并脚本相同：解析并写出快照
+        start = time.perf_counter()
+        build_snapshot(merged_file)
+        write_s = time.perf_counter() - start
+        snapshot_path = get_snapshot_path(merged_file)
+        print(f"   merged.jsonl    {merged_file.stat().st_size / 1024 / 1024:.1f} MB")
+        print(f"   merged.snapshot {snapshot_path.stat().st_size / 1024 / 1024:.1f} MB (parse + write {write_s:.1f}s)")
+
+        parse_ms = min(cold_start_ms(merged_file, wanted, date, False) for _ in range(args.repeat))
+        snapshot_ms = min(cold_start_ms(merged_file, wanted, date, True) for _ in range(args.repeat))
+
+        # mtime 变化但内容不变：需重新计算 SHA-256 校验
+        os.utime(merged_file)
+        start = time.perf_counter()
+        cold_start_ms(merged_file, wanted, date, True)
+        rehash_ms = (time.perf_counter() - start) * 1000
+
+        print()
+        print(f"{'cold start (load + 100 lookups)':<48}{'ms':>12}")
+        print("-" * 60)
+        print(f"{'parse merged.jsonl':<48}{parse_ms:>12.3f}")
+        print(f"{'snapshot':<48}{snapshot_ms:>12.3f}")
+        print(f"{'snapshot after touch (SHA-256 check)':<48}{rehash_ms:>12.3f}")
+        print(f"{'speedup':<48}{parse_ms / snapshot_ms:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+JSONL (PriceStore) vs SQLite (PRICE_BACKEND=sqlite) price backends.
+
+Compares first-call latency (file parse vs database open), warm per-call
+latency of the price helpers and single-symbol lookups on a synthetic
+merged.jsonl.
+
+Usage:
+    python benchmarks/bench_sqlite_backend.py [--symbols 500] [--years 10]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.bench_price_store import timed
+from benchmarks.synthetic_data import write_synthetic_merged
+from tools.price_sqlite import SqlitePriceDB, convert_jsonl_to_sqlite
+from tools.price_store import PriceStore
+from tools.price_tools import get_open_prices, get_yesterday_open_and_close_price
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        merged_file = Path(tmp) / "merged.jsonl"
+        print(f"📝 Writing synthetic file: {args.symbols} symbols x {args.years} years ...")
+        symbols = write_synthetic_merged(merged_file, args.symbols, args.years)
+
+        start = time.perf_counter()
+        db_path = convert_jsonl_to_sqlite(merged_file)
+        convert_s = time.perf_counter() - start
+        print(f"   merged.jsonl  {merged_file.stat().st_size / 1024 / 1024:.1f} MB")
+        print(f"   merged.sqlite {db_path.stat().st_size / 1024 / 1024:.1f} MB (converted in {convert_s:.1f}s)")
+
+        date = "2020-06-15"
+        wanted = symbols[:100]
+        path = str(merged_file)
+
+        # 冷启动：解析整个 JSONL vs 打开数据库后直接查询
+        start = time.perf_counter()
+        store = PriceStore(merged_file)
+        store.refresh()
+        {sym: store.get_bar(sym, date) for sym in wanted}
+        jsonl_first_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        SqlitePriceDB(db_path).get_bars(wanted, date)
+        sqlite_first_ms = (time.perf_counter() - start) * 1000
+
+        results = {}
+        for backend in ("jsonl", "sqlite"):
+            os.environ["PRICE_BACKEND"] = backend
+            get_open_prices(date, wanted, merged_path=path)
+            results[backend] = (
+                timed(lambda: get_open_prices(date, wanted, merged_path=path), args.repeat),
+                timed(lambda: get_yesterday_open_and_close_price(date, wanted, merged_path=path), args.repeat),
+            )
+        os.environ.pop("PRICE_BACKEND", None)
+
+        db = SqlitePriceDB(db_path)
+        single_jsonl_ms = timed(lambda: store.get_bar(symbols[-1], date), args.repeat)
+        single_sqlite_ms = timed(lambda: db.get_bar(symbols[-1], date), args.repeat)
+
+        print()
+        print(f"{'call':<48}{'jsonl ms':>12}{'sqlite ms':>12}")
+        print("-" * 72)
+        print(f"{'first call (load + 100 lookups)':<48}{jsonl_first_ms:>12.3f}{sqlite_first_ms:>12.3f}")
+        print(f"{'get_open_prices, 100 symbols (warm)':<48}{results['jsonl'][0]:>12.3f}{results['sqlite'][0]:>12.3f}")
+        print(
+            f"{'get_yesterday_open_and_close_price (warm)':<48}{results['jsonl'][1]:>12.3f}{results['sqlite'][1]:>12.3f}"
+        )
+        print(f"{'single bar lookup (warm)':<48}{single_jsonl_ms:>12.3f}{single_sqlite_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
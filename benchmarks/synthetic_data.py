@@ -0,0 +1,153 @@
+"""
+Synthetic merged.jsonl generator used by the benchmark scripts.
+
+The output mirrors what data/merge_jsonl.py produces: one Alpha Vantage style
+line per symbol, "1. buy price" / "4. sell price" keys, and only the buy price
+kept for the latest bar.
+"""
+
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+
+def business_days(start: str, n_years: int) -> List[str]:
+    """Return weekday dates starting at start and spanning n_years."""
+    current = datetime.strptime(start, "%Y-%m-%d")
+    end = current + timedelta(days=365 * n_years)
+    days = []
+    while current < end:
+        if current.weekday() < 5:
+            days.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    return days
+
+
+def synthetic_timestamps(start: str, n_years: int, interval: str = "daily") -> List[str]:
+    """Return bar timestamps for a daily or 60min synthetic series."""
+    days = business_days(start, n_years)
+    if interval == "daily":
+        return days
+    return [f"{day} {hour:02d}:00:00" for day in days for hour in range(10, 16)]
+
+
+def write_synthetic_merged(
+    path: Path,
+    n_symbols: int = 500,
+    n_years: int = 10,
+    start: str = "2015-01-02",
+    interval: str = "daily",
+    seed: int = 0,
+) -> List[str]:
+    """Write a synthetic merged.jsonl and return the generated symbols.
+
+    Args:
+        path: Output file path
+        n_symbols: Number of symbols (one JSONL line each)
+        n_years: Length of each series in years
+        start: First calendar date, "YYYY-MM-DD"
+        interval: "daily" or "60min"
+        seed: Random seed so repeated runs write identical files
+
+    Returns:
+        List of symbols in file order
+    """
+    rng = random.Random(seed)
+    timestamps = synthetic_timestamps(start, n_years, interval)
+    series_key = "Time Series (Daily)" if interval == "daily" else "Time Series (60min)"
+    symbols = [f"SYM{i:04d}" for i in range(n_symbols)]
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fout:
+        for symbol in symbols:
+            price = rng.uniform(10, 500)
+            series = {}
+            for ts in timestamps:
+                open_price = price
+                close_price = max(0.01, open_price * (1 + rng.gauss(0, 0.02)))
+                high = max(open_price, close_price) * (1 + abs(rng.gauss(0, 0.005)))
+                low = min(open_price, close_price) * (1 - abs(rng.gauss(0, 0.005)))
+                series[ts] = {
+                    "1. buy price": f"{open_price:.4f}",
+                    "2. high": f"{high:.4f}",
+                    "3. low": f"{low:.4f}",
+                    "4. sell price": f"{close_price:.4f}",
+                    "5. volume": str(rng.randint(100_000, 10_000_000)),
+                }
+                price = close_price
+            # 最新一天仅保留买入价，与 merge_jsonl.py 保持一致
+            latest = timestamps[-1]
+            series[latest] = {"1. buy price": series[latest]["1. buy price"]}
+            doc = {
+                "Meta Data": {
+                    "1. Information": "Daily Prices (buy price, high, low, sell price) and Volumes",
+                    "2. Symbol": symbol,
+                    "2.1. Name": f"Synthetic {symbol}",
+                    "3. Last Refreshed": latest,
+                },
+                series_key: dict(reversed(list(series.items()))),
+            }
+            fout.write(json.dumps(doc) + "\n")
+    return symbols
+
+
+def synthetic_position_records(
+    n_symbols: int = 100,
+    n_years: int = 5,
+    trades_per_day: int = 3,
+    start: str = "2015-01-02",
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """Return position.jsonl records as written by register_agent and buy/sell.
+
+    The first record seeds every symbol with 0 shares; each trading day then has
+    up to trades_per_day buys/sells, or a no_trade record.
+
+    Args:
+        n_symbols: Number of symbols in every positions dict
+        n_years: Number of years of trading days
+        trades_per_day: Maximum trades per day
+        start: First calendar date, "YYYY-MM-DD"
+        seed: Random seed so repeated runs return identical records
+
+    Returns:
+        List of records in file order
+    """
+    rng = random.Random(seed)
+    symbols = [f"SYM{i:04d}" for i in range(n_symbols)]
+    days = business_days(start, n_years)
+    positions: Dict[str, float] = {symbol: 0 for symbol in symbols}
+    positions["CASH"] = 10000.0
+    records = [{"date": days[0], "id": 0, "positions": dict(positions)}]
+    action_id = 0
+    for day in days[1:]:
+        n_trades = rng.randint(0, trades_per_day)
+        if n_trades == 0:
+            action_id += 1
+            action = {"action": "no_trade", "symbol": "", "amount": 0}
+            records.append({"date": day, "id": action_id, "this_action": action, "positions": dict(positions)})
+        for _ in range(n_trades):
+            symbol = rng.choice(symbols)
+            amount = rng.randint(1, 20)
+            price = round(rng.uniform(10, 500), 2)
+            if positions[symbol] >= amount and rng.random() < 0.5:
+                positions[symbol] -= amount
+                positions["CASH"] += price * amount
+                side = "sell"
+            else:
+                positions[symbol] += amount
+                positions["CASH"] -= price * amount
+                side = "buy"
+            action_id += 1
+            action = {"action": side, "symbol": symbol, "amount": amount}
+            records.append({"date": day, "id": action_id, "this_action": action, "positions": dict(positions)})
+    return records
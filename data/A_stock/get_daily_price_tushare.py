@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -9,6 +10,13 @@ import pandas as pd
 import tushare as ts
 from dotenv import load_dotenv
 
+# 将项目根目录加入 Python 路径，以便导入 tools 模块
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.index_constituents import add_index_weight_frame
+
 load_dotenv()
 
 
@@ -161,6 +169,12 @@ def get_daily_price_a_stock(
                 print(f"No index constituent data found for {index_code}")
                 return None
 
+        # 记录成分股快照，供按日期查询历史成分股（tools/index_constituents.py）
+        try:
+            add_index_weight_frame(df)
+        except Exception as e:
+            print(f"⚠️  Warning: failed to record index constituents: {e}")
+
         code_list = df["con_code"].tolist()
         code_str = ",".join(code_list)
         num_stocks = len(code_list)
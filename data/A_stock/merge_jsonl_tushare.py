@@ -1,10 +1,21 @@
 import json
 import os
+import sys
 from pathlib import Path
 from typing import Any, Dict
 
 import pandas as pd
 
+# Add project root directory to Python path to import tools module
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+from tools.merged_index import write_merged_index
+from tools.merged_schema import prepare_output_doc
+from tools.price_parquet import parquet_export_enabled, write_parquet_dataset
+from tools.price_snapshot import build_snapshot, snapshots_enabled
+from tools.price_sqlite import convert_jsonl_to_sqlite, use_sqlite_backend
+
 
 def convert_a_stock_to_jsonl(
     csv_path: str = "daily_prices_sse_50.csv",
@@ -105,10 +116,32 @@ def convert_a_stock_to_jsonl(
                 "Time Series (Daily)": time_series,
             }
 
-            # Write to JSONL file
-            fout.write(json.dumps(json_obj, ensure_ascii=False) + "\n")
+            # Write to JSONL file (normalized schema with typed values when MERGED_SCHEMA_VERSION=2)
+            fout.write(json.dumps(prepare_output_doc(json_obj), ensure_ascii=False) + "\n")
+
+    # Byte-offset index so price lookups can seek straight to one symbol
+    index_path = write_merged_index(output_path)
 
     print(f"✅ Data conversion completed: {output_path}")
+    print(f"✅ Symbol index written: {index_path}")
+
+    # Optional Parquet dataset partitioned by market/year (MERGED_PARQUET_EXPORT=1, requires pyarrow)
+    if parquet_export_enabled():
+        parquet_root = write_parquet_dataset(output_path, market="cn")
+        if parquet_root is not None:
+            print(f"✅ Parquet dataset written: {parquet_root}")
+
+    # Rebuild merged.sqlite when it is the configured backend; a stale database is ignored
+    if use_sqlite_backend():
+        db_path = convert_jsonl_to_sqlite(output_path)
+        if db_path is not None:
+            print(f"✅ SQLite database written: {db_path}")
+
+    # Rebuild the warm-start snapshot (skipped when PRICE_SNAPSHOT=0); price reads never write it
+    if snapshots_enabled():
+        snapshot_path = build_snapshot(output_path)
+        if snapshot_path is not None:
+            print(f"✅ Price snapshot written: {snapshot_path}")
     print(f"✅ Total stocks: {len(grouped)}")
     print(f"✅ File size: {output_path.stat().st_size / 1024 / 1024:.2f} MB")
 
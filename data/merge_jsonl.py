@@ -1,6 +1,17 @@
 import glob
 import json
 import os
+import sys
+
+# 将项目根目录加入 Python 路径，以便导入 tools 模块
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+from tools.merged_index import write_merged_index
+from tools.merged_schema import prepare_output_doc
+from tools.price_parquet import parquet_export_enabled, write_parquet_dataset
+from tools.price_snapshot import build_snapshot, snapshots_enabled
+from tools.price_sqlite import convert_jsonl_to_sqlite, use_sqlite_backend
 
 all_nasdaq_100_symbols = [
     "NVDA",
@@ -153,4 +164,20 @@ with open(output_file, "w", encoding="utf-8") as fout:
             # 若结构异常则原样写入
             pass
 
-        fout.write(json.dumps(data, ensure_ascii=False) + "\n")
+        # MERGED_SCHEMA_VERSION=2 时写出规范化格式（数值类型化），默认保持原格式
+        fout.write(json.dumps(prepare_output_doc(data), ensure_ascii=False) + "\n")
+
+# 写入 merged.idx：symbol -> (字节偏移, 行长度)，供价格工具直接 seek
+write_merged_index(output_file)
+
+# MERGED_PARQUET_EXPORT=1 时额外导出按 market/year 分区的 Parquet 数据集（需要 pyarrow）
+if parquet_export_enabled():
+    write_parquet_dataset(output_file, market="us")
+
+# PRICE_BACKEND=sqlite 时重建 merged.sqlite，否则数据库与新的 merged.jsonl 不一致会被忽略
+if use_sqlite_backend():
+    convert_jsonl_to_sqlite(output_file)
+
+# 重建热启动快照（PRICE_SNAPSHOT=0 时跳过），读取价格时不会再写快照
+if snapshots_enabled():
+    build_snapshot(output_file)
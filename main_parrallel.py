@@ -168,7 +168,20 @@ async def _run_model_in_current_process(AgentClass, model_config, INIT_DATE, END
     print("=" * 60)
 
 
-async def _spawn_model_subprocesses(config_path, enabled_models):
+async def _spawn_model_subprocesses(config_path, enabled_models, market="us"):
+    from tools.price_tools import get_merged_file_path
+    from tools.shared_cube import SHARED_CUBES_ENV, publish_price_cubes, release_blocks
+
+    # Load prices once and share them with all model subprocesses
+    shared_cubes, blocks = publish_price_cubes([get_merged_file_path(market)])
+    child_env = dict(os.environ, **{SHARED_CUBES_ENV: shared_cubes})
+    try:
+        await _run_model_subprocesses(config_path, enabled_models, child_env)
+    finally:
+        release_blocks(blocks)
+
+
+async def _run_model_subprocesses(config_path, enabled_models, child_env):
     tasks = []
     python_exec = sys.executable
     this_file = str(Path(__file__).resolve())
@@ -181,7 +194,7 @@ async def _spawn_model_subprocesses(config_path, enabled_models):
             cmd.append(str(config_path))
         cmd.extend(["--signature", signature])
         print(f"🧩 Spawning subprocess for signature='{signature}': {' '.join(cmd)}")
-        proc = await asyncio.create_subprocess_exec(*cmd)
+        proc = await asyncio.create_subprocess_exec(*cmd, env=child_env)
         tasks.append(proc.wait())
     if not tasks:
         return
@@ -258,7 +271,7 @@ async def main(config_path=None, only_signature: str | None = None):
         print("🎉 All models processing completed!")
     else:
         print("⚡ Multiple models enabled; running them in parallel using subprocesses...")
-        await _spawn_model_subprocesses(config_path, enabled_models)
+        await _spawn_model_subprocesses(config_path, enabled_models, config.get("market", "us"))
         print("🎉 All model subprocesses completed!")
 
 
@@ -14,7 +14,8 @@ from typing import Dict, List, Optional
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 from tools.general_tools import get_config_value
-from tools.price_tools import (all_nasdaq_100_symbols, all_sse_50_symbols,
+from tools.index_constituents import get_universe
+from tools.price_tools import (ASOF_MAX_STALENESS,
                                format_price_dict_with_names, get_open_prices,
                                get_today_init_position, get_yesterday_date,
                                get_yesterday_open_and_close_price,
@@ -66,13 +67,13 @@ def get_agent_system_prompt(
     print(f"today_date: {today_date}")
     print(f"market: {market}")
 
-    # Auto-select stock symbols based on market if not provided
+    # Auto-select stock symbols based on market if not provided: index members as of today_date
     if stock_symbols is None:
-        stock_symbols = all_sse_50_symbols if market == "cn" else all_nasdaq_100_symbols
+        stock_symbols = get_universe(market, today_date)
 
     # Get yesterday's buy and sell prices
     yesterday_buy_prices, yesterday_sell_prices = get_yesterday_open_and_close_price(
-        today_date, stock_symbols, market=market
+        today_date, stock_symbols, market=market, max_staleness=ASOF_MAX_STALENESS
     )
     today_buy_price = get_open_prices(today_date, stock_symbols, market=market)
     today_init_position = get_today_init_position(today_date, signature)
@@ -19,11 +19,13 @@ from typing import Dict, List, Optional
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 from tools.general_tools import get_config_value
-from tools.price_tools import (all_sse_50_symbols,
+from tools.index_constituents import get_universe
+from tools.price_tools import (ASOF_MAX_STALENESS,
                                format_price_dict_with_names, get_open_prices,
                                get_today_init_position, get_yesterday_date,
                                get_yesterday_open_and_close_price,
                                get_yesterday_profit)
+from tools.symbol_registry import get_symbol_registry
 
 STOP_SIGNAL = "<FINISH_SIGNAL>"
 
@@ -54,6 +56,7 @@ agent_system_prompt_astock = """
    - 你只能卖出在今天之前购买的股票
    - 如果你今天买入100股600519.SH，必须等到明天才能卖出
    - 你仍然可以卖出之前持有的股票
+   - 可调用 get_sellable_positions() 一次查看今日每只股票的可卖出股数
 
 3. **涨跌停限制**: 
    - 普通股票：±10%
@@ -98,13 +101,13 @@ def get_agent_system_prompt_astock(today_date: str, signature: str, stock_symbol
     print(f"today_date: {today_date}")
     print(f"market: cn (A-shares)")
 
-    # 默认使用上证50成分股
+    # 默认使用当日的上证50成分股
     if stock_symbols is None:
-        stock_symbols = all_sse_50_symbols
+        stock_symbols = get_universe("cn", today_date)
 
     # 获取昨日买入和卖出价格，硬编码market="cn"
     yesterday_buy_prices, yesterday_sell_prices = get_yesterday_open_and_close_price(
-        today_date, stock_symbols, market="cn"
+        today_date, stock_symbols, market="cn", max_staleness=ASOF_MAX_STALENESS
     )
     today_buy_price = get_open_prices(today_date, stock_symbols, market="cn")
     today_init_position = get_today_init_position(today_date, signature)
@@ -113,8 +116,9 @@ def get_agent_system_prompt_astock(today_date: str, signature: str, stock_symbol
     )
 
     # A股市场显示中文股票名称
-    yesterday_sell_prices_display = format_price_dict_with_names(yesterday_sell_prices, market="cn")
-    today_buy_price_display = format_price_dict_with_names(today_buy_price, market="cn")
+    name_map = get_symbol_registry().names("cn")
+    yesterday_sell_prices_display = format_price_dict_with_names(yesterday_sell_prices, market="cn", name_map=name_map)
+    today_buy_price_display = format_price_dict_with_names(today_buy_price, market="cn", name_map=name_map)
 
     return agent_system_prompt_astock.format(
         date=today_date,
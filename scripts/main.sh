@@ -18,6 +18,7 @@ cd data
 python get_daily_price.py
 python merge_jsonl.py
 cd ..
+python tools/price_cube.py --market us
 
 echo "🔧 Now starting MCP services..."
 cd agent_tools
@@ -18,3 +18,5 @@ python merge_jsonl_alphavantage.py
 # python merge_jsonl_tushare.py
 
 cd ..
+# 构建内存映射价格立方体
+python ../tools/price_cube.py --market cn
@@ -13,3 +13,4 @@ cd data
 python get_interdaily_price.py #run interdaily price data
 python merge_jsonl.py
 cd ..
+python tools/price_cube.py --market us #build memory-mapped price cube
@@ -0,0 +1,89 @@
+"""
+Look-ahead checks of the daily price tools on hourly-only merged.jsonl data.
+
+Daily bars are then aggregated from 60-minute bars; with an intraday
+TODAY_DATE they may only use the hours before it, and only the open of the
+current day is shown.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agent_tools import tool_get_price_local
+
+HOURS = ["10:00:00", "11:00:00", "12:00:00", "13:00:00", "14:00:00", "15:00:00"]
+
+
+def _hourly_bars(day: str, base: float):
+    bars = {}
+    for i, hour in enumerate(HOURS):
+        price = base + i
+        bars[f"{day} {hour}"] = {
+            "1. buy price": f"{price:.4f}",
+            "2. high": f"{price + 0.5:.4f}",
+            "3. low": f"{price - 0.5:.4f}",
+            "4. sell price": f"{price + 0.25:.4f}",
+            "5. volume": "1000",
+        }
+    return bars
+
+
+@pytest.fixture
+def hourly_data(tmp_path, monkeypatch):
+    merged = tmp_path / "merged.jsonl"
+    series = {**_hourly_bars("2025-10-30", 200.0), **_hourly_bars("2025-10-29", 100.0)}
+    doc = {
+        "Meta Data": {"2. Symbol": "AAPL", "3. Last Refreshed": "2025-10-30 15:00:00", "4. Interval": "60min"},
+        "Time Series (60min)": dict(sorted(series.items(), reverse=True)),
+    }
+    merged.write_text(json.dumps(doc) + "\n", encoding="utf-8")
+    monkeypatch.setattr(tool_get_price_local, "_workspace_data_path", lambda filename, symbol=None: merged)
+    monkeypatch.setenv("PRICE_BACKEND", "jsonl")
+
+    runtime_env = tmp_path / "runtime_env.json"
+    monkeypatch.setenv("RUNTIME_ENV_PATH", str(runtime_env))
+
+    def set_today(today_date: str) -> None:
+        runtime_env.write_text(json.dumps({"TODAY_DATE": today_date}), encoding="utf-8")
+
+    return merged, set_today
+
+
+def test_resampled_daily_bar_stops_before_today_date(hourly_data):
+    merged, _ = hourly_data
+    bar = tool_get_price_local._resampled_daily_bar(merged, "AAPL", "2025-10-30", before="2025-10-30 12:00:00")
+    # 只聚合 10:00 和 11:00 两根 bar
+    assert bar == {"open": 200.0, "high": 201.5, "low": 199.5, "close": 201.25, "volume": 2000}
+
+
+@pytest.mark.parametrize("today_date", ["2025-10-30 10:00:00", "2025-10-30 12:00:00"])
+def test_daily_price_masks_current_day_in_hourly_run(hourly_data, today_date):
+    _, set_today = hourly_data
+    set_today(today_date)
+
+    ohlcv = tool_get_price_local.get_price_local_daily("AAPL", "2025-10-30")["ohlcv"]
+    assert ohlcv["open"] == 200.0
+    for field in ("high", "low", "close", "volume"):
+        assert isinstance(ohlcv[field], str)
+
+    result = tool_get_price_local.get_prices_batch.fn(["AAPL"], "2025-10-30")
+    assert result["rows"] == [["AAPL", 200.0, None, None, None, None]]
+
+
+def test_daily_price_of_previous_day_in_hourly_run(hourly_data):
+    _, set_today = hourly_data
+    set_today("2025-10-30 12:00:00")
+
+    ohlcv = tool_get_price_local.get_price_local_daily("AAPL", "2025-10-29")["ohlcv"]
+    assert ohlcv == {"open": 100.0, "high": 105.5, "low": 99.5, "close": 105.25, "volume": 6000}
+
+    result = tool_get_price_local.get_prices_batch.fn(["AAPL"], "2025-10-29")
+    assert result["rows"] == [["AAPL", 100.0, 105.5, 99.5, 105.25, 6000]]
+    assert "error" in tool_get_price_local.get_prices_batch.fn(["AAPL"], "2025-10-31")
@@ -0,0 +1,74 @@
+"""
+Vectorized "as-of" lookups on symbol x timestamp grids.
+
+An AsofIndex keeps the valid (row, col) cells of a grid as one sorted int64
+array of composite keys ``row * n_cols + col``. The most recent valid cell at
+or before a column is then a single ``np.searchsorted`` for all rows at once,
+with an optional maximum staleness measured in columns (bars).
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+
+
+class AsofIndex:
+    """Sorted index of valid cells supporting vectorized as-of lookups.
+
+    Attributes:
+        n_cols: Number of columns (timestamps) of the indexed grid
+        keys: Ascending int64 array of ``row * n_cols + col`` for every valid cell
+    """
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, n_cols: int):
+        self.n_cols = int(n_cols)
+        keys = np.asarray(rows, dtype=np.int64) * self.n_cols + np.asarray(cols, dtype=np.int64)
+        if keys.size > 1 and np.any(keys[1:] < keys[:-1]):
+            keys = np.sort(keys)
+        self.keys = keys
+
+    @classmethod
+    def from_mask(cls, valid: np.ndarray) -> "AsofIndex":
+        """Build the index from a (n_rows, n_cols) boolean array of valid cells."""
+        valid = np.asarray(valid, dtype=bool)
+        # C 顺序下 flatnonzero 的结果正好是 row * n_cols + col 的升序
+        index = cls.__new__(cls)
+        index.n_cols = valid.shape[1]
+        index.keys = np.flatnonzero(valid).astype(np.int64)
+        return index
+
+    def lookup(
+        self,
+        rows: np.ndarray,
+        cols: Union[int, np.ndarray],
+        max_staleness: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return the latest valid column at or before cols for every row.
+
+        Args:
+            rows: Row indices; negative entries (unknown symbols) never match
+            cols: Column to look up from, a scalar or one per row; -1 means
+                before the first column
+            max_staleness: Maximum distance in columns between the requested
+                and the returned column, None for no limit
+
+        Returns:
+            int64 array aligned with rows holding the source column, -1 where
+            no valid cell is found within the staleness limit
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.broadcast_to(np.asarray(cols, dtype=np.int64), rows.shape)
+        out = np.full(rows.shape, -1, dtype=np.int64)
+        if self.keys.size == 0 or rows.size == 0:
+            return out
+
+        queryable = (rows >= 0) & (cols >= 0)
+        pos = np.searchsorted(self.keys, rows * self.n_cols + cols, side="right") - 1
+        found = queryable & (pos >= 0)
+        keys = self.keys[np.where(found, pos, 0)]
+        found &= keys // self.n_cols == rows
+        source = keys % self.n_cols
+        if max_staleness is not None:
+            found &= cols - source <= max_staleness
+        out[found] = source[found]
+        return out
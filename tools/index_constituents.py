@@ -0,0 +1,292 @@
+"""
+Point-in-time index membership (SSE 50, NASDAQ 100, ...).
+
+``data/index_constituents.json`` maps each index member to its membership
+periods ``[start, end)`` (end null while still a member), built from dated
+constituent snapshots such as Tushare ``index_weight``. Periods are compiled
+into int32 start/end arrays, so "constituents as of date" is one vectorized
+comparison over all periods and stays fast for indexes with thousands of
+members.
+
+Dates before the first recorded snapshot are not covered; callers fall back to
+the static symbol lists in tools/price_tools.py there.
+
+Usage:
+    python tools/index_constituents.py import --index SSE50 index_weight.csv
+    python tools/index_constituents.py show --index SSE50 --date 2025-10-15
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+STORE_FORMAT_VERSION = 1
+INDEX_FOR_MARKET = {"us": "NASDAQ100", "cn": "SSE50"}
+# Tushare 指数代码 -> 指数名称
+TUSHARE_INDEX_CODES = {"000016.SH": "SSE50"}
+
+_OPEN_END = 99999999
+_CACHE_SIZE = 256
+
+
+def _date_key(date: str) -> int:
+    """"YYYY-MM-DD[ HH:MM:SS]" or "YYYYMMDD" -> int YYYYMMDD."""
+    return int(date[:10].replace("-", ""))
+
+
+def _iso(date: str) -> str:
+    """Normalize "YYYYMMDD" or "YYYY-MM-DD..." to "YYYY-MM-DD"."""
+    date = str(date)
+    return f"{date[:4]}-{date[4:6]}-{date[6:8]}" if "-" not in date else date[:10]
+
+
+def get_constituents_path() -> Path:
+    """Return the path of the index constituent store."""
+    return Path(project_root) / "data" / "index_constituents.json"
+
+
+class IndexConstituentStore:
+    """Membership periods per index with vectorized as-of queries.
+
+    On disk, each index is stored as
+        {"first": first snapshot date, "as_of": last snapshot date,
+         "periods": {symbol: [[start, end or null], ...]}}
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._indices: Dict[str, Dict] = {}
+        self._compiled: Dict[str, Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._cache: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+        self._file_state: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Reload the store if the file changed since the last load."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        state = (st.st_mtime_ns, st.st_size)
+        if state == self._file_state:
+            return
+        with self._lock:
+            if state != self._file_state:
+                with self.path.open("r", encoding="utf-8") as f:
+                    doc = json.load(f)
+                self._indices = doc.get("indices", {})
+                self._compiled = {}
+                self._cache.clear()
+                self._file_state = state
+
+    def save(self) -> Path:
+        """Write the store, via a temporary file renamed into place."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({"version": STORE_FORMAT_VERSION, "indices": self._indices}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        st = os.stat(self.path)
+        self._file_state = (st.st_mtime_ns, st.st_size)
+        return self.path
+
+    def indices(self) -> List[str]:
+        """Return the names of the indexes with recorded membership."""
+        self.refresh()
+        return list(self._indices)
+
+    def coverage(self, index: str) -> Optional[Tuple[str, str]]:
+        """Return (first snapshot date, last snapshot date) of index, or None if unknown."""
+        self.refresh()
+        entry = self._indices.get(index)
+        if not entry:
+            return None
+        return entry["first"], entry["as_of"]
+
+    def add_snapshot(self, index: str, date: str, members: Iterable[str]) -> None:
+        """Record the full member list of index on date.
+
+        Snapshots must be added in chronological order; members missing from a
+        snapshot get their open period closed at date.
+
+        Raises:
+            ValueError: If date is before the last recorded snapshot of index
+        """
+        self.refresh()
+        date = _iso(date)
+        members = set(members)
+        entry = self._indices.setdefault(index, {"first": date, "as_of": date, "periods": {}})
+        if date < entry["as_of"]:
+            raise ValueError(f"Snapshot {date} for {index} is older than the last recorded snapshot {entry['as_of']}")
+
+        periods: Dict[str, List[List[Optional[str]]]] = entry["periods"]
+        for symbol, symbol_periods in periods.items():
+            if symbol_periods[-1][1] is None and symbol not in members:
+                symbol_periods[-1][1] = date
+        for symbol in members:
+            symbol_periods = periods.setdefault(symbol, [])
+            if not symbol_periods or symbol_periods[-1][1] is not None:
+                symbol_periods.append([date, None])
+        entry["as_of"] = date
+        self._compiled.pop(index, None)
+        self._cache.clear()
+
+    def _compile(self, index: str) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        compiled = self._compiled.get(index)
+        if compiled is None:
+            symbols: List[str] = []
+            ids: List[int] = []
+            starts: List[int] = []
+            ends: List[int] = []
+            # 按代码排序编号，查询结果按 id 顺序即为有序
+            for symbol, symbol_periods in sorted(self._indices[index]["periods"].items()):
+                symbols.append(symbol)
+                for start, end in symbol_periods:
+                    ids.append(len(symbols) - 1)
+                    starts.append(_date_key(start))
+                    ends.append(_date_key(end) if end is not None else _OPEN_END)
+            compiled = (
+                symbols,
+                np.asarray(ids, dtype=np.int32),
+                np.asarray(starts, dtype=np.int32),
+                np.asarray(ends, dtype=np.int32),
+            )
+            self._compiled[index] = compiled
+        return compiled
+
+    def constituents(self, index: str, date: str) -> Optional[List[str]]:
+        """Return the members of index on date, sorted.
+
+        Returns:
+            List of symbols, or None if index is unknown or date is before its first snapshot
+        """
+        self.refresh()
+        entry = self._indices.get(index)
+        if not entry or date[:10] < entry["first"]:
+            return None
+        key = (index, _date_key(date))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return list(cached)
+
+        symbols, ids, starts, ends = self._compile(index)
+        day = key[1]
+        active = np.unique(ids[(starts <= day) & (ends > day)])
+        members = [symbols[i] for i in active.tolist()]
+        with self._lock:
+            self._cache[key] = members
+            while len(self._cache) > _CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return list(members)
+
+    def periods(self, index: str, symbol: str) -> List[Tuple[str, Optional[str]]]:
+        """Return the membership periods [start, end) of symbol in index; end is None while still a member."""
+        self.refresh()
+        entry = self._indices.get(index, {})
+        return [tuple(period) for period in entry.get("periods", {}).get(symbol, [])]
+
+    def is_member(self, index: str, symbol: str, date: str) -> bool:
+        """Return True if symbol belongs to index on date."""
+        day = date[:10]
+        return any(start <= day and (end is None or day < end) for start, end in self.periods(index, symbol))
+
+
+_store: Optional[IndexConstituentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_constituent_store() -> IndexConstituentStore:
+    """Return the process-wide IndexConstituentStore."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IndexConstituentStore(get_constituents_path())
+    return _store
+
+
+def static_universe(market: str) -> List[str]:
+    """Return the hard-coded index list of market from tools/price_tools.py."""
+    from tools.price_tools import all_nasdaq_100_symbols, all_sse_50_symbols
+
+    return all_sse_50_symbols if market == "cn" else all_nasdaq_100_symbols
+
+
+def get_universe(market: str, date: str, fallback: Optional[Sequence[str]] = None) -> List[str]:
+    """Return the index universe of market (NASDAQ 100 / SSE 50) as of date.
+
+    Args:
+        market: Market type ("us" or "cn")
+        date: Trading date or timestamp
+        fallback: Symbols used when the store does not cover date; the static
+            list of tools/price_tools.py if None
+
+    Returns:
+        List of symbols
+    """
+    members = get_constituent_store().constituents(INDEX_FOR_MARKET[market], date)
+    if members is not None:
+        return members
+    return list(static_universe(market) if fallback is None else fallback)
+
+
+def add_index_weight_frame(df, index: Optional[str] = None, store: Optional[IndexConstituentStore] = None) -> int:
+    """Record Tushare index_weight rows (index_code, con_code, trade_date, weight) as snapshots.
+
+    Snapshots not newer than the store's last snapshot of the index are skipped.
+
+    Returns:
+        Number of snapshots added
+    """
+    store = store or get_constituent_store()
+    added = 0
+    for index_code, by_index in df.groupby("index_code"):
+        name = index or TUSHARE_INDEX_CODES.get(index_code, index_code)
+        coverage = store.coverage(name)
+        for trade_date, rows in sorted(by_index.groupby("trade_date"), key=lambda item: str(item[0])):
+            date = _iso(trade_date)
+            if coverage is not None and date <= coverage[1]:
+                continue
+            store.add_snapshot(name, date, rows["con_code"].tolist())
+            added += 1
+    if added:
+        store.save()
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Point-in-time index constituent store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_parser = sub.add_parser("import", help="Import a Tushare index_weight CSV")
+    import_parser.add_argument("csv")
+    import_parser.add_argument("--index", default=None, help="Index name, derived from index_code if omitted")
+    show_parser = sub.add_parser("show", help="Print the constituents of an index on a date")
+    show_parser.add_argument("--index", required=True)
+    show_parser.add_argument("--date", required=True)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import pandas as pd
+
+        frame = pd.read_csv(args.csv, dtype={"trade_date": str})
+        count = add_index_weight_frame(frame, index=args.index)
+        print(f"✅ Added {count} snapshots to {get_constituents_path()}")
+    else:
+        members = get_constituent_store().constituents(args.index, args.date)
+        if members is None:
+            print(f"⚠️  Warning: {args.index} has no recorded membership on {args.date}")
+        else:
+            print(f"{args.index} {args.date}: {len(members)} members")
+            print(", ".join(members))
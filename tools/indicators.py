@@ -0,0 +1,311 @@
+"""
+Vectorized technical indicators over the symbol x timestamp PriceCube.
+
+Every indicator is computed for the whole universe at once: each time step is a
+NumPy operation over all symbols. Inputs are forward-filled along time so that a
+missing bar does not break a rolling window; values before a symbol's first bar
+stay NaN.
+
+Results are cached per (market, indicator, params, as-of timestamp) and only use
+bars strictly before the as-of timestamp, so a snapshot taken at TODAY_DATE
+never sees today's (or any later) bar.
+"""
+
+import math
+import os
+import sys
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.trading_calendar import INTRADAY, timestamp_resolution
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def ffill(values: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs along the time axis (axis 1)."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = values[np.arange(values.shape[0])[:, None], idx]
+    # 首个有效值之前保持 NaN
+    filled[~np.logical_or.accumulate(valid, axis=1)] = np.nan
+    return filled
+
+
+def _shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    out = np.full_like(values, np.nan)
+    if periods < values.shape[1]:
+        out[:, periods:] = values[:, :-periods]
+    return out
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the last ``window`` columns; NaN until a full window is available."""
+    out = np.full_like(values, np.nan)
+    if window > values.shape[1]:
+        return out
+    csum = np.cumsum(np.nan_to_num(values), axis=1)
+    count = np.cumsum(~np.isnan(values), axis=1)
+    csum = np.concatenate([np.zeros((values.shape[0], 1)), csum], axis=1)
+    count = np.concatenate([np.zeros((values.shape[0], 1), dtype=count.dtype), count], axis=1)
+    total = csum[:, window:] - csum[:, :-window]
+    n = count[:, window:] - count[:, :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[:, window - 1:] = np.where(n == window, total / window, np.nan)
+    return out
+
+
+def _rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Sample standard deviation of the last ``window`` columns."""
+    mean = _rolling_mean(values, window)
+    mean_sq = _rolling_mean(values * values, window)
+    with np.errstate(invalid="ignore"):
+        var = (mean_sq - mean * mean) * window / max(window - 1, 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def _ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """Recursive exponential average seeded with each symbol's first valid value."""
+    out = np.full_like(values, np.nan)
+    state = np.full(values.shape[0], np.nan)
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        state = np.where(np.isnan(state), x, np.where(np.isnan(x), state, alpha * x + (1 - alpha) * state))
+        out[:, t] = state
+    return out
+
+
+def sma(cube_slice: Dict[str, np.ndarray], window: int = 20) -> Dict[str, np.ndarray]:
+    """Simple moving average of close."""
+    return {"sma": _rolling_mean(cube_slice["close"], int(window))}
+
+
+def ema(cube_slice: Dict[str, np.ndarray], span: int = 20) -> Dict[str, np.ndarray]:
+    """Exponential moving average of close with alpha = 2 / (span + 1)."""
+    return {"ema": _ewm(cube_slice["close"], 2.0 / (int(span) + 1))}
+
+
+def rsi(cube_slice: Dict[str, np.ndarray], window: int = 14) -> Dict[str, np.ndarray]:
+    """Wilder's relative strength index of close."""
+    close = cube_slice["close"]
+    delta = close - _shift(close)
+    alpha = 1.0 / int(window)
+    avg_gain = _ewm(np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)), alpha)
+    avg_loss = _ewm(np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)), alpha)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    value = np.where((avg_loss == 0) & (avg_gain > 0), 100.0, value)
+    value = np.where((avg_loss == 0) & (avg_gain == 0), 50.0, value)
+    # 前 window 根 bar 的结果不稳定，置为 NaN
+    value[:, : int(window)] = np.nan
+    return {"rsi": value}
+
+
+def macd(cube_slice: Dict[str, np.ndarray], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line (fast EMA - slow EMA), its signal EMA and the histogram."""
+    close = cube_slice["close"]
+    line = _ewm(close, 2.0 / (int(fast) + 1)) - _ewm(close, 2.0 / (int(slow) + 1))
+    signal_line = _ewm(line, 2.0 / (int(signal) + 1))
+    return {"macd": line, "signal": signal_line, "hist": line - signal_line}
+
+
+def atr(cube_slice: Dict[str, np.ndarray], window: int = 14) -> Dict[str, np.ndarray]:
+    """Wilder's average true range."""
+    high, low, close = cube_slice["high"], cube_slice["low"], cube_slice["close"]
+    prev_close = _shift(close)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    value = _ewm(true_range, 1.0 / int(window))
+    value[:, : int(window) - 1] = np.nan
+    return {"atr": value}
+
+
+def realized_vol(
+    cube_slice: Dict[str, np.ndarray], window: int = 20, annualize: bool = True, bars_per_year: float = TRADING_DAYS_PER_YEAR
+) -> Dict[str, np.ndarray]:
+    """Rolling standard deviation of log returns of close, optionally annualized."""
+    close = cube_slice["close"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_ret = np.log(close / _shift(close))
+    value = _rolling_std(log_ret, int(window))
+    if annualize:
+        value = value * math.sqrt(bars_per_year)
+    return {"realized_vol": value}
+
+
+INDICATORS: Dict[str, Tuple[Callable[..., Dict[str, np.ndarray]], Dict[str, Any]]] = {
+    "sma": (sma, {"window": 20}),
+    "ema": (ema, {"span": 20}),
+    "rsi": (rsi, {"window": 14}),
+    "macd": (macd, {"fast": 12, "slow": 26, "signal": 9}),
+    "atr": (atr, {"window": 14}),
+    "realized_vol": (realized_vol, {"window": 20, "annualize": True}),
+}
+
+
+def _bars_per_year(timestamps: Sequence[str]) -> float:
+    """Annualization factor: 252 for daily bars, 252 x average bars per day for intraday bars."""
+    if not timestamps or timestamp_resolution(timestamps[-1]) != INTRADAY:
+        return TRADING_DAYS_PER_YEAR
+    days = len({ts[:10] for ts in timestamps})
+    return TRADING_DAYS_PER_YEAR * len(timestamps) / max(days, 1)
+
+
+def _validate_params(name: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Check the indicator name and return params with every value coerced to its default's type.
+
+    Window/span parameters must be integers >= 1; boolean flags (annualize) must be booleans.
+
+    Raises:
+        ValueError: For an unknown indicator, an unknown parameter or an invalid value
+    """
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator '{name}'. Valid indicators: {sorted(INDICATORS)}")
+    _, defaults = INDICATORS[name]
+    params = params or {}
+    if not isinstance(params, dict):
+        raise ValueError(f"params must be a dict of {sorted(defaults)}")
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {name}: {sorted(unknown)}. Valid parameters: {sorted(defaults)}")
+
+    validated: Dict[str, Any] = {}
+    for key, value in params.items():
+        if isinstance(defaults[key], bool):
+            if not isinstance(value, bool):
+                raise ValueError(f"Parameter '{key}' of {name} must be true or false, got {value!r}")
+            validated[key] = value
+            continue
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            number = None
+        if isinstance(value, bool) or number is None or number < 1:
+            raise ValueError(f"Parameter '{key}' of {name} must be an integer >= 1, got {value!r}")
+        validated[key] = number
+    return validated
+
+
+def compute_indicator(cube, name: str, params: Optional[Dict[str, Any]] = None, as_of: Optional[str] = None):
+    """Compute an indicator for every symbol in a PriceCube.
+
+    Args:
+        cube: PriceCube from tools.price_tools.get_price_cube
+        name: Indicator name, one of INDICATORS
+        params: Overrides for the indicator's default parameters
+        as_of: Only bars strictly before this timestamp are used; all bars if None
+
+    Returns:
+        (timestamps, {output: array of shape (n_symbols, len(timestamps))})
+
+    Raises:
+        ValueError: For an unknown indicator or parameter, or a window/span below 1
+    """
+    params = _validate_params(name, params)
+    func, defaults = INDICATORS[name]
+    kwargs = {**defaults, **params}
+
+    end = len(cube.timestamps) if as_of is None else bisect_left(cube.timestamps, as_of)
+    timestamps = cube.timestamps[:end]
+    if name == "realized_vol":
+        kwargs["bars_per_year"] = _bars_per_year(timestamps)
+    needed = ("high", "low", "close") if name == "atr" else ("close",)
+    cube_slice = {field: ffill(cube.field(field)[:, :end]) for field in needed}
+    return timestamps, func(cube_slice, **kwargs)
+
+
+_CACHE_SIZE = 128
+_snapshots: "OrderedDict[Tuple, Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def get_indicator_snapshot(
+    market: str,
+    name: str,
+    params: Optional[Dict[str, Any]] = None,
+    as_of: Optional[str] = None,
+    merged_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Latest indicator values for the whole universe as of a timestamp.
+
+    Cached per (market, indicator, params, as_of); a cache entry is dropped
+    when merged.jsonl is reloaded.
+
+    Args:
+        market: Market type ("us" or "cn")
+        name: Indicator name, one of INDICATORS
+        params: Overrides for the indicator's default parameters
+        as_of: Only bars strictly before this timestamp are used (normally TODAY_DATE)
+        merged_path: Optional custom merged.jsonl path
+
+    Returns:
+        {"as_of_bar": last bar used or None, "symbols": [...], "values": {output: float64 array aligned with symbols}}
+    """
+    from tools.price_tools import get_price_cube
+
+    # 先校验并规范化参数，缓存键只含可哈希的 int/bool
+    params = _validate_params(name, params)
+    cube = get_price_cube(market, merged_path=merged_path)
+    if cube is None:
+        raise FileNotFoundError(f"No price data found for market '{market}'")
+
+    key = (market, merged_path, name, tuple(sorted(params.items())), as_of)
+    cached = _snapshots.get(key)
+    if cached is not None and cached[0] is cube:
+        with _snapshots_lock:
+            _snapshots.move_to_end(key)
+        return cached[1]
+
+    timestamps, outputs = compute_indicator(cube, name, params, as_of)
+    snapshot = {
+        "as_of_bar": timestamps[-1] if timestamps else None,
+        "symbols": cube.symbols,
+        "values": {
+            output: (values[:, -1].copy() if timestamps else np.full(len(cube.symbols), np.nan))
+            for output, values in outputs.items()
+        },
+    }
+    with _snapshots_lock:
+        _snapshots[key] = (cube, snapshot)
+        _snapshots.move_to_end(key)
+        while len(_snapshots) > _CACHE_SIZE:
+            _snapshots.popitem(last=False)
+    return snapshot
+
+
+def indicator_table(snapshot: Dict[str, Any], symbols: Optional[List[str]] = None, digits: int = 4) -> Dict[str, Any]:
+    """Format a snapshot as {"columns", "rows", "missing"} for tool output.
+
+    Args:
+        snapshot: Result of get_indicator_snapshot
+        symbols: Symbols to include in order, all symbols if None
+        digits: Rounding applied to the values
+
+    Returns:
+        Compact table; NaN values become None
+    """
+    index = {s: i for i, s in enumerate(snapshot["symbols"])}
+    outputs = list(snapshot["values"])
+    wanted = snapshot["symbols"] if symbols is None else list(dict.fromkeys(symbols))
+    rows = []
+    missing = []
+    for symbol in wanted:
+        i = index.get(symbol)
+        if i is None:
+            missing.append(symbol)
+            continue
+        row = [symbol]
+        for output in outputs:
+            value = float(snapshot["values"][output][i])
+            row.append(None if math.isnan(value) else round(value, digits))
+        rows.append(row)
+    return {"columns": ["symbol"] + outputs, "rows": rows, "missing": missing}
@@ -0,0 +1,210 @@
+"""
+Group-commit appender for position.jsonl files.
+
+A LedgerWriter keeps one O_APPEND descriptor per file instead of opening and
+closing the file for every record. Each write() lands in the file immediately,
+so other processes reading after the position lock is released see it;
+durability is decided by POSITION_FSYNC:
+
+* ``none`` (default): never fsync; the OS flushes the page cache on its own
+  schedule and a machine crash can lose recent records.
+* ``per-commit``: sync() returns once the written records are on disk. Callers
+  that write while others are syncing join the next fsync, so concurrent
+  orders share one fsync per commit window instead of paying one each.
+* ``interval``: sync() returns immediately; a background thread fsyncs every
+  file with unsynced writes each POSITION_FSYNC_INTERVAL_MS milliseconds
+  (default 100), bounding the loss window, and once more at interpreter exit.
+
+A file replaced by compaction or deleted is detected on the next write and
+reopened.
+"""
+
+import atexit
+import errno
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+FSYNC_MODES = ("none", "per-commit", "interval")
+
+
+def get_fsync_mode() -> str:
+    """Durability mode of position.jsonl appends (POSITION_FSYNC, default "none")."""
+    mode = os.getenv("POSITION_FSYNC", "none").strip().lower()
+    return mode if mode in FSYNC_MODES else "none"
+
+
+def get_fsync_interval() -> float:
+    """Seconds between background fsyncs in "interval" mode (POSITION_FSYNC_INTERVAL_MS, default 100)."""
+    try:
+        return max(1, int(os.getenv("POSITION_FSYNC_INTERVAL_MS", "100"))) / 1000
+    except ValueError:
+        return 0.1
+
+
+class LedgerWriter:
+    """Appender of one file with grouped fsyncs.
+
+    write() returns a commit sequence number; sync(seq) waits until every write
+    up to seq is durable according to the fsync mode. Only one fsync runs at a
+    time, and it covers everything written before it started.
+
+    Attributes:
+        path: Path of the appended file
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._write_lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._written = 0
+        self._synced = 0
+        self._sync_cond = threading.Condition()
+        self._syncing = False
+
+    def _open(self) -> int:
+        try:
+            st = os.stat(self.path)
+            file_id: Optional[Tuple[int, int]] = (st.st_dev, st.st_ino)
+        except OSError:
+            file_id = None
+        if self._fd is not None and file_id == self._file_id:
+            return self._fd
+
+        if self._fd is not None:
+            # 旧文件已被替换或删除：关闭前把尚未同步的写入落盘
+            if self._written > self._synced and get_fsync_mode() != "none":
+                os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        created = file_id is None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        st = os.fstat(self._fd)
+        self._file_id = (st.st_dev, st.st_ino)
+        if created and get_fsync_mode() != "none":
+            # 新建文件时同步目录项，否则崩溃后文件本身可能丢失
+            dir_fd = os.open(self.path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        return self._fd
+
+    def write(self, data: bytes) -> int:
+        """Append data with a single write.
+
+        Returns:
+            Commit sequence number to pass to sync()
+        """
+        with self._write_lock:
+            fd = self._open()
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            self._written += 1
+            seq = self._written
+        if get_fsync_mode() == "interval":
+            _start_interval_flusher()
+        return seq
+
+    def sync(self, seq: Optional[int] = None) -> None:
+        """Make the writes up to seq (all writes if None) durable.
+
+        Returns immediately unless POSITION_FSYNC is "per-commit", or when
+        called with seq None (used by the interval flusher and at exit) in any
+        mode other than "none".
+        """
+        mode = get_fsync_mode()
+        if mode == "none" or (mode == "interval" and seq is not None):
+            return
+        with self._sync_cond:
+            if seq is None:
+                seq = self._written
+            while self._synced < seq:
+                if self._syncing:
+                    # 另一个线程正在 fsync，结束后再看是否已覆盖本次写入
+                    self._sync_cond.wait()
+                    continue
+                self._syncing = True
+                with self._write_lock:
+                    fd, target = self._fd, self._written
+                self._sync_cond.release()
+                done = False
+                try:
+                    if fd is not None:
+                        try:
+                            os.fsync(fd)
+                        except OSError as e:
+                            # 描述符已因文件替换被关闭，关闭前已经 fsync 过
+                            if e.errno != errno.EBADF:
+                                raise
+                    done = True
+                finally:
+                    self._sync_cond.acquire()
+                    self._syncing = False
+                    if done:
+                        self._synced = max(self._synced, target)
+                    self._sync_cond.notify_all()
+
+    def pending(self) -> bool:
+        """True if some writes are not yet fsynced."""
+        return self._written > self._synced
+
+
+_writers: Dict[str, LedgerWriter] = {}
+_writers_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+
+
+def get_ledger_writer(path: Path) -> LedgerWriter:
+    """Return the process-wide LedgerWriter of path."""
+    key = str(Path(path).resolve())
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = LedgerWriter(path)
+    return writer
+
+
+def flush_all() -> None:
+    """fsync every file with unsynced writes (no-op when POSITION_FSYNC is "none")."""
+    for writer in list(_writers.values()):
+        if writer.pending():
+            try:
+                writer.sync()
+            except OSError as e:
+                print(f"⚠️  Warning: fsync of {writer.path} failed: {e}")
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(get_fsync_interval())
+        flush_all()
+
+
+def _start_interval_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _writers_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="ledger-fsync", daemon=True)
+            _flusher.start()
+
+
+def _reset_after_fork() -> None:
+    # 子进程不继承后台线程，描述符与未同步的写入归父进程管理
+    global _flusher, _writers_lock
+    _writers.clear()
+    _writers_lock = threading.Lock()
+    _flusher = None
+
+
+atexit.register(flush_all)
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,141 @@
+"""
+Byte-offset sidecar index for merged.jsonl.
+
+The merge scripts write ``merged.idx`` next to ``merged.jsonl``, mapping each
+symbol to the (offset, length) of its line, so a single symbol can be read
+with one seek instead of parsing every line before it.
+
+An index is used only while the source file has the size and mtime it was
+built for, and every line read through it is checked against the requested
+symbol, so a stale index falls back to a scan instead of returning wrong data.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from tools.merged_schema import doc_symbol
+
+INDEX_FORMAT_VERSION = 1
+
+
+def get_index_path(merged_file: Path) -> Path:
+    """Return the merged.idx path that sits next to a merged.jsonl file."""
+    return Path(merged_file).with_suffix(".idx")
+
+
+def _line_symbol(line: bytes) -> Optional[str]:
+    try:
+        doc = json.loads(line)
+    except ValueError:
+        return None
+    return doc_symbol(doc)
+
+
+def write_merged_index(merged_file: Path) -> Path:
+    """Scan merged_file once and write its merged.idx sidecar.
+
+    Args:
+        merged_file: Path to merged.jsonl
+
+    Returns:
+        Path to the written index file
+    """
+    merged_file = Path(merged_file)
+    symbols: Dict[str, Tuple[int, int]] = {}
+    offset = 0
+    with merged_file.open("rb") as f:
+        source_mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        for line in f:
+            symbol = _line_symbol(line) if line.strip() else None
+            if symbol:
+                symbols[symbol] = (offset, len(line))
+            offset += len(line)
+
+    index = {
+        "version": INDEX_FORMAT_VERSION,
+        "source": merged_file.name,
+        "source_size": offset,
+        "source_mtime_ns": source_mtime_ns,
+        "symbols": symbols,
+    }
+    index_path = get_index_path(merged_file)
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+_indexes: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_indexes_lock = threading.Lock()
+
+
+def _load_index(merged_file: Path) -> Optional[Dict[str, Any]]:
+    """Return the parsed index for merged_file if present and built for its current size and mtime."""
+    index_path = get_index_path(merged_file)
+    try:
+        st = os.stat(index_path)
+        source_st = os.stat(merged_file)
+    except OSError:
+        return None
+
+    state = (st.st_mtime_ns, st.st_size)
+    cached = _indexes.get(index_path)
+    if cached is not None and cached[0] == state:
+        index = cached[1]
+    else:
+        try:
+            with index_path.open("r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with _indexes_lock:
+            _indexes[index_path] = (state, index)
+
+    # 同样大小的重写也会改变 mtime，两者都一致才使用索引
+    if (
+        index.get("version") != INDEX_FORMAT_VERSION
+        or index.get("source_size") != source_st.st_size
+        or index.get("source_mtime_ns") != source_st.st_mtime_ns
+    ):
+        return None
+    return index
+
+
+def lookup_symbol_doc(merged_file: Path, symbol: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Read the merged.jsonl line of one symbol through the sidecar index.
+
+    Args:
+        merged_file: Path to merged.jsonl
+        symbol: Symbol to look up
+
+    Returns:
+        (index_used, doc):
+          - (True, doc): the index is valid and doc is the parsed line for symbol
+          - (True, None): the index is valid and symbol is not in the file
+          - (False, None): no usable index; the caller should scan the file
+    """
+    merged_file = Path(merged_file)
+    index = _load_index(merged_file)
+    if index is None:
+        return False, None
+
+    entry = index["symbols"].get(symbol)
+    if entry is None:
+        return True, None
+
+    offset, length = entry
+    try:
+        with merged_file.open("rb") as f:
+            f.seek(offset)
+            line = f.read(length)
+        doc = json.loads(line)
+    except (OSError, ValueError):
+        return False, None
+
+    if doc_symbol(doc) != symbol:
+        return False, None
+    return True, doc
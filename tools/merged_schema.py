@@ -0,0 +1,142 @@
+"""
+merged.jsonl line schemas.
+
+Version 1 (default) is the Alpha Vantage layout written by the merge scripts:
+"Meta Data" with "2. Symbol", a "Time Series (Daily)" / "Time Series (60min)"
+object and string values under numbered keys ("1. buy price", ...).
+
+Version 2 is a normalized layout with typed numbers, a declared resolution and
+a fixed series key, so readers need no key search and no float() per value:
+
+    {"schema_version": 2, "symbol": "AAPL", "name": "", "resolution": "60min",
+     "Meta Data": {...}, "bars": {"2025-10-01 10:00:00": {"open": 255.04, ..., "volume": 1234}}}
+
+The merge scripts emit version 2 only when MERGED_SCHEMA_VERSION=2 is set,
+because docs/assets/js/data-loader.js still reads the version 1 keys. Readers
+accept both versions.
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+SCHEMA_VERSION = 2
+SCHEMA_KEY = "schema_version"
+SERIES_KEY = "bars"
+
+# merged.jsonl bar keys -> short field names used by the normalized schema
+BAR_FIELDS = {
+    "1. buy price": "open",
+    "2. high": "high",
+    "3. low": "low",
+    "4. sell price": "close",
+    "5. volume": "volume",
+}
+LEGACY_FIELD_KEYS = {field: key for key, field in BAR_FIELDS.items()}
+IDENTITY_FIELD_KEYS = {field: field for field in BAR_FIELDS.values()}
+
+DAILY = "daily"
+SIXTY_MIN = "60min"
+
+
+def get_output_schema_version() -> int:
+    """Schema version the merge scripts should write (MERGED_SCHEMA_VERSION, default 1)."""
+    try:
+        return int(os.getenv("MERGED_SCHEMA_VERSION", "1"))
+    except ValueError:
+        return 1
+
+
+def is_normalized(doc: Dict[str, Any]) -> bool:
+    """Return True if doc is a version 2 line."""
+    return doc.get(SCHEMA_KEY) == SCHEMA_VERSION
+
+
+def doc_symbol(doc: Any) -> Optional[str]:
+    """Return the symbol of a merged.jsonl line of either version."""
+    if not isinstance(doc, dict):
+        return None
+    if is_normalized(doc):
+        return doc.get("symbol")
+    meta = doc.get("Meta Data", {})
+    return meta.get("2. Symbol") if isinstance(meta, dict) else None
+
+
+def legacy_series_key(resolution: str) -> str:
+    """Return the version 1 series key for a resolution, e.g. "Time Series (Daily)"."""
+    return "Time Series (Daily)" if resolution == DAILY else f"Time Series ({resolution})"
+
+
+def find_legacy_series(doc: Dict[str, Any]) -> Tuple[Optional[str], Any]:
+    """Return (key, series) of the first "Time Series ..." entry of a version 1 line."""
+    # 查找所有以 "Time Series" 开头的键
+    for key, value in doc.items():
+        if key.startswith("Time Series"):
+            return key, value
+    return None, None
+
+
+def series_for(doc: Dict[str, Any], resolution: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """Return the bars of a line at one resolution and the key of each field inside a bar.
+
+    Args:
+        doc: Parsed merged.jsonl line of either version
+        resolution: "daily" or "60min"
+
+    Returns:
+        (series, field_keys): series maps timestamp -> bar, field_keys maps
+        "open"/"high"/"low"/"close"/"volume" to the bar key holding that field.
+        series is empty if the line has no bars at that resolution.
+    """
+    if is_normalized(doc):
+        series = doc.get(SERIES_KEY, {}) if doc.get("resolution") == resolution else {}
+        return series, IDENTITY_FIELD_KEYS
+    return doc.get(legacy_series_key(resolution), {}), LEGACY_FIELD_KEYS
+
+
+def _to_number(value: Any, integer: bool = False):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if integer else number
+
+
+def normalize_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a version 1 line into a version 2 line; version 2 lines are returned unchanged."""
+    if is_normalized(doc):
+        return doc
+    meta = doc.get("Meta Data", {})
+    meta = meta if isinstance(meta, dict) else {}
+    key, series = find_legacy_series(doc)
+    resolution = key[len("Time Series ("):-1] if key else DAILY
+    if resolution == "Daily":
+        resolution = DAILY
+
+    bars: Dict[str, Dict[str, Any]] = {}
+    if isinstance(series, dict):
+        for ts in sorted(series):
+            raw_bar = series[ts]
+            if not isinstance(raw_bar, dict):
+                continue
+            bar = {}
+            for raw_key, field in BAR_FIELDS.items():
+                value = _to_number(raw_bar.get(raw_key), integer=field == "volume")
+                if value is not None:
+                    bar[field] = value
+            bars[ts] = bar
+
+    return {
+        SCHEMA_KEY: SCHEMA_VERSION,
+        "symbol": meta.get("2. Symbol"),
+        "name": meta.get("2.1. Name", ""),
+        "resolution": resolution,
+        "Meta Data": meta,
+        SERIES_KEY: bars,
+    }
+
+
+def prepare_output_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Return doc in the schema version selected by MERGED_SCHEMA_VERSION."""
+    if get_output_schema_version() >= SCHEMA_VERSION:
+        return normalize_doc(doc)
+    return doc
@@ -0,0 +1,629 @@
+"""
+In-memory view of an agent's position.jsonl.
+
+A PositionLedger keeps per date the latest record (highest id) and the trade
+actions, the shares bought per calendar day (for the A-share T+1 rule) and the
+maximum action id. "Latest position" and "position before
+date" lookups are a dict access or a bisect over the sorted dates instead of
+re-reading and sorting the whole file on every call. After the first load only
+the bytes appended since the last read are parsed.
+
+Records are ``{"date", "id", "this_action": {"action", "symbol", "amount"}, "positions"}``.
+More kinds of lines keep long-lived files small and cheap to open:
+
+* Checkpoints ``{"date", "id", "checkpoint": true, "positions"}`` hold the final
+  positions of a date. append() writes one when a new date starts and at least
+  POSITION_CHECKPOINT_EVERY records were written since the previous checkpoint.
+  Any record flagged ``"checkpoint": true`` counts as one.
+* Action records ``{"date", "id", "this_action"}`` without positions, written by
+  compact_position_file() for trades that are not the last of their date.
+* Delta records ``{"date", "id", "this_action", "delta"}`` (format version 2),
+  holding only the symbols whose quantity changed since the previous line of
+  the file, usually the traded symbol and CASH; null removes a symbol.
+  Readers rebuild the full positions from the previous line, and every read
+  starts at a checkpoint or at the first line, which always hold full positions.
+
+Version 1 (full positions in every record) stays the default for append(),
+because docs/assets/js/data-loader.js reads the positions of every record;
+set POSITION_FORMAT_VERSION=2 to write delta records. Readers accept both.
+
+Readers locate the last checkpoint by scanning backwards from the end of the
+file and only parse from there. Dates at or before that checkpoint are loaded
+on demand, again starting from the nearest checkpoint before the requested
+date. A file that was truncated or replaced (e.g. compacted) is reloaded.
+
+Writers hold get_position_lock(signature) from reading the latest position to
+appending the new records, so action ids stay unique across threads and
+processes; signatures lock independently. Appends go through
+tools/ledger_writer.py, whose POSITION_FSYNC mode decides when they are fsynced.
+
+Usage:
+    python tools/position_ledger.py compact <signature> [<signature> ...] [--format-version 2]
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.ledger_writer import get_fsync_mode, get_ledger_writer
+
+_CHECKPOINT_MARK = b'"checkpoint": true'
+_SCAN_BLOCK = 1 << 16
+
+
+def get_checkpoint_every() -> int:
+    """Records between checkpoints (POSITION_CHECKPOINT_EVERY, default 200; 0 disables)."""
+    try:
+        return int(os.getenv("POSITION_CHECKPOINT_EVERY", "200"))
+    except ValueError:
+        return 200
+
+
+def get_position_format_version() -> int:
+    """Record format append() writes (POSITION_FORMAT_VERSION, default 1)."""
+    try:
+        return int(os.getenv("POSITION_FORMAT_VERSION", "1"))
+    except ValueError:
+        return 1
+
+
+def get_position_file_path(signature: str) -> Path:
+    """Return data/{LOG_PATH}/{signature}/position/position.jsonl."""
+    from tools.general_tools import get_config_value
+
+    # Get log_path from config, default to "agent_data" for backward compatibility
+    log_path = get_config_value("LOG_PATH", "./data/agent_data")
+    if log_path.startswith("./data/"):
+        log_path = log_path[7:]  # Remove "./data/" prefix
+    return Path(project_root) / "data" / log_path / signature / "position" / "position.jsonl"
+
+
+def _parse_lines(chunk: bytes) -> List[Dict[str, Any]]:
+    """Parse the JSON lines of chunk, skipping blank and malformed lines."""
+    lines = [line for line in chunk.split(b"\n") if line.strip()]
+    try:
+        # 整块一次解析，比逐行 json.loads 快得多；有损坏的行时再逐行解析
+        records = json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return [record for record in records if isinstance(record, dict)]
+
+
+def _delta_record(record: Dict[str, Any], running: Dict[str, float]) -> Dict[str, Any]:
+    """Encode a full record as a version 2 delta against the running positions."""
+    positions = record["positions"]
+    delta: Dict[str, Optional[float]] = {
+        symbol: quantity
+        for symbol, quantity in positions.items()
+        if symbol not in running or running[symbol] != quantity or type(running[symbol]) is not type(quantity)
+    }
+    for symbol in running:
+        if symbol not in positions:
+            delta[symbol] = None
+    line = {key: value for key, value in record.items() if key != "positions"}
+    line["delta"] = delta
+    return line
+
+
+def _decode(chunk: bytes, running: Optional[Dict[str, float]]) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, float]]]:
+    """Parse chunk and rebuild the full positions of delta records.
+
+    Args:
+        chunk: Complete lines of position.jsonl
+        running: Positions after the line preceding chunk, None at a checkpoint or the file start
+
+    Returns:
+        (records, positions after the last line of chunk)
+    """
+    records = _parse_lines(chunk)
+    # 只有每个日期 id 最大的记录需要保留完整持仓，其余增量记录原地累加，不复制 dict
+    final_of_date: Dict[str, int] = {}
+    for i, record in enumerate(records):
+        if "delta" in record:
+            j = final_of_date.get(record.get("date"))
+            if j is None or record.get("id", -1) > records[j].get("id", -1):
+                final_of_date[record.get("date")] = i
+    finals = set(final_of_date.values())
+
+    out = []
+    owned = False
+    for i, record in enumerate(records):
+        if "positions" in record:
+            running, owned = record["positions"], False
+        elif "delta" in record:
+            if running is None:
+                continue
+            if not owned:
+                running, owned = dict(running), True
+            for symbol, quantity in record.pop("delta").items():
+                if quantity is None:
+                    running.pop(symbol, None)
+                else:
+                    running[symbol] = quantity
+            if i in finals:
+                record["positions"] = dict(running)
+        out.append(record)
+    return out, running
+
+
+def _scan_checkpoints(f: BinaryIO, end: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (offset, record) of checkpoint lines that start before end, last first."""
+    pos = end
+    head = b""
+    while pos > 0:
+        start = max(0, pos - _SCAN_BLOCK)
+        f.seek(start)
+        block = f.read(pos - start) + head
+        # 块开头不完整的那一行与前一个块拼接后再处理
+        first = 0 if start == 0 else block.find(b"\n") + 1
+        head, pos = block[:first], start
+        if first == 0 and start > 0:
+            head = block
+            continue
+        body = block[first:]
+        hi = len(body)
+        while True:
+            mark = body.rfind(_CHECKPOINT_MARK, 0, hi)
+            if mark < 0:
+                break
+            line_start = body.rfind(b"\n", 0, mark) + 1
+            line_end = body.find(b"\n", mark)
+            hi = line_start
+            try:
+                record = json.loads(body[line_start:line_end if line_end >= 0 else len(body)])
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("checkpoint") and "positions" in record:
+                yield start + first + line_start, record
+
+
+class PositionLedger:
+    """Latest record per date of one position.jsonl, kept up to date by tail reads.
+
+    Attributes:
+        path: Path to position.jsonl
+        max_id: Highest action id in the loaded part of the file, -1 if empty
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.max_id = -1
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._actions: Dict[str, List[Dict[str, Any]]] = {}
+        # T+1：每个自然日各股票的买入股数，随记录追加累加
+        self._bought: Dict[str, Dict[str, int]] = {}
+        self._dates: List[str] = []
+        self._offset = 0
+        self._file_id: Optional[Tuple[int, int]] = None
+        # 内存中的状态从 _base_offset 处的检查点开始，只覆盖晚于 _base_date 的日期
+        self._base_offset = 0
+        self._base_date: Optional[str] = None
+        self._since_checkpoint = 0
+        self._running: Optional[Dict[str, float]] = None
+
+    def _ingest(self, record: Dict[str, Any], actions: Dict[str, List[Dict[str, Any]]], earlier: bool = False) -> None:
+        date = record.get("date")
+        if not date:
+            return
+        record_id = record.get("id", -1)
+        if record_id > self.max_id:
+            self.max_id = record_id
+        if not earlier:
+            self._since_checkpoint = 0 if record.get("checkpoint") else self._since_checkpoint + 1
+
+        if "positions" in record:
+            current = self._latest.get(date)
+            if current is None:
+                insort(self._dates, date)
+                self._latest[date] = record
+            elif record_id > current.get("id", -1) or (earlier and record_id == current.get("id", -1)):
+                # 同一 id 保留文件中靠前的记录，与原来逐行扫描的结果一致
+                self._latest[date] = record
+        action = record.get("this_action")
+        if action:
+            actions.setdefault(date, []).append(action)
+            if action.get("action") == "buy" and action.get("symbol"):
+                day_bought = self._bought.setdefault(date[:10], {})
+                day_bought[action["symbol"]] = day_bought.get(action["symbol"], 0) + action.get("amount", 0)
+
+    def _start_from_checkpoint(self, f: BinaryIO, size: int) -> None:
+        for offset, record in _scan_checkpoints(f, size):
+            self._base_offset = self._offset = offset
+            self._base_date = record["date"]
+            return
+
+    def _ensure_covered(self, date: Optional[str]) -> None:
+        """Load older records until every date after `date` (all dates if None) is in memory."""
+        with self._lock:
+            if self._base_date is None or (date is not None and date > self._base_date):
+                return
+            with self.path.open("rb") as f:
+                new_base, new_base_date = 0, None
+                if date is not None:
+                    for offset, record in _scan_checkpoints(f, self._base_offset):
+                        if record["date"] < date:
+                            new_base, new_base_date = offset, record["date"]
+                            break
+                f.seek(new_base)
+                chunk = f.read(self._base_offset - new_base)
+
+            earlier_actions: Dict[str, List[Dict[str, Any]]] = {}
+            records, _ = _decode(chunk, None)
+            for record in records:
+                self._ingest(record, earlier_actions, earlier=True)
+            for day, day_actions in earlier_actions.items():
+                self._actions[day] = day_actions + self._actions.get(day, [])
+            self._base_offset, self._base_date = new_base, new_base_date
+
+    def refresh(self) -> bool:
+        """Read records appended since the last call.
+
+        Returns:
+            True if position.jsonl exists
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                if self._file_id is not None:
+                    self._reset()
+                return False
+            file_id = (st.st_dev, st.st_ino)
+            reload = file_id != self._file_id or st.st_size < self._offset
+            if not reload and st.st_size == self._offset:
+                return True
+
+            with self.path.open("rb") as f:
+                if reload:
+                    self._reset()
+                    self._file_id = file_id
+                    self._start_from_checkpoint(f, st.st_size)
+                f.seek(self._offset)
+                chunk = f.read()
+            # 只处理完整的行，写到一半的最后一行留给下次读取
+            end = chunk.rfind(b"\n") + 1
+            records, self._running = _decode(chunk[:end], self._running)
+            for record in records:
+                self._ingest(record, self._actions)
+            self._offset += end
+            return True
+
+    def append(self, record: Dict[str, Any], sync: bool = True) -> int:
+        """Append a record to position.jsonl, see append_many()."""
+        return self.append_many([record], sync=sync)
+
+    def append_many(self, records: List[Dict[str, Any]], sync: bool = True) -> int:
+        """Append records to position.jsonl with a single write.
+
+        A checkpoint line is inserted before the first record of a new date when
+        one is due. With POSITION_FORMAT_VERSION=2 records are written as deltas
+        against the previous line; the first line of a file always holds full positions.
+
+        Args:
+            records: Records to append
+            sync: Wait until the records are durable (see tools/ledger_writer.py)
+                before returning. Writers holding the position lock pass False
+                and call sync() after releasing it, so concurrent orders share
+                one fsync.
+
+        Returns:
+            Commit sequence number for sync(), 0 if nothing was written
+        """
+        if not records:
+            return 0
+        with self._lock:
+            self.refresh()
+            every = get_checkpoint_every()
+            delta = get_position_format_version() >= 2
+            running, since = self._running, self._since_checkpoint
+            last = self._latest[self._dates[-1]] if self._dates else None
+
+            lines = []
+            for record in records:
+                date = record.get("date", "")
+                if every > 0 and since >= every and last is not None and date > last["date"]:
+                    lines.append({"date": last["date"], "id": last.get("id", -1), "checkpoint": True, "positions": last["positions"]})
+                    running, since = last["positions"], 0
+                if delta and running is not None and "positions" in record:
+                    lines.append(_delta_record(record, running))
+                else:
+                    lines.append(record)
+                since += 1
+                if "positions" in record:
+                    running = record["positions"]
+                    if last is None or date > last["date"] or (date == last["date"] and record.get("id", -1) > last.get("id", -1)):
+                        last = record
+
+            seq = get_ledger_writer(self.path).write("".join(json.dumps(line) + "\n" for line in lines).encode("utf-8"))
+            self.refresh()
+        if sync:
+            self.sync(seq)
+        return seq
+
+    def sync(self, seq: Optional[int] = None) -> None:
+        """Wait until appends up to commit seq (all if None) are durable according to POSITION_FSYNC."""
+        if seq != 0:
+            get_ledger_writer(self.path).sync(seq)
+
+    def dates(self) -> List[str]:
+        """Return all dates with positions, ascending."""
+        self.refresh()
+        self._ensure_covered(None)
+        return list(self._dates)
+
+    def latest_on(self, date: str) -> Optional[Dict[str, Any]]:
+        """Return the record with the highest id on date, or None."""
+        self.refresh()
+        self._ensure_covered(date)
+        return self._latest.get(date)
+
+    def latest_before(self, date: str) -> Optional[Dict[str, Any]]:
+        """Return the latest record (by date, then id) strictly before date, or None."""
+        self.refresh()
+        self._ensure_covered(date)
+        with self._lock:
+            pos = bisect_left(self._dates, date)
+            return self._latest[self._dates[pos - 1]] if pos > 0 else None
+
+    def latest_by_date(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Return {date: record with the highest id} for dates within [start_date, end_date]."""
+        self.refresh()
+        self._ensure_covered(start_date)
+        with self._lock:
+            lo = 0 if start_date is None else bisect_left(self._dates, start_date)
+            hi = len(self._dates) if end_date is None else bisect_right(self._dates, end_date)
+            return {date: self._latest[date] for date in self._dates[lo:hi]}
+
+    def actions_on(self, date: str) -> List[Dict[str, Any]]:
+        """Return the this_action entries recorded on date, in file order."""
+        self.refresh()
+        self._ensure_covered(date)
+        return list(self._actions.get(date, ()))
+
+    def bought_on(self, day: str) -> Dict[str, int]:
+        """Return {symbol: shares bought} over the calendar day of `day` ("YYYY-MM-DD[ HH:MM:SS]")."""
+        day = day[:10]
+        self.refresh()
+        self._ensure_covered(day)
+        return dict(self._bought.get(day, {}))
+
+    def bought(self, day: str, symbol: str) -> int:
+        """Return the shares of symbol bought over the calendar day of `day`."""
+        day = day[:10]
+        self.refresh()
+        self._ensure_covered(day)
+        return self._bought.get(day, {}).get(symbol, 0)
+
+    def latest_position(self, today_date: str) -> Tuple[Dict[str, float], int]:
+        """Return (positions, id) of the latest record on today_date, or else before it; ({}, -1) if none."""
+        record = self.latest_on(today_date)
+        if record is None or not record.get("positions"):
+            record = self.latest_before(today_date)
+        if record is None:
+            return {}, -1
+        return dict(record.get("positions", {})), record.get("id", -1)
+
+
+_ledgers: Dict[str, PositionLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_position_ledger(signature: str) -> PositionLedger:
+    """Return the process-wide PositionLedger of signature's position.jsonl."""
+    path = get_position_file_path(signature)
+    key = str(path.resolve())
+    ledger = _ledgers.get(key)
+    if ledger is None:
+        with _ledgers_lock:
+            ledger = _ledgers.get(key)
+            if ledger is None:
+                ledger = _ledgers[key] = PositionLedger(path)
+    return ledger
+
+
+class PositionLock:
+    """Re-entrant lock serializing read -> validate -> append on one position.jsonl.
+
+    Threads of a process wait on an RLock, processes on an flock of the
+    signature's .position.lock. The lock file is opened once and kept open;
+    only the outermost holder takes and releases the flock.
+
+    Attributes:
+        lock_path: Path to .position.lock
+    """
+
+    def __init__(self, lock_path: Path):
+        self.lock_path = Path(lock_path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def __enter__(self) -> "PositionLock":
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                if self._fh is None:
+                    self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._fh = open(self.lock_path, "a+")
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+            self._depth += 1
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self._depth -= 1
+            if self._depth == 0:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+
+_position_locks: Dict[str, PositionLock] = {}
+
+
+def _lock_for_position_file(path: Path) -> PositionLock:
+    # 锁文件与 position/ 目录同级：data/{LOG_PATH}/{signature}/.position.lock
+    lock_path = Path(path).parent.parent / ".position.lock"
+    key = str(lock_path.resolve())
+    lock = _position_locks.get(key)
+    if lock is None:
+        with _ledgers_lock:
+            lock = _position_locks.get(key)
+            if lock is None:
+                lock = _position_locks[key] = PositionLock(lock_path)
+    return lock
+
+
+def _reset_locks_after_fork() -> None:
+    # flock 属于打开的文件描述，与父进程共用描述的子进程拿不到互斥，须重新打开锁文件
+    global _ledgers_lock
+    _position_locks.clear()
+    _ledgers_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def get_position_lock(signature: str) -> PositionLock:
+    """Return the process-wide PositionLock of signature; different signatures never wait on each other."""
+    return _lock_for_position_file(get_position_file_path(signature))
+
+
+def compact_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rewrite position records as per-date final snapshots plus trade actions.
+
+    For every date the record with the highest id keeps its positions; other
+    buy/sell records keep only date, id and this_action, and other no_trade
+    records and checkpoint lines are dropped.
+
+    Args:
+        records: Records with full positions (delta records already rebuilt)
+
+    Returns:
+        Records sorted by date, then id, without checkpoint flags
+    """
+    by_date: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        if record.get("date"):
+            by_date.setdefault(record["date"], []).append(record)
+
+    out: List[Dict[str, Any]] = []
+    for date in sorted(by_date):
+        day_records = by_date[date]
+        final = None
+        for record in day_records:
+            if "positions" in record and (final is None or record.get("id", -1) > final.get("id", -1)):
+                final = record
+        for record in sorted(day_records, key=lambda r: r.get("id", -1)):
+            if record is final:
+                continue
+            action = record.get("this_action") or {}
+            if action.get("action") in ("buy", "sell"):
+                out.append({"date": date, "id": record.get("id", -1), "this_action": action})
+        if final is not None:
+            out.append({key: value for key, value in final.items() if key != "checkpoint"})
+    return out
+
+
+def encode_records(records: List[Dict[str, Any]], version: int, every: int) -> List[Dict[str, Any]]:
+    """Encode date-sorted records for writing.
+
+    The last record of a date is flagged as a checkpoint once `every` records
+    passed since the previous one (never if every is 0). With version 2, records
+    between checkpoints are written as deltas against the previous record.
+    """
+    out: List[Dict[str, Any]] = []
+    running: Optional[Dict[str, float]] = None
+    since = 0
+    for i, record in enumerate(records):
+        since += 1
+        if "positions" not in record:
+            out.append(record)
+            continue
+        last_of_date = i + 1 == len(records) or records[i + 1].get("date") != record.get("date")
+        if every > 0 and since >= every and last_of_date:
+            out.append(dict(record, checkpoint=True))
+            since = 0
+        elif version >= 2 and running is not None:
+            out.append(_delta_record(record, running))
+        else:
+            out.append(record)
+        running = record["positions"]
+    return out
+
+
+def compact_position_file(path: Path, version: Optional[int] = None) -> Tuple[int, int]:
+    """Compact a position.jsonl in place, see compact_records() and encode_records().
+
+    The file is rewritten through a temporary file renamed into place while
+    holding the signature's .position.lock, so trades done through
+    agent_tools/tool_trade.py wait for it.
+
+    Args:
+        path: Path to position.jsonl
+        version: Format version to write; POSITION_FORMAT_VERSION if None
+
+    Returns:
+        (size before, size after) in bytes
+    """
+    path = Path(path)
+    version = get_position_format_version() if version is None else version
+    with _lock_for_position_file(path):
+        raw = path.read_bytes()
+        records, _ = _decode(raw, None)
+        lines = encode_records(compact_records(records), version, get_checkpoint_every())
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(line) + "\n" for line in lines))
+            if get_fsync_mode() != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if get_fsync_mode() != "none":
+            dir_fd = os.open(path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    return len(raw), os.path.getsize(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="position.jsonl maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_parser = sub.add_parser("compact", help="Rewrite position.jsonl as daily snapshots plus trade actions")
+    compact_parser.add_argument("signatures", nargs="+")
+    compact_parser.add_argument(
+        "--format-version", type=int, choices=(1, 2), default=None, help="Defaults to POSITION_FORMAT_VERSION"
+    )
+    args = parser.parse_args()
+
+    for signature in args.signatures:
+        position_file = get_position_file_path(signature)
+        if not position_file.exists():
+            print(f"⚠️  Warning: {position_file} not found, skipping")
+            continue
+        before, after = compact_position_file(position_file, args.format_version)
+        print(f"✅ {signature}: {before / 1024:.1f} KB -> {after / 1024:.1f} KB")
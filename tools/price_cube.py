@@ -0,0 +1,283 @@
+"""
+Columnar price cube: float64 arrays laid out symbol x timestamp, one per field.
+
+A cube can be built in memory from a PriceStore, or saved next to merged.jsonl
+as ``merged.cube/`` and opened later with ``np.memmap`` so that loading costs
+nothing until a slice is read. Missing bars are NaN; the latest bar keeps only
+its open price, following the convention of data/merge_jsonl.py.
+
+Usage:
+    python tools/price_cube.py [--market us|cn|all]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.asof import AsofIndex
+from tools.price_store import BAR_FIELDS, PriceStore, get_price_store
+
+FIELDS: Tuple[str, ...] = tuple(BAR_FIELDS.values())
+CUBE_FORMAT_VERSION = 1
+
+
+class PriceCube:
+    """Dense symbol x timestamp price arrays with axis lookups.
+
+    Attributes:
+        symbols: Row axis, one entry per symbol
+        timestamps: Column axis, ascending "YYYY-MM-DD[ HH:MM:SS]" strings
+        arrays: {field: float64 array of shape (len(symbols), len(timestamps))}
+    """
+
+    def __init__(self, symbols: Sequence[str], timestamps: Sequence[str], arrays: Dict[str, np.ndarray]):
+        self.symbols: List[str] = list(symbols)
+        self.timestamps: List[str] = list(timestamps)
+        self.arrays = arrays
+        self.symbol_index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        self.timestamp_index: Dict[str, int] = {t: i for i, t in enumerate(self.timestamps)}
+        self._asof_indexes: Dict[str, AsofIndex] = {}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.symbols), len(self.timestamps)
+
+    @classmethod
+    def from_store(cls, store: PriceStore) -> "PriceCube":
+        """Build an in-memory cube from a loaded PriceStore."""
+        symbols = sorted(store.bars)
+        timestamps = sorted({ts for series in store.bars.values() for ts in series})
+        timestamp_index = {t: i for i, t in enumerate(timestamps)}
+        arrays = {field: np.full((len(symbols), len(timestamps)), np.nan) for field in FIELDS}
+        for row, symbol in enumerate(symbols):
+            for ts, bar in store.bars[symbol].items():
+                col = timestamp_index[ts]
+                for field, value in bar.items():
+                    arrays[field][row, col] = value
+        return cls(symbols, timestamps, arrays)
+
+    def field(self, name: str) -> np.ndarray:
+        """Return the full symbol x timestamp array for a field."""
+        return self.arrays[name]
+
+    def rows(self, symbols: Sequence[str]) -> np.ndarray:
+        """Return row indices for symbols, -1 for symbols not in the cube."""
+        return np.array([self.symbol_index.get(s, -1) for s in symbols], dtype=np.int64)
+
+    def cross_section(self, field: str, timestamp: str, symbols: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Return one field for many symbols at one timestamp; NaN where missing.
+
+        Args:
+            field: One of FIELDS
+            timestamp: Column label
+            symbols: Symbols to return in order, all symbols if None
+
+        Returns:
+            float64 array aligned with symbols
+        """
+        col = self.timestamp_index.get(timestamp)
+        data = self.arrays[field]
+        if symbols is None:
+            if col is None:
+                return np.full(len(self.symbols), np.nan)
+            return np.asarray(data[:, col])
+        rows = self.rows(symbols)
+        out = np.full(len(rows), np.nan)
+        if col is not None:
+            found = rows >= 0
+            out[found] = data[rows[found], col]
+        return out
+
+    def asof_index(self, field: str) -> AsofIndex:
+        """Return the AsofIndex of the non-NaN cells of a field, built on first use."""
+        index = self._asof_indexes.get(field)
+        if index is None:
+            index = self._asof_indexes[field] = AsofIndex.from_mask(~np.isnan(self.arrays[field]))
+        return index
+
+    def asof_columns(
+        self,
+        timestamp: str,
+        symbols: Optional[Sequence[str]] = None,
+        field: str = "close",
+        max_staleness: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return, per symbol, the column of the latest bar at or before timestamp with field set.
+
+        Args:
+            timestamp: As-of timestamp; it does not have to be on the cube's axis
+            symbols: Symbols in order, all symbols if None
+            field: Field that must be present for a bar to count
+            max_staleness: Maximum number of timestamps between timestamp and the bar used, None for no limit
+
+        Returns:
+            int64 array aligned with symbols, -1 where no bar is found
+        """
+        rows = np.arange(len(self.symbols)) if symbols is None else self.rows(symbols)
+        col = self.timestamp_index.get(timestamp)
+        if col is None:
+            col = bisect_right(self.timestamps, timestamp) - 1
+        return self.asof_index(field).lookup(rows, col, max_staleness)
+
+    def asof(
+        self,
+        field: str,
+        timestamp: str,
+        symbols: Optional[Sequence[str]] = None,
+        max_staleness: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return one field for many symbols as of timestamp, forward-filling missing bars.
+
+        Returns:
+            float64 array aligned with symbols; NaN where no bar is found within max_staleness
+        """
+        rows = np.arange(len(self.symbols)) if symbols is None else self.rows(symbols)
+        cols = self.asof_columns(timestamp, symbols, field, max_staleness)
+        return self.take(field, rows, cols)
+
+    def take(self, field: str, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Return field values at (rows[i], cols[i]); NaN where either index is negative."""
+        out = np.full(len(rows), np.nan)
+        found = (rows >= 0) & (cols >= 0)
+        out[found] = self.arrays[field][rows[found], cols[found]]
+        return out
+
+    def save(self, directory: Path, source_state: Optional[Tuple[int, int]] = None) -> Path:
+        """Write the cube as .npy files plus axis and meta JSON files.
+
+        Each file is written to a temporary name and renamed into place, so
+        readers that already mapped the previous cube keep a consistent view.
+        meta.json is written last and marks the cube as complete.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_path = directory / "meta.json"
+        if meta_path.exists():
+            meta_path.unlink()
+
+        def _replace(name: str, write) -> None:
+            tmp = directory / f".{name}.tmp"
+            with tmp.open("wb") as f:
+                write(f)
+            os.replace(tmp, directory / name)
+
+        for field in FIELDS:
+            array = np.ascontiguousarray(self.arrays[field], dtype=np.float64)
+            _replace(f"{field}.npy", lambda f, a=array: np.save(f, a))
+        _replace("symbols.json", lambda f: f.write(json.dumps(self.symbols, ensure_ascii=False).encode("utf-8")))
+        _replace("timestamps.json", lambda f: f.write(json.dumps(self.timestamps).encode("utf-8")))
+
+        meta = {
+            "version": CUBE_FORMAT_VERSION,
+            "fields": list(FIELDS),
+            "shape": list(self.shape),
+            "source_mtime_ns": source_state[0] if source_state else None,
+            "source_size": source_state[1] if source_state else None,
+        }
+        _replace("meta.json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+        return directory
+
+    @classmethod
+    def load(cls, directory: Path) -> "PriceCube":
+        """Open a saved cube with every field memory-mapped read-only."""
+        directory = Path(directory)
+        symbols = json.loads((directory / "symbols.json").read_text("utf-8"))
+        timestamps = json.loads((directory / "timestamps.json").read_text("utf-8"))
+        arrays = {field: np.load(directory / f"{field}.npy", mmap_mode="r") for field in FIELDS}
+        return cls(symbols, timestamps, arrays)
+
+
+def get_cube_dir(merged_file: Path) -> Path:
+    """Return the cube directory that sits next to a merged.jsonl file."""
+    merged_file = Path(merged_file)
+    return merged_file.with_name(merged_file.stem + ".cube")
+
+
+def _source_state(merged_file: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(merged_file)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+_mapped: Dict[Path, Tuple[Tuple[int, int], PriceCube]] = {}
+_mapped_lock = threading.Lock()
+
+
+def load_price_cube(merged_file: Path) -> Optional[PriceCube]:
+    """Return the memory-mapped cube for merged_file if it exists and is up to date.
+
+    Returns:
+        PriceCube backed by np.memmap, or None if the cube is missing or was
+        built from a different version of merged_file
+    """
+    merged_file = Path(merged_file).resolve()
+    state = _source_state(merged_file)
+    if state is None:
+        return None
+    cached = _mapped.get(merged_file)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+
+    cube_dir = get_cube_dir(merged_file)
+    try:
+        meta = json.loads((cube_dir / "meta.json").read_text("utf-8"))
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CUBE_FORMAT_VERSION:
+        return None
+    if (meta.get("source_mtime_ns"), meta.get("source_size")) != state:
+        return None
+
+    try:
+        cube = PriceCube.load(cube_dir)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Warning: failed to map price cube {cube_dir}: {e}")
+        return None
+    with _mapped_lock:
+        _mapped[merged_file] = (state, cube)
+    return cube
+
+
+def build_price_cube(merged_file: Path) -> Optional[Path]:
+    """Convert merged_file into a cube directory next to it.
+
+    Returns:
+        Path to the cube directory, or None if merged_file does not exist
+    """
+    merged_file = Path(merged_file)
+    state = _source_state(merged_file)
+    store = get_price_store(merged_file)
+    if state is None or not store.refresh():
+        print(f"⚠️  Warning: {merged_file} not found, skipping price cube")
+        return None
+    cube = PriceCube.from_store(store)
+    return cube.save(get_cube_dir(merged_file), source_state=state)
+
+
+if __name__ == "__main__":
+    from tools.price_tools import get_merged_file_path
+
+    parser = argparse.ArgumentParser(description="Build memory-mapped price cubes from merged.jsonl")
+    parser.add_argument("--market", choices=["us", "cn", "all"], default="all")
+    args = parser.parse_args()
+
+    markets = ["us", "cn"] if args.market == "all" else [args.market]
+    for market in markets:
+        merged_file = get_merged_file_path(market)
+        cube_dir = build_price_cube(merged_file)
+        if cube_dir is not None:
+            cube = PriceCube.load(cube_dir)
+            print(f"✅ {market}: {cube.shape[0]} symbols x {cube.shape[1]} timestamps -> {cube_dir}")
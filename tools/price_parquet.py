@@ -0,0 +1,206 @@
+"""
+Optional Parquet export of price history, partitioned by market and year.
+
+``data/price_parquet/market=<us|cn>/year=<YYYY>/`` holds one row per
+(symbol, ts) bar with columnar OHLCV for both markets. Readers pass column lists and
+filters down to pyarrow, so only the needed columns of the needed year
+partitions (and row groups) are read.
+
+Each market partition records the size and mtime of the merged.jsonl it was
+exported from in ``market=<m>/_source.json``; readers ignore a partition whose
+merged.jsonl has changed since and fall back to merged.jsonl.
+
+Requires pyarrow (``pip install pyarrow``); without it the export is skipped
+with a warning and readers fall back to merged.jsonl.
+
+Usage:
+    python tools/price_parquet.py [--market us|cn|all]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.price_store import BAR_FIELDS, PriceStore
+
+load_dotenv()
+
+FIELDS = list(BAR_FIELDS.values())
+SOURCE_FILE = "_source.json"
+
+_stale_warned: Set[Tuple[str, int, int]] = set()
+
+
+def use_parquet_backend() -> bool:
+    """Return True when PRICE_BACKEND (.env / environment) is set to "parquet"."""
+    return os.getenv("PRICE_BACKEND", "jsonl").lower() == "parquet"
+
+
+def parquet_export_enabled() -> bool:
+    """Return True when the merge scripts should also write the Parquet dataset (MERGED_PARQUET_EXPORT=1)."""
+    return os.getenv("MERGED_PARQUET_EXPORT", "0").lower() in ("1", "true", "yes")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    return pq
+
+
+def get_parquet_dir() -> Path:
+    """Return the root directory of the Parquet price dataset."""
+    return Path(project_root) / "data" / "price_parquet"
+
+
+def write_parquet_dataset(merged_file: Path, market: str, root: Optional[Path] = None) -> Optional[Path]:
+    """Export merged_file as a Parquet dataset partitioned by market/year.
+
+    The partition of ``market`` is rewritten as a whole; other markets in the
+    same dataset directory are left untouched.
+
+    Args:
+        merged_file: Path to merged.jsonl
+        market: Market type ("us" or "cn"), stored as the market partition
+        root: Dataset directory, get_parquet_dir() by default
+
+    Returns:
+        Path to the dataset directory, or None if pyarrow is missing or merged_file does not exist
+    """
+    pq = _import_pyarrow()
+    if pq is None:
+        print("⚠️  Warning: pyarrow is not installed, skipping Parquet export (pip install pyarrow)")
+        return None
+
+    store = PriceStore(merged_file)
+    if not store.refresh():
+        print(f"⚠️  Warning: {merged_file} not found, skipping Parquet export")
+        return None
+    st = os.stat(merged_file)
+
+    records = [
+        (symbol, ts, *(bar.get(field) for field in FIELDS))
+        for symbol, series in store.bars.items()
+        for ts, bar in series.items()
+    ]
+    df = pd.DataFrame.from_records(records, columns=["symbol", "ts", *FIELDS])
+    df["year"] = df["ts"].str.slice(0, 4).astype("int32")
+    df["market"] = market
+    df = df.sort_values(["ts", "symbol"], ignore_index=True)
+
+    import pyarrow as pa
+
+    root = Path(root) if root is not None else get_parquet_dir()
+    market_dir = root / f"market={market}"
+    if market_dir.exists():
+        shutil.rmtree(market_dir)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(table, root_path=str(root), partition_cols=["market", "year"])
+    # 以 "_" 开头的文件不会被 pyarrow 当作数据文件读取
+    with (market_dir / SOURCE_FILE).open("w", encoding="utf-8") as f:
+        json.dump({"source_mtime_ns": st.st_mtime_ns, "source_size": st.st_size}, f)
+    return root
+
+
+def parquet_partition_current(market: str, merged_file: Optional[Path] = None, root: Optional[Path] = None) -> bool:
+    """Return True if the market partition exists and was exported from the current merged.jsonl.
+
+    Args:
+        market: Market type ("us" or "cn")
+        merged_file: Source merged.jsonl, the market's default path if None
+        root: Dataset directory, get_parquet_dir() by default
+    """
+    if merged_file is None:
+        from tools.price_tools import get_merged_file_path
+
+        merged_file = get_merged_file_path(market)
+    root = Path(root) if root is not None else get_parquet_dir()
+    market_dir = root / f"market={market}"
+    if not market_dir.exists():
+        return False
+    try:
+        st = os.stat(merged_file)
+    except OSError:
+        # 源文件不存在时无从比较，也没有可回退的 JSONL，继续使用数据集
+        return True
+    try:
+        with (market_dir / SOURCE_FILE).open("r", encoding="utf-8") as f:
+            source = json.load(f)
+        current = (source["source_mtime_ns"], source["source_size"]) == (st.st_mtime_ns, st.st_size)
+    except (OSError, ValueError, KeyError, TypeError):
+        current = False
+    if not current and (str(market_dir), st.st_mtime_ns, st.st_size) not in _stale_warned:
+        _stale_warned.add((str(market_dir), st.st_mtime_ns, st.st_size))
+        print(f"⚠️  Warning: {market_dir} is older than {merged_file}, falling back to merged.jsonl; rerun tools/price_parquet.py")
+    return current
+
+
+def read_price_frame(
+    market: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    symbols: Optional[Sequence[str]] = None,
+    fields: Sequence[str] = ("close",),
+    root: Optional[Path] = None,
+    merged_file: Optional[Path] = None,
+) -> Optional[pd.DataFrame]:
+    """Read bars from the Parquet dataset with column projection and predicate pushdown.
+
+    Args:
+        market: Market type ("us" or "cn")
+        start: Inclusive lower timestamp bound
+        end: Inclusive upper timestamp bound; a date-only bound includes that whole day
+        symbols: Symbols to read, all if None
+        fields: OHLCV columns to read
+        root: Dataset directory, get_parquet_dir() by default
+        merged_file: Source merged.jsonl the dataset must match, the market's default path if None
+
+    Returns:
+        DataFrame with columns ["symbol", "ts", *fields], or None if pyarrow is missing or the
+        dataset is missing or older than merged_file
+    """
+    pq = _import_pyarrow()
+    if pq is None:
+        return None
+    root = Path(root) if root is not None else get_parquet_dir()
+    if not parquet_partition_current(market, merged_file, root):
+        return None
+
+    filters: List[tuple] = [("market", "=", market)]
+    if start is not None:
+        filters += [("year", ">=", int(start[:4])), ("ts", ">=", start)]
+    if end is not None:
+        if " " not in end:
+            end = f"{end} 23:59:59"
+        filters += [("year", "<=", int(end[:4])), ("ts", "<=", end)]
+    if symbols is not None:
+        filters.append(("symbol", "in", list(symbols)))
+
+    table = pq.read_table(str(root), columns=["symbol", "ts", *fields], filters=filters)
+    return table.to_pandas()
+
+
+if __name__ == "__main__":
+    from tools.price_tools import get_merged_file_path
+
+    parser = argparse.ArgumentParser(description="Export merged.jsonl as a Parquet dataset partitioned by market/year")
+    parser.add_argument("--market", choices=["us", "cn", "all"], default="all")
+    args = parser.parse_args()
+
+    markets = ["us", "cn"] if args.market == "all" else [args.market]
+    for market in markets:
+        root = write_parquet_dataset(get_merged_file_path(market), market)
+        if root is not None:
+            print(f"✅ {market}: {root / f'market={market}'}")
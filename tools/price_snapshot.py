@@ -0,0 +1,277 @@
+"""
+Warm-start snapshot of a parsed merged.jsonl.
+
+``merged.snapshot`` next to ``merged.jsonl`` stores the PriceStore contents in
+columnar form: one float64 (n_bars, 5) OHLCV array, a per-bar timestamp id and
+per-symbol offsets. The arrays are written as pickle protocol 5 out-of-band
+buffers after the pickle stream and memory-mapped on load, so opening a
+snapshot costs milliseconds regardless of the number of bars. Per-symbol bar
+dicts are built lazily on first access (see SnapshotBars).
+
+A snapshot is keyed by the SHA-256 of its source file. The digest is only
+recomputed when the source's size or mtime differ from the recorded ones.
+Snapshots are written only by the merge scripts and by this script; readers
+never write next to the data and parse merged.jsonl when the snapshot is
+missing or stale. Set PRICE_SNAPSHOT=0 to disable reading and writing them.
+
+Usage:
+    python tools/price_snapshot.py [--market us|cn|all]
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import pickle
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.merged_schema import BAR_FIELDS
+
+SNAPSHOT_FORMAT_VERSION = 1
+FIELDS: Tuple[str, ...] = tuple(BAR_FIELDS.values())
+_BUFFER_ALIGN = 64
+
+
+def snapshots_enabled() -> bool:
+    """Return False when PRICE_SNAPSHOT is set to 0/false/no."""
+    return os.getenv("PRICE_SNAPSHOT", "1").lower() not in ("0", "false", "no")
+
+
+def get_snapshot_path(merged_file: Path) -> Path:
+    """Return the merged.snapshot path that sits next to a merged.jsonl file."""
+    return Path(merged_file).with_suffix(".snapshot")
+
+
+def source_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SnapshotBars(Mapping):
+    """Read-only ``{symbol: {timestamp: bar}}`` mapping over snapshot arrays.
+
+    Each symbol's dict is materialized on first access and cached; get_bar()
+    answers point lookups straight from the arrays without materializing.
+    """
+
+    def __init__(self, symbols: List[str], offsets: np.ndarray, ts_ids: np.ndarray, values: np.ndarray, timestamps: List[str]):
+        self._index = {s: i for i, s in enumerate(symbols)}
+        self._symbols = symbols
+        self._offsets = offsets
+        self._ts_ids = ts_ids
+        self._values = values
+        self._timestamps = timestamps
+        self._cache: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._ts_index: Optional[Dict[str, int]] = None
+
+    def __getitem__(self, symbol: str) -> Dict[str, Dict[str, float]]:
+        series = self._cache.get(symbol)
+        if series is not None:
+            return series
+        i = self._index[symbol]
+        lo, hi = int(self._offsets[i]), int(self._offsets[i + 1])
+        timestamps = self._timestamps
+        series = {}
+        for ts_id, row in zip(self._ts_ids[lo:hi].tolist(), self._values[lo:hi].tolist()):
+            series[timestamps[ts_id]] = {field: value for field, value in zip(FIELDS, row) if value == value}
+        self._cache[symbol] = series
+        return series
+
+    def get_bar(self, symbol: str, ts: str) -> Optional[Dict[str, float]]:
+        """Return the bar for symbol at ts, or None if absent."""
+        series = self._cache.get(symbol)
+        if series is not None:
+            return series.get(ts)
+        i = self._index.get(symbol)
+        if i is None:
+            return None
+        if self._ts_index is None:
+            self._ts_index = {t: k for k, t in enumerate(self._timestamps)}
+        ts_id = self._ts_index.get(ts)
+        if ts_id is None:
+            return None
+        # 每个标的的时间戳 id 按升序存放，二分查找即可
+        lo, hi = int(self._offsets[i]), int(self._offsets[i + 1])
+        pos = lo + int(np.searchsorted(self._ts_ids[lo:hi], ts_id))
+        if pos >= hi or self._ts_ids[pos] != ts_id:
+            return None
+        return {field: value for field, value in zip(FIELDS, self._values[pos].tolist()) if value == value}
+
+    def __contains__(self, symbol: object) -> bool:
+        return symbol in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._symbols)
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+
+def write_snapshot(
+    merged_file: Path,
+    bars: Dict[str, Dict[str, Dict[str, float]]],
+    names: Dict[str, str],
+    series_keys: Dict[str, str],
+    source_state: Tuple[int, int],
+) -> Path:
+    """Write the parsed contents of merged_file as a snapshot next to it.
+
+    Args:
+        merged_file: Path to merged.jsonl the data was parsed from
+        bars: {symbol: {timestamp: {field: float}}}
+        names: {symbol: name}
+        series_keys: {symbol: series key}
+        source_state: (mtime_ns, size) of merged_file at parse time
+
+    Returns:
+        Path to the snapshot file
+    """
+    merged_file = Path(merged_file)
+    symbols = list(bars)
+    timestamps = sorted({ts for series in bars.values() for ts in series})
+    ts_index = {ts: i for i, ts in enumerate(timestamps)}
+
+    offsets = np.zeros(len(symbols) + 1, dtype=np.int64)
+    ts_id_list: List[int] = []
+    rows: List[List[float]] = []
+    nan = float("nan")
+    for i, symbol in enumerate(symbols):
+        series = bars[symbol]
+        for ts in sorted(series):
+            bar = series[ts]
+            ts_id_list.append(ts_index[ts])
+            rows.append([bar.get(field, nan) for field in FIELDS])
+        offsets[i + 1] = len(rows)
+    ts_ids = np.array(ts_id_list, dtype=np.int32)
+    values = np.array(rows, dtype=np.float64).reshape(len(rows), len(FIELDS))
+
+    payload = {
+        "symbols": symbols,
+        "timestamps": timestamps,
+        "names": names,
+        "series_keys": series_keys,
+        "offsets": pickle.PickleBuffer(offsets),
+        "ts_ids": pickle.PickleBuffer(ts_ids),
+        "values": pickle.PickleBuffer(values),
+        "shapes": {"offsets": offsets.shape, "ts_ids": ts_ids.shape, "values": values.shape},
+    }
+    buffers: List[pickle.PickleBuffer] = []
+    payload_bytes = pickle.dumps(payload, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [b.raw() for b in buffers]
+    header = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "source_sha256": source_digest(merged_file),
+        "source_mtime_ns": source_state[0],
+        "source_size": source_state[1],
+        "payload_size": len(payload_bytes),
+        "buffer_sizes": [b.nbytes for b in raw_buffers],
+    }
+
+    snapshot_path = get_snapshot_path(merged_file)
+    tmp_path = snapshot_path.with_name(f".{snapshot_path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as f:
+        pickle.dump(header, f, protocol=5)
+        f.write(payload_bytes)
+        for raw in raw_buffers:
+            # 对齐缓冲区起始位置，便于零拷贝映射为数组
+            f.write(b"\0" * (-f.tell() % _BUFFER_ALIGN))
+            f.write(raw)
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+def build_snapshot(merged_file: Path) -> Optional[Path]:
+    """Parse merged_file and write its snapshot.
+
+    Returns:
+        Path to the snapshot file, or None if merged_file does not exist
+    """
+    from tools.price_store import PriceStore
+
+    store = PriceStore(merged_file, use_snapshot=False)
+    if not store.refresh():
+        return None
+    st = os.stat(merged_file)
+    return write_snapshot(merged_file, store.bars, store.names, store.series_keys, (st.st_mtime_ns, st.st_size))
+
+
+def load_snapshot(merged_file: Path, source_state: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+    """Load the snapshot of merged_file if it was built from the current file contents.
+
+    Args:
+        merged_file: Path to merged.jsonl
+        source_state: Current (mtime_ns, size) of merged_file
+
+    Returns:
+        {"bars": SnapshotBars, "names", "series_keys", "timestamps"}, or None if
+        there is no valid snapshot for the current contents
+    """
+    snapshot_path = get_snapshot_path(merged_file)
+    try:
+        f = snapshot_path.open("rb")
+    except OSError:
+        return None
+    with f:
+        try:
+            header = pickle.load(f)
+            if header.get("version") != SNAPSHOT_FORMAT_VERSION or header.get("source_size") != source_state[1]:
+                return None
+            if header.get("source_mtime_ns") != source_state[0] and header.get("source_sha256") != source_digest(merged_file):
+                return None
+            payload_start = f.tell()
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return None
+
+    view = memoryview(mm)
+    pos = payload_start + header["payload_size"]
+    buffers = []
+    for size in header["buffer_sizes"]:
+        pos += -pos % _BUFFER_ALIGN
+        buffers.append(view[pos:pos + size])
+        pos += size
+    try:
+        payload = pickle.loads(view[payload_start:payload_start + header["payload_size"]], buffers=buffers)
+    except (ValueError, EOFError, pickle.UnpicklingError):
+        return None
+
+    shapes = payload["shapes"]
+    offsets = np.frombuffer(payload["offsets"], dtype=np.int64).reshape(shapes["offsets"])
+    ts_ids = np.frombuffer(payload["ts_ids"], dtype=np.int32).reshape(shapes["ts_ids"])
+    values = np.frombuffer(payload["values"], dtype=np.float64).reshape(shapes["values"])
+    return {
+        "bars": SnapshotBars(payload["symbols"], offsets, ts_ids, values, payload["timestamps"]),
+        "names": payload["names"],
+        "series_keys": payload["series_keys"],
+        "timestamps": payload["timestamps"],
+    }
+
+
+if __name__ == "__main__":
+    from tools.price_tools import get_merged_file_path
+
+    parser = argparse.ArgumentParser(description="Write warm-start snapshots of merged.jsonl")
+    parser.add_argument("--market", choices=["us", "cn", "all"], default="all")
+    args = parser.parse_args()
+
+    markets = ["us", "cn"] if args.market == "all" else [args.market]
+    for market in markets:
+        merged_file = get_merged_file_path(market)
+        path = build_snapshot(merged_file)
+        if path is None:
+            print(f"⚠️  Warning: {merged_file} not found, skipping snapshot")
+            continue
+        print(f"✅ {market}: {path} ({path.stat().st_size / 1024 / 1024:.2f} MB)")
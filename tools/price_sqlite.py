@@ -0,0 +1,308 @@
+"""
+Optional SQLite price backend.
+
+``merged.sqlite`` next to ``merged.jsonl`` holds one row per (symbol, timestamp)
+bar in a WAL-mode database whose primary key is (symbol, ts), plus a (ts, symbol)
+index for per-date queries. With ``PRICE_BACKEND=sqlite`` the price helpers
+query it instead of parsing merged.jsonl, which keeps start-up and memory flat
+for universes far larger than NASDAQ 100.
+
+The conversion records the size and mtime of merged.jsonl; a database whose
+source has changed since is ignored in favour of merged.jsonl. The merge
+scripts rebuild it when PRICE_BACKEND=sqlite.
+
+Usage:
+    python tools/price_sqlite.py [--market us|cn|all]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.price_store import BAR_FIELDS, PriceStore
+
+load_dotenv()
+
+FIELDS: Tuple[str, ...] = tuple(BAR_FIELDS.values())
+SQLITE_FORMAT_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (symbol, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_bars_ts ON bars (ts, symbol);
+CREATE TABLE IF NOT EXISTS symbols (
+    symbol TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# SQL 查询的变量个数上限较低，IN (...) 分批查询
+_IN_BATCH = 500
+
+
+def use_sqlite_backend() -> bool:
+    """Return True when PRICE_BACKEND (.env / environment) is set to "sqlite"."""
+    return os.getenv("PRICE_BACKEND", "jsonl").lower() == "sqlite"
+
+
+def get_sqlite_path(merged_file: Path) -> Path:
+    """Return the merged.sqlite path that sits next to a merged.jsonl file."""
+    return Path(merged_file).with_suffix(".sqlite")
+
+
+def convert_jsonl_to_sqlite(merged_file: Path, db_path: Optional[Path] = None) -> Optional[Path]:
+    """Convert merged.jsonl into a SQLite database.
+
+    The database is built under a temporary name and renamed into place.
+
+    Args:
+        merged_file: Path to merged.jsonl
+        db_path: Output path, merged.sqlite next to merged_file by default
+
+    Returns:
+        Path to the database, or None if merged_file does not exist
+    """
+    merged_file = Path(merged_file)
+    db_path = Path(db_path) if db_path is not None else get_sqlite_path(merged_file)
+    store = PriceStore(merged_file)
+    if not store.refresh():
+        print(f"⚠️  Warning: {merged_file} not found, skipping SQLite conversion")
+        return None
+
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{tmp_path}{suffix}").unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(_SCHEMA)
+        with conn:
+            for symbol, series in store.bars.items():
+                conn.executemany(
+                    "INSERT INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((symbol, ts, *(bar.get(field) for field in FIELDS)) for ts, bar in series.items()),
+                )
+            conn.executemany(
+                "INSERT INTO symbols VALUES (?, ?)",
+                ((symbol, store.names.get(symbol, "")) for symbol in store.bars),
+            )
+            st = os.stat(merged_file)
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("version", str(SQLITE_FORMAT_VERSION)),
+                    ("source_mtime_ns", str(st.st_mtime_ns)),
+                    ("source_size", str(st.st_size)),
+                ],
+            )
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+class SqlitePriceDB:
+    """Read-only queries against a merged.sqlite database, one connection per thread."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._symbols: Optional[Dict[str, str]] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _bar(row: Sequence) -> Dict[str, float]:
+        bar = {field: value for field, value in zip(FIELDS, row) if value is not None}
+        if "volume" in bar:
+            bar["volume"] = int(bar["volume"])
+        return bar
+
+    def _symbol_names(self) -> Dict[str, str]:
+        # symbols 表很小且转换后不再变化，读一次即可
+        if self._symbols is None:
+            self._symbols = dict(self._conn().execute("SELECT symbol, name FROM symbols"))
+        return self._symbols
+
+    def source_state(self) -> Optional[Tuple[int, int]]:
+        """Return (mtime_ns, size) of the merged.jsonl the database was converted from, None if not recorded."""
+        meta = dict(self._conn().execute("SELECT key, value FROM meta"))
+        try:
+            return int(meta["source_mtime_ns"]), int(meta["source_size"])
+        except (KeyError, ValueError):
+            return None
+
+    def has_symbol(self, symbol: str) -> bool:
+        return symbol in self._symbol_names()
+
+    def get_bar(self, symbol: str, ts: str) -> Optional[Dict[str, float]]:
+        """Return the bar for symbol at ts, or None if absent."""
+        row = self._conn().execute(
+            "SELECT open, high, low, close, volume FROM bars WHERE symbol = ? AND ts = ?", (symbol, ts)
+        ).fetchone()
+        return self._bar(row) if row is not None else None
+
+    def get_bars(self, symbols: Iterable[str], ts: str) -> Dict[str, Dict[str, float]]:
+        """Return {symbol: bar} for the symbols that have a bar at ts."""
+        symbols = list(dict.fromkeys(symbols))
+        result: Dict[str, Dict[str, float]] = {}
+        conn = self._conn()
+        for i in range(0, len(symbols), _IN_BATCH):
+            batch = symbols[i:i + _IN_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT symbol, open, high, low, close, volume FROM bars WHERE ts = ? AND symbol IN ({placeholders})",
+                (ts, *batch),
+            )
+            for row in rows:
+                result[row[0]] = self._bar(row[1:])
+        return result
+
+    def get_bars_asof(
+        self, symbols: Iterable[str], ts: str, max_staleness: Optional[int] = None, field: str = "close"
+    ) -> Dict[str, Dict[str, float]]:
+        """Return {symbol: bar} with each symbol's latest bar at or before ts that has field set.
+
+        Args:
+            symbols: Symbols to look up
+            ts: As-of timestamp
+            max_staleness: Maximum number of timestamps (of ts's resolution) between ts and the bar used
+            field: Field that must be present for a bar to count
+
+        Returns:
+            {symbol: bar} for symbols with a bar within the staleness limit
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        symbols = list(dict.fromkeys(symbols))
+        conn = self._conn()
+        resolution_filter = "length(ts) > 10" if " " in ts else "length(ts) = 10"
+        min_ts = ""
+        if max_staleness is not None:
+            row = conn.execute(
+                f"SELECT DISTINCT ts FROM bars WHERE ts <= ? AND {resolution_filter} ORDER BY ts DESC LIMIT 1 OFFSET ?",
+                (ts, max_staleness),
+            ).fetchone()
+            if row is not None:
+                min_ts = row[0]
+
+        result: Dict[str, Dict[str, float]] = {}
+        for i in range(0, len(symbols), _IN_BATCH):
+            batch = symbols[i:i + _IN_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"""SELECT b.symbol, b.open, b.high, b.low, b.close, b.volume FROM bars b
+                JOIN (SELECT symbol, MAX(ts) AS ts FROM bars
+                      WHERE ts <= ? AND ts >= ? AND {resolution_filter} AND {field} IS NOT NULL
+                      AND symbol IN ({placeholders}) GROUP BY symbol) m
+                ON b.symbol = m.symbol AND b.ts = m.ts""",
+                (ts, min_ts, *batch),
+            )
+            for row in rows:
+                result[row[0]] = self._bar(row[1:])
+        return result
+
+    def latest_timestamps(self, symbol: str, n: int = 5) -> List[str]:
+        """Return the n latest timestamps of symbol, newest first."""
+        rows = self._conn().execute("SELECT ts FROM bars WHERE symbol = ? ORDER BY ts DESC LIMIT ?", (symbol, n))
+        return [row[0] for row in rows]
+
+    def prev_timestamp(self, ts: str, intraday: bool) -> Optional[str]:
+        """Return the latest timestamp strictly before ts with the given resolution, or None."""
+        resolution_filter = "length(ts) > 10" if intraday else "length(ts) = 10"
+        row = self._conn().execute(
+            f"SELECT ts FROM bars WHERE ts < ? AND {resolution_filter} ORDER BY ts DESC LIMIT 1", (ts,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def names(self) -> Dict[str, str]:
+        """Return {symbol: name} for symbols carrying a name."""
+        return {symbol: name for symbol, name in self._symbol_names().items() if name}
+
+
+_dbs: Dict[Path, Tuple[int, Optional[Tuple[int, int]], SqlitePriceDB]] = {}
+_dbs_lock = threading.Lock()
+_missing_warned = set()
+_stale_warned = set()
+
+
+def get_sqlite_db(merged_file: Path) -> Optional[SqlitePriceDB]:
+    """Return the database for merged_file when PRICE_BACKEND=sqlite and merged.sqlite is up to date.
+
+    A database replaced by a new conversion is reopened on the next call. A
+    database converted from an older merged.jsonl (size or mtime differ from
+    its meta rows) is ignored, so callers fall back to merged.jsonl.
+    """
+    if not use_sqlite_backend():
+        return None
+    db_path = get_sqlite_path(Path(merged_file)).resolve()
+    try:
+        inode = os.stat(db_path).st_ino
+    except OSError:
+        if db_path not in _missing_warned:
+            _missing_warned.add(db_path)
+            print(f"⚠️  Warning: PRICE_BACKEND=sqlite but {db_path} not found, falling back to merged.jsonl")
+        return None
+    cached = _dbs.get(db_path)
+    if cached is None or cached[0] != inode:
+        with _dbs_lock:
+            db = SqlitePriceDB(db_path)
+            cached = _dbs[db_path] = (inode, db.source_state(), db)
+
+    try:
+        st = os.stat(merged_file)
+    except OSError:
+        # 源文件不存在时无从比较，也没有可回退的 JSONL，继续使用数据库
+        return cached[2]
+    source_state = (st.st_mtime_ns, st.st_size)
+    if cached[1] != source_state:
+        if (db_path, source_state) not in _stale_warned:
+            _stale_warned.add((db_path, source_state))
+            print(f"⚠️  Warning: {db_path} is older than {merged_file}, falling back to merged.jsonl; rerun tools/price_sqlite.py")
+        return None
+    return cached[2]
+
+
+if __name__ == "__main__":
+    from tools.price_tools import get_merged_file_path
+
+    parser = argparse.ArgumentParser(description="Convert merged.jsonl into merged.sqlite")
+    parser.add_argument("--market", choices=["us", "cn", "all"], default="all")
+    args = parser.parse_args()
+
+    markets = ["us", "cn"] if args.market == "all" else [args.market]
+    for market in markets:
+        db_path = convert_jsonl_to_sqlite(get_merged_file_path(market))
+        if db_path is not None:
+            print(f"✅ {market}: {db_path} ({db_path.stat().st_size / 1024 / 1024:.2f} MB)")
@@ -0,0 +1,239 @@
+"""
+In-memory price index shared by the price helpers in tools/price_tools.py.
+
+Each merged.jsonl is parsed once per process into a
+``{symbol: {timestamp: bar}}`` index with float fields, and parsed again only
+when the file's mtime or size changes. A warm-start snapshot written next to
+the file by the merge scripts (tools/price_snapshot.py) replaces the parse
+when it matches the file's contents, and a cube shared by a parent process (tools/shared_cube.py)
+replaces both.
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from tools.merged_schema import (BAR_FIELDS, SERIES_KEY, doc_symbol,
+                                 find_legacy_series, is_normalized)
+from tools.trading_calendar import (DAILY, INTRADAY, TradingCalendar,
+                                    timestamp_resolution)
+
+
+class PriceStore:
+    """Parsed, typed view of one merged.jsonl file.
+
+    Attributes:
+        path: Path to the merged.jsonl file
+        bars: {symbol: {timestamp: {"open": float, "high": float, ...}}}
+        names: {symbol: display name} for symbols carrying "2.1. Name"
+        series_keys: {symbol: series key found in the source line ("Time Series (...)" or "bars")}
+        version: Number of loads so far; changes whenever the file is re-parsed
+    """
+
+    def __init__(self, path: Path, use_snapshot: Optional[bool] = None):
+        self.path = Path(path)
+        self.bars: Mapping[str, Dict[str, Dict[str, float]]] = {}
+        self.names: Dict[str, str] = {}
+        self.series_keys: Dict[str, str] = {}
+        self._calendars: Dict[str, TradingCalendar] = {}
+        self._sorted: Dict[str, Tuple[List[str], List[Dict[str, float]]]] = {}
+        self._cube = None
+        self._file_state: Optional[Tuple[int, int]] = None
+        self.version = 0
+        self._use_snapshot = use_snapshot
+        self._lock = threading.Lock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def refresh(self) -> bool:
+        """Reload the index if the file changed since the last load.
+
+        Returns:
+            True if the file exists and the index is usable, False otherwise
+        """
+        state = self._stat()
+        if state is None:
+            return False
+        if state == self._file_state:
+            return True
+        with self._lock:
+            if state != self._file_state:
+                self._load(state)
+                self._file_state = state
+        return True
+
+    def _load(self, state: Tuple[int, int]) -> None:
+        from tools.price_snapshot import load_snapshot, snapshots_enabled
+
+        from tools.shared_cube import CubeBars, attach_shared_cube
+
+        cube = attach_shared_cube(self.path, state)
+        use_snapshot = snapshots_enabled() if self._use_snapshot is None else self._use_snapshot
+        snapshot = load_snapshot(self.path, state) if use_snapshot and cube is None else None
+        if cube is not None:
+            # 父进程已通过共享内存提供价格立方体，直接映射而不再解析文件
+            bars, names, series_keys = CubeBars(cube), cube.names, cube.series_keys
+            timestamps = cube.timestamps
+        elif snapshot is not None:
+            bars, names, series_keys = snapshot["bars"], snapshot["names"], snapshot["series_keys"]
+            timestamps: Iterable[str] = snapshot["timestamps"]
+        else:
+            # 快照缺失或过期时只解析，不在读取路径上写数据目录（快照由合并脚本生成）
+            bars, names, series_keys, timestamps = self._parse()
+
+        self.bars = bars
+        self.names = names
+        self.series_keys = series_keys
+        by_resolution: Dict[str, List[str]] = {DAILY: [], INTRADAY: []}
+        for ts in timestamps:
+            by_resolution[timestamp_resolution(ts)].append(ts)
+        self._calendars = {resolution: TradingCalendar(values) for resolution, values in by_resolution.items()}
+        self._sorted = {}
+        self._cube = cube
+        self.version += 1
+
+    def _parse(self):
+        """Parse merged.jsonl into (bars, names, series_keys, timestamps)."""
+        bars: Dict[str, Dict[str, Dict[str, float]]] = {}
+        names: Dict[str, str] = {}
+        series_keys: Dict[str, str] = {}
+        timestamps: Set[str] = set()
+
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    doc = json.loads(line)
+                except Exception:
+                    continue
+                if not isinstance(doc, dict):
+                    continue
+                symbol = doc_symbol(doc)
+                if not symbol:
+                    continue
+
+                if is_normalized(doc):
+                    # 规范化格式：数值已是数字类型，直接使用
+                    name = doc.get("name", "")
+                    series_key = SERIES_KEY
+                    symbol_bars = doc.get(SERIES_KEY)
+                    if not isinstance(symbol_bars, dict):
+                        continue
+                else:
+                    meta = doc.get("Meta Data", {})
+                    name = meta.get("2.1. Name", "")
+                    series_key, series = find_legacy_series(doc)
+                    if not isinstance(series, dict):
+                        continue
+                    symbol_bars = {}
+                    for ts, raw_bar in series.items():
+                        if not isinstance(raw_bar, dict):
+                            continue
+                        bar: Dict[str, float] = {}
+                        for raw_key, field in BAR_FIELDS.items():
+                            value = raw_bar.get(raw_key)
+                            if value is None:
+                                continue
+                            try:
+                                bar[field] = float(value)
+                            except (TypeError, ValueError):
+                                continue
+                        symbol_bars[ts] = bar
+                if name:
+                    names[symbol] = name
+
+                bars[symbol] = symbol_bars
+                series_keys[symbol] = series_key
+                timestamps.update(symbol_bars)
+
+        return bars, names, series_keys, timestamps
+
+    def get_bar(self, symbol: str, timestamp: str) -> Optional[Dict[str, float]]:
+        """Return the typed bar for symbol at timestamp, or None if absent."""
+        lookup = getattr(self.bars, "get_bar", None)
+        if lookup is not None:
+            return lookup(symbol, timestamp)
+        series = self.bars.get(symbol)
+        if series is None:
+            return None
+        return series.get(timestamp)
+
+    def sorted_series(self, symbol: str) -> Tuple[List[str], List[Dict[str, float]]]:
+        """Return (timestamps, bars) for symbol as parallel lists in ascending timestamp order.
+
+        Built on first use after each load; both lists are shared and must not be mutated.
+        """
+        entry = self._sorted.get(symbol)
+        if entry is None:
+            series = self.bars.get(symbol, {})
+            timestamps = sorted(series)
+            entry = self._sorted[symbol] = (timestamps, [series[ts] for ts in timestamps])
+        return entry
+
+    def bars_between(
+        self,
+        symbol: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        include_end: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, Dict[str, float]]]:
+        """Return (timestamp, bar) pairs for symbol with start <= timestamp <= end.
+
+        Args:
+            symbol: Stock symbol
+            start: Inclusive lower bound, None for no lower bound
+            end: Upper bound, None for no upper bound
+            include_end: Whether a timestamp equal to end is included
+            limit: Keep only the latest ``limit`` bars of the window
+
+        Returns:
+            Ascending list of (timestamp, bar) pairs
+        """
+        timestamps, bars = self.sorted_series(symbol)
+        lo = bisect_left(timestamps, start) if start is not None else 0
+        hi = len(timestamps)
+        if end is not None:
+            hi = bisect_right(timestamps, end) if include_end else bisect_left(timestamps, end)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return list(zip(timestamps[lo:hi], bars[lo:hi]))
+
+    def calendar(self, resolution: str = DAILY) -> TradingCalendar:
+        """Return the trading calendar for DAILY ("YYYY-MM-DD") or INTRADAY timestamps."""
+        return self._calendars.get(resolution) or TradingCalendar(())
+
+    def cube(self):
+        """Return an in-memory PriceCube of the current bars, built on first use after each load."""
+        cube = self._cube
+        if cube is None:
+            from tools.price_cube import PriceCube
+
+            cube = self._cube = PriceCube.from_store(self)
+        return cube
+
+
+_stores: Dict[Path, PriceStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_price_store(path: Path) -> PriceStore:
+    """Return the process-wide PriceStore for path.
+
+    Callers should call ``refresh()`` before reading so that on-disk changes are picked up.
+    """
+    key = Path(path).resolve()
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(key, PriceStore(key))
+    return store
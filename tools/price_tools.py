@@ -3,7 +3,6 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
-import json
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -14,6 +13,8 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 from tools.general_tools import get_config_value
+from tools.price_store import PriceStore, get_price_store
+from tools.trading_calendar import DAILY, INTRADAY, TradingCalendar
 
 
 def get_market_type() -> str:
@@ -198,6 +199,10 @@ all_sse_50_symbols = [
 ]
 
 
+# as-of 查询最多向前回溯的 bar 数量（昨日无数据时沿用最近的价格）
+ASOF_MAX_STALENESS = 5
+
+
 def get_merged_file_path(market: str = "us") -> Path:
     """Get merged.jsonl path based on market type.
 
@@ -214,6 +219,65 @@ def get_merged_file_path(market: str = "us") -> Path:
         return base_dir / "data" / "merged.jsonl"
 
 
+def _get_store(market: str = "us", merged_path: Optional[str] = None) -> PriceStore:
+    """Get the shared PriceStore for a market or an explicit merged.jsonl path."""
+    merged_file = get_merged_file_path(market) if merged_path is None else Path(merged_path)
+    return get_price_store(merged_file)
+
+
+def _get_sqlite_db(market: str = "us", merged_path: Optional[str] = None):
+    """Get the SQLite price database when PRICE_BACKEND=sqlite and merged.sqlite exists, else None."""
+    from tools.price_sqlite import get_sqlite_db
+
+    merged_file = get_merged_file_path(market) if merged_path is None else Path(merged_path)
+    return get_sqlite_db(merged_file)
+
+
+def get_trading_calendar(
+    market: str = "us", resolution: str = DAILY, merged_path: Optional[str] = None
+) -> TradingCalendar:
+    """Get the trading calendar built from merged.jsonl.
+
+    Args:
+        market: Market type ("us" or "cn")
+        resolution: "daily" for "YYYY-MM-DD" bars, "intraday" for "YYYY-MM-DD HH:MM:SS" bars
+        merged_path: Optional custom merged.jsonl path
+
+    Returns:
+        TradingCalendar, empty if the file does not exist
+    """
+    store = _get_store(market, merged_path)
+    if not store.refresh():
+        return TradingCalendar(())
+    return store.calendar(resolution)
+
+
+def get_price_cube(market: str = "us", merged_path: Optional[str] = None):
+    """Get the symbol x timestamp PriceCube for a market.
+
+    Uses the memory-mapped cube next to merged.jsonl (built by tools/price_cube.py)
+    when it is up to date, otherwise builds one in memory from the PriceStore.
+
+    Args:
+        market: Market type ("us" or "cn")
+        merged_path: Optional custom merged.jsonl path
+
+    Returns:
+        PriceCube, or None if merged.jsonl does not exist
+    """
+    from tools.price_cube import load_price_cube
+
+    merged_file = get_merged_file_path(market) if merged_path is None else Path(merged_path)
+    cube = load_price_cube(merged_file)
+    if cube is not None:
+        return cube
+
+    store = get_price_store(merged_file)
+    if not store.refresh():
+        return None
+    return store.cube()
+
+
 def is_trading_day(date: str, market: str = "us") -> bool:
     """Check if a given date is a trading day by looking up merged.jsonl.
 
@@ -224,28 +288,13 @@ def is_trading_day(date: str, market: str = "us") -> bool:
     Returns:
         True if the date exists in merged.jsonl (is a trading day), False otherwise
     """
-    merged_file_path = get_merged_file_path(market)
+    store = _get_store(market)
 
-    if not merged_file_path.exists():
-        print(f"⚠️  Warning: {merged_file_path} not found, cannot validate trading day")
+    if not store.refresh():
+        print(f"⚠️  Warning: {store.path} not found, cannot validate trading day")
         return False
 
-    try:
-        with open(merged_file_path, "r", encoding="utf-8") as f:
-            # Read first line to check if date exists
-            for line in f:
-                try:
-                    data = json.loads(line.strip())
-                    time_series = data.get("Time Series (Daily)", {})
-                    if date in time_series:
-                        return True
-                except json.JSONDecodeError:
-                    continue
-            # If we get here, checked all stocks and date was not found in any
-            return False
-    except Exception as e:
-        print(f"⚠️  Error checking trading day: {e}")
-        return False
+    return store.calendar(DAILY).contains(date)
 
 
 def get_all_trading_days(market: str = "us") -> List[str]:
@@ -257,27 +306,13 @@ def get_all_trading_days(market: str = "us") -> List[str]:
     Returns:
         Sorted list of trading dates in "YYYY-MM-DD" format
     """
-    merged_file_path = get_merged_file_path(market)
+    store = _get_store(market)
 
-    if not merged_file_path.exists():
-        print(f"⚠️  Warning: {merged_file_path} not found")
+    if not store.refresh():
+        print(f"⚠️  Warning: {store.path} not found")
         return []
 
-    trading_days = set()
-    try:
-        with open(merged_file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    data = json.loads(line.strip())
-                    time_series = data.get("Time Series (Daily)", {})
-                    # Add all dates from this stock's time series
-                    trading_days.update(time_series.keys())
-                except json.JSONDecodeError:
-                    continue
-        return sorted(list(trading_days))
-    except Exception as e:
-        print(f"⚠️  Error reading trading days: {e}")
-        return []
+    return list(store.calendar(DAILY))
 
 
 def get_stock_name_mapping(market: str = "us") -> Dict[str, str]:
@@ -289,38 +324,20 @@ def get_stock_name_mapping(market: str = "us") -> Dict[str, str]:
     Returns:
         Dictionary mapping symbols to names, e.g. {"600519.SH": "贵州茅台"}
     """
-    merged_file_path = get_merged_file_path(market)
+    from tools.symbol_registry import get_symbol_registry
 
-    if not merged_file_path.exists():
-        return {}
-
-    name_map = {}
-    try:
-        with open(merged_file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    data = json.loads(line.strip())
-                    meta = data.get("Meta Data", {})
-                    symbol = meta.get("2. Symbol")
-                    name = meta.get("2.1. Name", "")
-                    if symbol and name:
-                        name_map[symbol] = name
-                except json.JSONDecodeError:
-                    continue
-        return name_map
-    except Exception as e:
-        print(f"⚠️  Error reading stock names: {e}")
-        return {}
+    return dict(get_symbol_registry().names(market))
 
 
 def format_price_dict_with_names(
-    price_dict: Dict[str, Optional[float]], market: str = "us"
+    price_dict: Dict[str, Optional[float]], market: str = "us", name_map: Optional[Dict[str, str]] = None
 ) -> Dict[str, Optional[float]]:
     """Format price dictionary to include stock names for display.
 
     Args:
         price_dict: Original price dictionary with keys like "600519.SH_price"
         market: Market type ("us" or "cn")
+        name_map: Optional {symbol: name}; read from the symbol registry if omitted
 
     Returns:
         New dictionary with keys like "600519.SH (贵州茅台)_price" for CN market,
@@ -329,7 +346,10 @@ def format_price_dict_with_names(
     if market != "cn":
         return price_dict
 
-    name_map = get_stock_name_mapping(market)
+    if name_map is None:
+        from tools.symbol_registry import get_symbol_registry
+
+        name_map = get_symbol_registry().names(market)
     if not name_map:
         return price_dict
 
@@ -352,7 +372,7 @@ def format_price_dict_with_names(
 def get_yesterday_date(today_date: str, merged_path: Optional[str] = None, market: str = "us") -> str:
     """
     获取输入日期的上一个交易日或时间点。
-    从 merged.jsonl 读取所有可用的交易时间，然后找到 today_date 的上一个时间。
+    在由 merged.jsonl 构建的交易日历（TradingCalendar）上二分查找 today_date 的上一个时间。
     
     Args:
         today_date: 日期字符串，格式 YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS。
@@ -362,90 +382,48 @@ def get_yesterday_date(today_date: str, merged_path: Optional[str] = None, marke
     Returns:
         yesterday_date: 上一个交易日或时间点的字符串，格式与输入一致。
     """
-    # 解析输入日期/时间
-    if ' ' in today_date:
-        input_dt = datetime.strptime(today_date, "%Y-%m-%d %H:%M:%S")
-        date_only = False
-    else:
-        input_dt = datetime.strptime(today_date, "%Y-%m-%d")
-        date_only = True
-    
-    # 获取 merged.jsonl 文件路径
-    if merged_path is None:
-        merged_file = get_merged_file_path(market)
-    else:
-        merged_file = Path(merged_path)
-    
-    if not merged_file.exists():
-        # 如果文件不存在，根据输入类型回退
-        print(f"merged.jsonl file does not exist at {merged_file}")
-        if date_only:
-            yesterday_dt = input_dt - timedelta(days=1)
-            while yesterday_dt.weekday() >= 5:
-                yesterday_dt -= timedelta(days=1)
-            return yesterday_dt.strftime("%Y-%m-%d")
-        else:
-            yesterday_dt = input_dt - timedelta(hours=1)
-            return yesterday_dt.strftime("%Y-%m-%d %H:%M:%S")
-    
-    # 从 merged.jsonl 读取所有可用的交易时间
-    all_timestamps = set()
-    
-    with merged_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-                # 查找所有以 "Time Series" 开头的键
-                for key, value in doc.items():
-                    if key.startswith("Time Series"):
-                        if isinstance(value, dict):
-                            all_timestamps.update(value.keys())
-                        break
-            except Exception:
-                continue
-    
-    if not all_timestamps:
-        # 如果没有找到任何时间戳，根据输入类型回退
+    date_only = ' ' not in today_date
+
+    store = _get_store(market, merged_path)
+    previous_timestamp = None
+    db = _get_sqlite_db(market, merged_path)
+
+    if db is not None:
         if date_only:
-            yesterday_dt = input_dt - timedelta(days=1)
-            while yesterday_dt.weekday() >= 5:
-                yesterday_dt -= timedelta(days=1)
-            return yesterday_dt.strftime("%Y-%m-%d")
+            previous_timestamp = db.prev_timestamp(today_date, intraday=False)
+            if previous_timestamp is None:
+                previous_timestamp = db.prev_timestamp(today_date, intraday=True)
+                if previous_timestamp is not None:
+                    previous_timestamp = previous_timestamp[:10]
         else:
-            yesterday_dt = input_dt - timedelta(hours=1)
-            return yesterday_dt.strftime("%Y-%m-%d %H:%M:%S")
-    
-    # 将所有时间戳转换为 datetime 对象，并找到小于 today_date 的最大时间戳
-    previous_timestamp = None
-    
-    for ts_str in all_timestamps:
-        try:
-            ts_dt = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-            if ts_dt < input_dt:
-                if previous_timestamp is None or ts_dt > previous_timestamp:
-                    previous_timestamp = ts_dt
-        except Exception:
-            continue
-    
-    # 如果没有找到更早的时间戳，根据输入类型回退
-    if previous_timestamp is None:
+            previous_timestamp = db.prev_timestamp(today_date, intraday=True)
+    elif store.refresh():
         if date_only:
-            yesterday_dt = input_dt - timedelta(days=1)
-            while yesterday_dt.weekday() >= 5:
-                yesterday_dt -= timedelta(days=1)
-            return yesterday_dt.strftime("%Y-%m-%d")
+            calendar = store.calendar(DAILY)
+            if calendar:
+                previous_timestamp = calendar.prev(today_date)
+            else:
+                # 只有小时级数据时，取上一个有数据的日期
+                previous_timestamp = store.calendar(INTRADAY).prev(today_date)
+                if previous_timestamp is not None:
+                    previous_timestamp = previous_timestamp[:10]
         else:
-            yesterday_dt = input_dt - timedelta(hours=1)
-            return yesterday_dt.strftime("%Y-%m-%d %H:%M:%S")
+            previous_timestamp = store.calendar(INTRADAY).prev(today_date)
+    else:
+        print(f"merged.jsonl file does not exist at {store.path}")
+
+    if previous_timestamp is not None:
+        return previous_timestamp
 
-    # 返回结果
+    # 如果文件不存在或没有找到更早的时间戳，根据输入类型回退
     if date_only:
-        return previous_timestamp.strftime("%Y-%m-%d")
+        yesterday_dt = datetime.strptime(today_date, "%Y-%m-%d") - timedelta(days=1)
+        while yesterday_dt.weekday() >= 5:
+            yesterday_dt -= timedelta(days=1)
+        return yesterday_dt.strftime("%Y-%m-%d")
     else:
-        return previous_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-
+        yesterday_dt = datetime.strptime(today_date, "%Y-%m-%d %H:%M:%S") - timedelta(hours=1)
+        return yesterday_dt.strftime("%Y-%m-%d %H:%M:%S")
 
 
 def get_open_prices(
@@ -462,52 +440,32 @@ def get_open_prices(
     Returns:
         {symbol_price: open_price 或 None} 的字典；若未找到对应日期或标的，则值为 None。
     """
-    wanted = set(symbols)
     results: Dict[str, Optional[float]] = {}
 
-    if merged_path is None:
-        merged_file = get_merged_file_path(market)
-    else:
-        merged_file = Path(merged_path)
+    db = _get_sqlite_db(market, merged_path)
+    if db is not None:
+        for sym, bar in db.get_bars(symbols, today_date).items():
+            results[f"{sym}_price"] = bar.get("open")
+        return results
 
-    if not merged_file.exists():
+    store = _get_store(market, merged_path)
+    if not store.refresh():
         return results
 
-    with merged_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-            except Exception:
-                continue
-            meta = doc.get("Meta Data", {}) if isinstance(doc, dict) else {}
-            sym = meta.get("2. Symbol")
-            if sym not in wanted:
-                continue
-            # 查找所有以 "Time Series" 开头的键
-            series = None
-            for key, value in doc.items():
-                if key.startswith("Time Series"):
-                    series = value
-                    break
-            if not isinstance(series, dict):
-                continue
-            bar = series.get(today_date)
-            
-            if isinstance(bar, dict):
-                open_val = bar.get("1. buy price")
-                
-                try:
-                    results[f"{sym}_price"] = float(open_val) if open_val is not None else None
-                except Exception:
-                    results[f"{sym}_price"] = None
+    for sym in dict.fromkeys(symbols):
+        bar = store.get_bar(sym, today_date)
+        if bar is not None:
+            results[f"{sym}_price"] = bar.get("open")
 
     return results
 
 
 def get_yesterday_open_and_close_price(
-    today_date: str, symbols: List[str], merged_path: Optional[str] = None, market: str = "us"
+    today_date: str,
+    symbols: List[str],
+    merged_path: Optional[str] = None,
+    market: str = "us",
+    max_staleness: Optional[int] = None,
 ) -> Tuple[Dict[str, Optional[float]], Dict[str, Optional[float]]]:
     """从 data/merged.jsonl 中读取指定日期与股票的昨日买入价和卖出价。
 
@@ -516,96 +474,62 @@ def get_yesterday_open_and_close_price(
         symbols: 需要查询的股票代码列表。
         merged_path: 可选，自定义 merged.jsonl 路径；默认读取项目根目录下 data/merged.jsonl。
         market: 市场类型，"us" 为美股，"cn" 为A股
+        max_staleness: 可选，昨日无数据时最多向前回溯的 bar 数量（as-of 查询）；None 表示不回溯。
 
     Returns:
         (买入价字典, 卖出价字典) 的元组；若未找到对应日期或标的，则值为 None。
     """
-    wanted = set(symbols)
     buy_results: Dict[str, Optional[float]] = {}
     sell_results: Dict[str, Optional[float]] = {}
 
-    if merged_path is None:
-        merged_file = get_merged_file_path(market)
-    else:
-        merged_file = Path(merged_path)
+    db = _get_sqlite_db(market, merged_path)
+    if db is not None:
+        yesterday_date = get_yesterday_date(today_date, merged_path=merged_path, market=market)
+        if max_staleness is None:
+            bars = db.get_bars(symbols, yesterday_date)
+        else:
+            bars = db.get_bars_asof(symbols, yesterday_date, max_staleness)
+        for sym in dict.fromkeys(symbols):
+            if not db.has_symbol(sym):
+                continue
+            bar = bars.get(sym, {})
+            buy_results[f"{sym}_price"] = bar.get("open")
+            sell_results[f"{sym}_price"] = bar.get("close")
+        return buy_results, sell_results
 
-    if not merged_file.exists():
+    store = _get_store(market, merged_path)
+    if not store.refresh():
         return buy_results, sell_results
 
     yesterday_date = get_yesterday_date(today_date, merged_path=merged_path, market=market)
 
-    with merged_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-            except Exception:
-                continue
-            meta = doc.get("Meta Data", {}) if isinstance(doc, dict) else {}
-            sym = meta.get("2. Symbol")
-            if sym not in wanted:
-                continue
-            # 查找所有以 "Time Series" 开头的键
-            series = None
-            for key, value in doc.items():
-                if key.startswith("Time Series"):
-                    series = value
-                    break
-            if not isinstance(series, dict):
+    if max_staleness is not None:
+        # 一次 searchsorted 为所有标的找到昨日（或之前最近 max_staleness 个 bar 内）的最新 bar
+        cube = get_price_cube(market, merged_path)
+        wanted = list(dict.fromkeys(symbols))
+        rows = cube.rows(wanted)
+        cols = cube.asof_columns(yesterday_date, wanted, "close", max_staleness)
+        opens = cube.take("open", rows, cols).tolist()
+        closes = cube.take("close", rows, cols).tolist()
+        for sym, row, open_price, close_price in zip(wanted, rows.tolist(), opens, closes):
+            if row < 0:
                 continue
+            buy_results[f"{sym}_price"] = open_price if open_price == open_price else None
+            sell_results[f"{sym}_price"] = close_price if close_price == close_price else None
+        return buy_results, sell_results
 
-            # 尝试获取昨日买入价和卖出价
-            bar = series.get(yesterday_date)
-            if isinstance(bar, dict):
-                buy_val = bar.get("1. buy price")  # 买入价字段
-                sell_val = bar.get("4. sell price")  # 卖出价字段
-
-                try:
-                    buy_price = float(buy_val) if buy_val is not None else None
-                    sell_price = float(sell_val) if sell_val is not None else None
-                    buy_results[f"{sym}_price"] = buy_price
-                    sell_results[f"{sym}_price"] = sell_price
-                except Exception:
-                    buy_results[f"{sym}_price"] = None
-                    sell_results[f"{sym}_price"] = None
-            else:
-                # 如果昨日没有数据，尝试向前查找最近的交易日
-                # raise ValueError(f"No data found for {sym} on {yesterday_date}")
-                # print(f"No data found for {sym} on {yesterday_date}")
-                buy_results[f'{sym}_price'] = None
-                sell_results[f'{sym}_price'] = None
-                # today_dt = datetime.strptime(today_date, "%Y-%m-%d")
-                # yesterday_dt = today_dt - timedelta(days=1)
-                # current_date = yesterday_dt
-                # found_data = False
-                
-                # # 最多向前查找5个交易日
-                # for _ in range(5):
-                #     current_date -= timedelta(days=1)
-                #     # 跳过周末
-                #     while current_date.weekday() >= 5:
-                #         current_date -= timedelta(days=1)
-                    
-                #     check_date = current_date.strftime("%Y-%m-%d")
-                #     bar = series.get(check_date)
-                #     if isinstance(bar, dict):
-                #         buy_val = bar.get("1. buy price")
-                #         sell_val = bar.get("4. sell price")
-                        
-                #         try:
-                #             buy_price = float(buy_val) if buy_val is not None else None
-                #             sell_price = float(sell_val) if sell_val is not None else None
-                #             buy_results[f'{sym}_price'] = buy_price
-                #             sell_results[f'{sym}_price'] = sell_price
-                #             found_data = True
-                #             break
-                #         except Exception:
-                #             continue
-                
-                # if not found_data:
-                #     buy_results[f'{sym}_price'] = None
-                #     sell_results[f'{sym}_price'] = None
+    for sym in dict.fromkeys(symbols):
+        if sym not in store.bars:
+            continue
+
+        bar = store.get_bar(sym, yesterday_date)
+        if bar is not None:
+            buy_results[f"{sym}_price"] = bar.get("open")  # 买入价字段
+            sell_results[f"{sym}_price"] = bar.get("close")  # 卖出价字段
+        else:
+            # 昨日没有数据；传入 max_staleness 可向前查找最近的交易日
+            buy_results[f'{sym}_price'] = None
+            sell_results[f'{sym}_price'] = None
 
     return buy_results, sell_results
 
@@ -667,56 +591,25 @@ def get_today_init_position(today_date: str, signature: str) -> Dict[str, float]
     Returns:
         {symbol: weight} 的字典；若未找到对应日期，则返回空字典。
     """
-    from tools.general_tools import get_config_value
+    from tools.position_ledger import get_position_ledger
 
-    base_dir = Path(__file__).resolve().parents[1]
-
-    # Get log_path from config, default to "agent_data" for backward compatibility
-    log_path = get_config_value("LOG_PATH", "./data/agent_data")
-    if log_path.startswith("./data/"):
-        log_path = log_path[7:]  # Remove "./data/" prefix
-
-    position_file = base_dir / "data" / log_path / signature / "position" / "position.jsonl"
-#     position_file = base_dir / "data" / "agent_data" / signature / "position" / "position.jsonl"
-
-    if not position_file.exists():
-        print(f"Position file {position_file} does not exist")
+    ledger = get_position_ledger(signature)
+    if not ledger.refresh():
+        print(f"Position file {ledger.path} does not exist")
         return {}
-    
-    # 获取市场类型，智能判断
-    market = get_market_type()
-    yesterday_date = get_yesterday_date(today_date, market=market)
-    
-    max_id = -1
-    latest_positions = {}
-    all_records = []
-  
-    with position_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-                record_date = doc.get("date")
-                if record_date and record_date < today_date:
-                    all_records.append(doc)
-            except Exception:
-                continue
 
-    if not all_records:
+    # 早于今天的最新一条记录（按日期、id），由 PositionLedger 在内存中维护
+    record = ledger.latest_before(today_date)
+    if record is None:
         return {}
-
-    # Sort by date (descending) then by id (descending) to get the most recent record
-    all_records.sort(key=lambda x: (x.get("date", ""), x.get("id", 0)), reverse=True)
-
-    return all_records[0].get("positions", {})
+    return dict(record.get("positions", {}))
 
 
 def get_latest_position(today_date: str, signature: str) -> Tuple[Dict[str, float], int]:
     """
     获取最新持仓。从 ../data/agent_data/{signature}/position/position.jsonl 中读取。
     优先选择当天 (today_date) 中 id 最大的记录；
-    若当天无记录，则回退到上一个交易日，选择该日中 id 最大的记录。
+    若当天无记录，则回退到今天之前最新的记录（按日期和 id），即上一个有记录的交易日中 id 最大的记录。
 
     Args:
         today_date: 日期字符串，格式 YYYY-MM-DD，代表今天日期。
@@ -727,86 +620,12 @@ def get_latest_position(today_date: str, signature: str) -> Tuple[Dict[str, floa
           - positions: {symbol: weight} 的字典；若未找到任何记录，则为空字典。
           - max_id: 选中记录的最大 id；若未找到任何记录，则为 -1.
     """
-    from tools.general_tools import get_config_value
-
-    base_dir = Path(__file__).resolve().parents[1]
-
-    # Get log_path from config, default to "agent_data" for backward compatibility
-    log_path = get_config_value("LOG_PATH", "./data/agent_data")
-    if log_path.startswith("./data/"):
-        log_path = log_path[7:]  # Remove "./data/" prefix
-
-    position_file = base_dir / "data" / log_path / signature / "position" / "position.jsonl"
+    from tools.position_ledger import get_position_ledger
 
-    if not position_file.exists():
+    ledger = get_position_ledger(signature)
+    if not ledger.refresh():
         return {}, -1
-
-    # 获取市场类型，智能判断
-    market = get_market_type()
-    
-    # Step 1: 先查找当天的记录
-    max_id_today = -1
-    latest_positions_today: Dict[str, float] = {}
-    
-    with position_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-                if doc.get("date") == today_date:
-                    current_id = doc.get("id", -1)
-                    if current_id > max_id_today:
-                        max_id_today = current_id
-                        latest_positions_today = doc.get("positions", {})
-            except Exception:
-                continue
-    
-    # 如果当天有记录，直接返回
-    if max_id_today >= 0 and latest_positions_today:
-        return latest_positions_today, max_id_today
-    
-    # Step 2: 当天没有记录，则回退到上一个交易日
-    prev_date = get_yesterday_date(today_date, market=market)
-    
-    max_id_prev = -1
-    latest_positions_prev: Dict[str, float] = {}
-
-    with position_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-                if doc.get("date") == prev_date:
-                    current_id = doc.get("id", -1)
-                    if current_id > max_id_prev:
-                        max_id_prev = current_id
-                        latest_positions_prev = doc.get("positions", {})
-            except Exception:
-                continue
-    
-    # 如果前一天也没有记录，尝试找文件中最新的记录（按日期和id排序）
-    if max_id_prev < 0 or not latest_positions_prev:
-        all_records = []
-        with position_file.open("r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                try:
-                    doc = json.loads(line)
-                    if doc.get("date") and doc.get("date") < today_date:
-                        all_records.append(doc)
-                except Exception:
-                    continue
-        
-        if all_records:
-            # 按日期和id排序，取最新的一条
-            all_records.sort(key=lambda x: (x.get("date", ""), x.get("id", 0)), reverse=True)
-            latest_positions_prev = all_records[0].get("positions", {})
-            max_id_prev = all_records[0].get("id", -1)
-    
-    return latest_positions_prev, max_id_prev
+    return ledger.latest_position(today_date)
 
 def add_no_trade_record(today_date: str, signature: str):
     """
@@ -818,28 +637,21 @@ def add_no_trade_record(today_date: str, signature: str):
     Returns:
         None
     """
-    save_item = {}
-    current_position, current_action_id = get_latest_position(today_date, signature)
-    
-    save_item["date"] = today_date
-    save_item["id"] = current_action_id + 1
-    save_item["this_action"] = {"action": "no_trade", "symbol": "", "amount": 0}
-
-    save_item["positions"] = current_position
+    from tools.position_ledger import get_position_ledger, get_position_lock
 
-    from tools.general_tools import get_config_value
+    # 读取最新持仓到写入记录之间持有锁，避免与并发交易分配到相同的 id
+    with get_position_lock(signature):
+        save_item = {}
+        current_position, current_action_id = get_latest_position(today_date, signature)
 
-    base_dir = Path(__file__).resolve().parents[1]
-
-    # Get log_path from config, default to "agent_data" for backward compatibility
-    log_path = get_config_value("LOG_PATH", "./data/agent_data")
-    if log_path.startswith("./data/"):
-        log_path = log_path[7:]  # Remove "./data/" prefix
+        save_item["date"] = today_date
+        save_item["id"] = current_action_id + 1
+        save_item["this_action"] = {"action": "no_trade", "symbol": "", "amount": 0}
 
-    position_file = base_dir / "data" / log_path / signature / "position" / "position.jsonl"
+        save_item["positions"] = current_position
 
-    with position_file.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(save_item) + "\n")
+        seq = get_position_ledger(signature).append(save_item, sync=False)
+    get_position_ledger(signature).sync(seq)
     return
 
 
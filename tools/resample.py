@@ -0,0 +1,161 @@
+"""
+Resampling of intraday bars to coarser intervals.
+
+Hourly merged.jsonl files ("Time Series (60min)") are aggregated on the fly to
+N-hour, daily or weekly bars, so hourly and daily agents can share one raw
+source. Each bucket is a contiguous run of columns of the PriceCube, so the
+aggregation is a handful of ``np.*.reduceat`` calls over the whole universe:
+open = first bar, high = max, low = min, close = last bar, volume = sum.
+
+Bars are labelled by the start of their bucket: "YYYY-MM-DD HH:00:00" for
+"Nh", "YYYY-MM-DD" for "1d" and the Monday "YYYY-MM-DD" for "1w". Results are
+cached per (market, interval, as-of timestamp); only source bars strictly
+before the as-of timestamp are used, so the current bucket is partial and
+never contains future bars.
+"""
+
+import os
+import re
+import sys
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.price_cube import FIELDS, PriceCube
+
+_HOURS = re.compile(r"^([1-9]\d?)h$")
+
+
+def _week_start(ts: str) -> str:
+    day = date(int(ts[0:4]), int(ts[5:7]), int(ts[8:10]))
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def bucket_labeler(interval: str) -> Callable[[str], str]:
+    """Return a function mapping a "YYYY-MM-DD[ HH:MM:SS]" timestamp to its bucket label.
+
+    Args:
+        interval: "Nh" with N dividing 24 (e.g. "2h", "4h"), "1d" or "1w"
+
+    Raises:
+        ValueError: For unsupported intervals
+    """
+    if interval == "1d":
+        return lambda ts: ts[:10]
+    if interval == "1w":
+        return _week_start
+    match = _HOURS.match(interval)
+    if match and 24 % int(match.group(1)) == 0:
+        hours = int(match.group(1))
+        return lambda ts: f"{ts[:10]} {int(ts[11:13]) // hours * hours:02d}:00:00" if " " in ts else ts
+    raise ValueError(f"Unsupported interval '{interval}'. Use 'Nh' (N dividing 24), '1d' or '1w'")
+
+
+def bucket_starts(timestamps: Sequence[str], interval: str) -> Tuple[List[str], np.ndarray]:
+    """Group ascending timestamps into buckets.
+
+    Returns:
+        (labels, starts): bucket labels and the index of each bucket's first timestamp
+    """
+    labeler = bucket_labeler(interval)
+    labels = np.array([labeler(ts) for ts in timestamps], dtype=object)
+    if labels.size == 0:
+        return [], np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+    return labels[starts].tolist(), starts
+
+
+def _first_last(values: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """First and last non-NaN value per (row, bucket); NaN for empty buckets."""
+    n_rows, n_cols = values.shape
+    valid = ~np.isnan(values)
+    cols = np.arange(n_cols)
+    first = np.minimum.reduceat(np.where(valid, cols, n_cols), starts, axis=1)
+    last = np.maximum.reduceat(np.where(valid, cols, -1), starts, axis=1)
+    rows = np.arange(n_rows)[:, None]
+    first_values = np.where(first < n_cols, values[rows, np.minimum(first, n_cols - 1)], np.nan)
+    last_values = np.where(last >= 0, values[rows, np.maximum(last, 0)], np.nan)
+    return first_values, last_values
+
+
+def resample_cube(cube: PriceCube, interval: str, before: Optional[str] = None) -> PriceCube:
+    """Aggregate a cube to a coarser interval.
+
+    Args:
+        cube: Source PriceCube (normally 60-minute bars)
+        interval: Target interval, see bucket_labeler()
+        before: Only source bars strictly before this timestamp are used; all bars if None
+
+    Returns:
+        PriceCube with one column per bucket
+    """
+    end = len(cube.timestamps) if before is None else bisect_left(cube.timestamps, before)
+    labels, starts = bucket_starts(cube.timestamps[:end], interval)
+    n_symbols = len(cube.symbols)
+    if not labels:
+        return PriceCube(cube.symbols, [], {field: np.empty((n_symbols, 0)) for field in FIELDS})
+
+    source = {field: np.asarray(cube.field(field)[:, :end], dtype=np.float64) for field in FIELDS}
+    arrays = {}
+    arrays["open"], _ = _first_last(source["open"], starts)
+    _, arrays["close"] = _first_last(source["close"], starts)
+    arrays["high"] = np.fmax.reduceat(source["high"], starts, axis=1)
+    arrays["low"] = np.fmin.reduceat(source["low"], starts, axis=1)
+    volume = source["volume"]
+    has_volume = np.add.reduceat((~np.isnan(volume)).astype(np.int64), starts, axis=1) > 0
+    arrays["volume"] = np.where(has_volume, np.add.reduceat(np.nan_to_num(volume), starts, axis=1), np.nan)
+    return PriceCube(cube.symbols, labels, arrays)
+
+
+_CACHE_SIZE = 32
+_resampled: "OrderedDict[Tuple, Tuple[PriceCube, PriceCube]]" = OrderedDict()
+_resampled_lock = threading.Lock()
+
+
+def get_resampled_cube(
+    market: str, interval: str, before: Optional[str] = None, merged_path: Optional[str] = None
+) -> PriceCube:
+    """Resampled PriceCube of a market, cached per (market, interval, before).
+
+    A cache entry is dropped when merged.jsonl is reloaded.
+
+    Args:
+        market: Market type ("us" or "cn")
+        interval: Target interval, see bucket_labeler()
+        before: Only source bars strictly before this timestamp are used (normally TODAY_DATE)
+        merged_path: Optional custom merged.jsonl path
+
+    Returns:
+        PriceCube with one column per bucket
+    """
+    from tools.price_tools import get_price_cube
+
+    bucket_labeler(interval)
+    cube = get_price_cube(market, merged_path=merged_path)
+    if cube is None:
+        raise FileNotFoundError(f"No price data found for market '{market}'")
+
+    # as-of 时间戳只决定用到多少源列，按列数缓存，相邻且之间没有 bar 的时间戳可共享结果
+    end = len(cube.timestamps) if before is None else bisect_left(cube.timestamps, before)
+    key = (market, merged_path, interval, end)
+    cached = _resampled.get(key)
+    if cached is not None and cached[0] is cube:
+        with _resampled_lock:
+            _resampled.move_to_end(key)
+        return cached[1]
+
+    resampled = resample_cube(cube, interval, before)
+    with _resampled_lock:
+        _resampled[key] = (cube, resampled)
+        _resampled.move_to_end(key)
+        while len(_resampled) > _CACHE_SIZE:
+            _resampled.popitem(last=False)
+    return resampled
@@ -1,12 +1,12 @@
 import json
 import os
 import sys
-from datetime import datetime, timedelta
+from bisect import bisect_right
+from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
-import pandas as pd
 
 # Add project root directory to Python path to allow running this file from subdirectories
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -14,10 +14,7 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from tools.general_tools import get_config_value
-from tools.price_tools import (all_nasdaq_100_symbols, get_latest_position,
-                               get_open_prices, get_today_init_position,
-                               get_yesterday_date,
-                               get_yesterday_open_and_close_price)
+from tools.price_tools import all_nasdaq_100_symbols
 
 
 def get_currency_symbol(market: str = "us") -> str:
@@ -62,38 +59,16 @@ def get_available_date_range(signature: str) -> Tuple[str, str]:
     Returns:
         Tuple of (earliest date, latest date) in YYYY-MM-DD format
     """
-    from tools.general_tools import get_config_value
-
-    base_dir = Path(__file__).resolve().parents[1]
-
-    # Get log_path from config, default to "agent_data" for backward compatibility
-    log_path = get_config_value("LOG_PATH", "./data/agent_data")
-    if log_path.startswith("./data/"):
-        log_path = log_path[7:]  # Remove "./data/" prefix
-
-    position_file = base_dir / "data" / log_path / signature / "position" / "position.jsonl"
+    from tools.position_ledger import get_position_ledger
 
-    if not position_file.exists():
+    ledger = get_position_ledger(signature)
+    if not ledger.refresh():
         return "", ""
 
-    dates = []
-
-    with position_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-                date = doc.get("date")
-                if date:
-                    dates.append(date)
-            except Exception:
-                continue
-
+    dates = ledger.dates()
     if not dates:
         return "", ""
 
-    dates.sort()
     return dates[0], dates[-1]
 
 
@@ -112,21 +87,20 @@ def get_daily_portfolio_values(
     Returns:
         Dictionary of daily portfolio values in format {date: portfolio_value}
     """
-    from tools.general_tools import get_config_value
-    from tools.price_tools import (all_nasdaq_100_symbols, all_sse_50_symbols,
-                                   get_merged_file_path)
-
-    base_dir = Path(__file__).resolve().parents[1]
-
-    # Get log_path from config, default to "agent_data" for backward compatibility
-    log_path = get_config_value("LOG_PATH", "./data/agent_data")
-    if log_path.startswith("./data/"):
-        log_path = log_path[7:]  # Remove "./data/" prefix
+    from tools.position_ledger import get_position_ledger
+    from tools.price_parquet import read_price_frame, use_parquet_backend
+    from tools.price_sqlite import get_sqlite_db
+    from tools.price_cube import PriceCube
+    from tools.price_tools import (ASOF_MAX_STALENESS, all_nasdaq_100_symbols,
+                                   all_sse_50_symbols, get_merged_file_path,
+                                   get_price_cube, get_trading_calendar)
+    from tools.trading_calendar import DAILY, INTRADAY
 
-    position_file = base_dir / "data" / log_path / signature / "position" / "position.jsonl"
+    ledger = get_position_ledger(signature)
     merged_file = get_merged_file_path(market)
+    db = get_sqlite_db(merged_file)
 
-    if not position_file.exists() or not merged_file.exists():
+    if not ledger.refresh() or (db is None and not merged_file.exists()):
         return {}
 
     # Get available date range if not specified
@@ -140,77 +114,52 @@ def get_daily_portfolio_values(
         if end_date is None:
             end_date = latest_date
 
-    # Read position data
-    position_data = []
-    with position_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-                position_data.append(doc)
-            except Exception:
-                continue
-
-    # Read price data
-    price_data = {}
-    with merged_file.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            try:
-                doc = json.loads(line)
-                meta = doc.get("Meta Data", {})
-                symbol = meta.get("2. Symbol")
-                if symbol:
-                    # 查找所有以 "Time Series" 开头的键
-                    series = None
-                    for key, value in doc.items():
-                        if key.startswith("Time Series"):
-                            series = value
-                            break
-                    price_data[symbol] = series if series else {}
-            except Exception:
-                continue
-
     # Select stock symbols based on market
     stock_symbols = all_sse_50_symbols if market == "cn" else all_nasdaq_100_symbols
 
+    # PRICE_BACKEND=parquet: read only the close column of the needed symbols in [start, end_date],
+    # pivoted into a small cube. start lies ASOF_MAX_STALENESS bars before the as-of bar of start_date,
+    # so the as-of lookup can still reach the bars before start_date it may fall back to.
+    cube = None
+    if db is None and use_parquet_backend():
+        timestamps = sorted(
+            list(get_trading_calendar(market, DAILY)) + list(get_trading_calendar(market, INTRADAY))
+        )
+        # start_date 的 as-of bar 是 <= start_date 的最后一根，再向前 ASOF_MAX_STALENESS 根
+        asof_col = bisect_right(timestamps, start_date) - 1
+        start = timestamps[max(0, asof_col - ASOF_MAX_STALENESS)] if timestamps else start_date
+        frame = read_price_frame(
+            market, start=start, end=end_date, symbols=stock_symbols, fields=["close"], merged_file=merged_file
+        )
+        if frame is not None:
+            closes = frame.pivot(index="symbol", columns="ts", values="close")
+            cube = PriceCube(closes.index, closes.columns, {"close": closes.to_numpy(dtype=np.float64)})
+
+    # Price cube (memory-mapped when built by tools/price_cube.py) for the default JSONL backend
+    if db is None and cube is None:
+        cube = get_price_cube(market)
+        if cube is None:
+            return {}
+
     # Calculate daily portfolio values
     daily_values = {}
 
-    # Group position data by date
-    positions_by_date = {}
-    for record in position_data:
-        date = record.get("date")
-        if date:
-            if date not in positions_by_date:
-                positions_by_date[date] = []
-            positions_by_date[date].append(record)
-
-    # For each date, sort records by id and take latest position
-    for date, records in positions_by_date.items():
-        if start_date and date < start_date:
-            continue
-        if end_date and date > end_date:
-            continue
-
-        # Sort by id and take latest position
-        latest_record = max(records, key=lambda x: x.get("id", 0))
+    # Latest record (highest id) of each date in [start_date, end_date], maintained by the PositionLedger
+    for date, latest_record in ledger.latest_by_date(start_date, end_date).items():
         positions = latest_record.get("positions", {})
 
-        # Get daily prices
-        daily_prices = {}
-        for symbol in stock_symbols:
-            if symbol in price_data:
-                symbol_prices = price_data[symbol]
-                if date in symbol_prices:
-                    price_info = symbol_prices[date]
-                    buy_price = price_info.get("1. buy price")
-                    sell_price = price_info.get("4. sell price")
-                    # Use closing (sell) price to calculate value
-                    if sell_price is not None:
-                        daily_prices[f"{symbol}_price"] = float(sell_price)
+        # Get daily prices: use closing (sell) price to calculate value,
+        # falling back to the latest close within ASOF_MAX_STALENESS bars for symbols without a bar on date
+        if db is not None:
+            daily_prices = {
+                f"{symbol}_price": bar["close"]
+                for symbol, bar in db.get_bars_asof(stock_symbols, date, ASOF_MAX_STALENESS).items()
+            }
+        else:
+            closes = cube.asof("close", date, stock_symbols, ASOF_MAX_STALENESS)
+            daily_prices = {
+                f"{symbol}_price": float(close) for symbol, close in zip(stock_symbols, closes) if not np.isnan(close)
+            }
 
         # Calculate portfolio value
         cash = positions.get("CASH", 0.0)
@@ -0,0 +1,182 @@
+"""
+Cross-sectional screener over the symbol x timestamp PriceCube.
+
+Each metric is one vectorized expression over a small window of columns ending
+at the screening date, so ranking the whole universe costs a few array slices
+regardless of the number of symbols. Only the open price of the screening bar
+is used (the "gap" metric); everything else comes from earlier bars.
+"""
+
+import os
+import sys
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.indicators import ffill
+
+
+def _window(cube, field: str, end: int, lookback: int) -> np.ndarray:
+    """Forward-filled ``field`` columns [end - lookback, end) as a (n_symbols, <= lookback) array."""
+    start = max(0, end - lookback)
+    return ffill(cube.field(field)[:, start:end])
+
+
+def _return(cube, col: int, end: int, lookback: int) -> np.ndarray:
+    close = _window(cube, "close", end, lookback + 1)
+    if close.shape[1] < lookback + 1:
+        return np.full(close.shape[0], np.nan)
+    return close[:, -1] / close[:, 0] - 1
+
+
+def _gap(cube, col: int, end: int, lookback: int) -> np.ndarray:
+    prev_close = _window(cube, "close", end, lookback)[:, -1] if end > 0 else np.full(len(cube.symbols), np.nan)
+    if col < 0:
+        return np.full(len(cube.symbols), np.nan)
+    return np.asarray(cube.field("open")[:, col]) / prev_close - 1
+
+
+def _volume_spike(cube, col: int, end: int, lookback: int) -> np.ndarray:
+    volume = np.asarray(cube.field("volume")[:, max(0, end - lookback - 1):end])
+    if volume.shape[1] < 2:
+        return np.full(volume.shape[0], np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return volume[:, -1] / np.nanmean(volume[:, :-1], axis=1)
+
+
+def _dist_from_high(cube, col: int, end: int, lookback: int) -> np.ndarray:
+    close = _window(cube, "close", end, lookback)
+    high = np.asarray(cube.field("high")[:, max(0, end - lookback):end])
+    with np.errstate(invalid="ignore"):
+        return close[:, -1] / np.nanmax(np.fmax(high, close), axis=1) - 1
+
+
+def _dist_from_low(cube, col: int, end: int, lookback: int) -> np.ndarray:
+    close = _window(cube, "close", end, lookback)
+    low = np.asarray(cube.field("low")[:, max(0, end - lookback):end])
+    with np.errstate(invalid="ignore"):
+        return close[:, -1] / np.nanmin(np.fmin(low, close), axis=1) - 1
+
+
+# metric name -> fn(cube, col, end, lookback) returning one value per symbol
+METRICS: Dict[str, Callable[..., np.ndarray]] = {
+    "return": _return,
+    "gap": _gap,
+    "volume_spike": _volume_spike,
+    "dist_from_high": _dist_from_high,
+    "dist_from_low": _dist_from_low,
+}
+
+
+def screen_cube(
+    cube,
+    date: str,
+    metric: str,
+    top_n: int = 10,
+    lookback: int = 5,
+    ascending: bool = False,
+    universe: Optional[Sequence[str]] = None,
+    filters: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """Rank symbols of a PriceCube by a metric as of date.
+
+    Args:
+        cube: PriceCube from tools.price_tools.get_price_cube
+        date: Screening timestamp; bars strictly before it are history, its own open is used by "gap"
+        metric: One of METRICS
+        top_n: Number of rows to return
+        lookback: Window length in bars
+        ascending: Rank smallest values first
+        universe: Restrict the ranking to these symbols
+        filters: Optional {"min_price", "max_price", "min_volume"} on the last completed bar
+
+    Returns:
+        {"as_of_bar", "columns", "rows", "universe_size"}
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Valid metrics: {sorted(METRICS)}")
+    unknown = set(filters or {}) - {"min_price", "max_price", "min_volume"}
+    if unknown:
+        raise ValueError(f"Unknown filters {sorted(unknown)}. Valid filters: ['max_price', 'min_price', 'min_volume']")
+    lookback = max(1, int(lookback))
+
+    end = bisect_left(cube.timestamps, date)
+    col = cube.timestamp_index.get(date, -1)
+    values = METRICS[metric](cube, col, end, lookback)
+
+    last_close = _window(cube, "close", end, lookback)[:, -1] if end > 0 else np.full(len(cube.symbols), np.nan)
+    last_volume = np.asarray(cube.field("volume")[:, end - 1]) if end > 0 else np.full(len(cube.symbols), np.nan)
+    mask = ~np.isnan(values)
+    if universe is not None:
+        rows = cube.rows(universe)
+        in_universe = np.zeros(len(cube.symbols), dtype=bool)
+        in_universe[rows[rows >= 0]] = True
+        mask &= in_universe
+    filters = filters or {}
+    with np.errstate(invalid="ignore"):
+        if "min_price" in filters:
+            mask &= last_close >= float(filters["min_price"])
+        if "max_price" in filters:
+            mask &= last_close <= float(filters["max_price"])
+        if "min_volume" in filters:
+            mask &= last_volume >= float(filters["min_volume"])
+
+    candidates = np.flatnonzero(mask)
+    keys = values[candidates] if ascending else -values[candidates]
+    top_n = max(0, int(top_n))
+    if top_n < len(candidates):
+        part = np.argpartition(keys, top_n)[:top_n]
+        candidates, keys = candidates[part], keys[part]
+    order = candidates[np.argsort(keys, kind="stable")]
+
+    rows = [
+        [cube.symbols[i], round(float(values[i]), 6), None if np.isnan(last_close[i]) else float(last_close[i])]
+        for i in order
+    ]
+    return {
+        "as_of_bar": cube.timestamps[end - 1] if end > 0 else None,
+        "columns": ["symbol", metric, "last_close"],
+        "rows": rows,
+        "universe_size": int(mask.sum()),
+    }
+
+
+def screen_universe(
+    market: str,
+    date: str,
+    metric: str,
+    top_n: int = 10,
+    lookback: int = 5,
+    ascending: bool = False,
+    filters: Optional[Dict[str, float]] = None,
+    symbols: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Rank the market's trading universe (NASDAQ 100 or SSE 50 by default) by a metric.
+
+    Args:
+        market: Market type ("us" or "cn")
+        date: Screening timestamp, see screen_cube
+        metric: One of METRICS
+        top_n: Number of rows to return
+        lookback: Window length in bars
+        ascending: Rank smallest values first
+        filters: See screen_cube
+        symbols: Universe override; defaults to all_nasdaq_100_symbols / all_sse_50_symbols
+
+    Returns:
+        See screen_cube
+    """
+    from tools.price_tools import (all_nasdaq_100_symbols, all_sse_50_symbols,
+                                   get_price_cube)
+
+    cube = get_price_cube(market)
+    if cube is None:
+        raise FileNotFoundError(f"No price data found for market '{market}'")
+    if symbols is None:
+        symbols = all_sse_50_symbols if market == "cn" else all_nasdaq_100_symbols
+    return screen_cube(cube, date, metric, top_n, lookback, ascending, symbols, filters)
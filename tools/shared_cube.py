@@ -0,0 +1,222 @@
+"""
+Price cubes shared between processes through ``multiprocessing.shared_memory``.
+
+main_parrallel.py loads each market's PriceCube once in the parent, copies it
+into two shared memory blocks (the float64 field arrays and a JSON block with
+the symbol/timestamp axes and names) and passes the block names to the model
+subprocesses in the PRICE_SHARED_CUBES environment variable. A child's
+PriceStore then attaches zero-copy read-only NumPy views instead of parsing
+merged.jsonl itself, so resident memory stays flat as the number of models
+grows.
+"""
+
+import json
+import os
+import sys
+import threading
+from collections.abc import Mapping
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.price_cube import FIELDS, PriceCube
+
+SHARED_CUBES_ENV = "PRICE_SHARED_CUBES"
+
+
+def publish_price_cube(
+    cube: PriceCube,
+    names: Dict[str, str],
+    series_keys: Dict[str, str],
+    source_state: Tuple[int, int],
+) -> Tuple[Dict[str, Any], List[shared_memory.SharedMemory]]:
+    """Copy a cube into new shared memory blocks.
+
+    The caller owns the returned blocks and must ``close()`` and ``unlink()``
+    them once every attached process has exited.
+
+    Args:
+        cube: PriceCube to share
+        names: {symbol: name}
+        series_keys: {symbol: series key}
+        source_state: (mtime_ns, size) of the merged.jsonl the cube was built from
+
+    Returns:
+        (spec, blocks): spec is the JSON-serializable description passed to children
+    """
+    n_symbols, n_timestamps = cube.shape
+    data_size = max(len(FIELDS) * n_symbols * n_timestamps * 8, 1)
+    axes = json.dumps(
+        {"symbols": cube.symbols, "timestamps": cube.timestamps, "names": names, "series_keys": series_keys},
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    data_block = shared_memory.SharedMemory(create=True, size=data_size)
+    axes_block = shared_memory.SharedMemory(create=True, size=len(axes))
+    data = np.ndarray((len(FIELDS), n_symbols, n_timestamps), dtype=np.float64, buffer=data_block.buf)
+    for i, field in enumerate(FIELDS):
+        data[i] = cube.arrays[field]
+    del data
+    axes_block.buf[:len(axes)] = axes
+
+    spec = {
+        "data": data_block.name,
+        "axes": axes_block.name,
+        "axes_size": len(axes),
+        "fields": list(FIELDS),
+        "shape": [n_symbols, n_timestamps],
+        "source_mtime_ns": source_state[0],
+        "source_size": source_state[1],
+    }
+    return spec, [data_block, axes_block]
+
+
+def publish_price_cubes(merged_files: Sequence[Path]) -> Tuple[str, List[shared_memory.SharedMemory]]:
+    """Load and share the cube of every existing merged.jsonl in merged_files.
+
+    Returns:
+        (env_value, blocks): env_value goes into PRICE_SHARED_CUBES of the children;
+        blocks must be released with release_blocks() after the children exit
+    """
+    from tools.price_store import get_price_store
+    from tools.price_tools import get_price_cube
+
+    specs: Dict[str, Dict[str, Any]] = {}
+    blocks: List[shared_memory.SharedMemory] = []
+    for merged_file in merged_files:
+        merged_file = Path(merged_file).resolve()
+        store = get_price_store(merged_file)
+        if not store.refresh():
+            print(f"⚠️  Warning: {merged_file} not found, children will load prices themselves")
+            continue
+        st = os.stat(merged_file)
+        cube = get_price_cube(merged_path=str(merged_file))
+        spec, new_blocks = publish_price_cube(cube, store.names, store.series_keys, (st.st_mtime_ns, st.st_size))
+        specs[str(merged_file)] = spec
+        blocks.extend(new_blocks)
+    return json.dumps(specs), blocks
+
+
+def release_blocks(blocks: Sequence[shared_memory.SharedMemory]) -> None:
+    """Close and unlink blocks created by publish_price_cubes()."""
+    for block in blocks:
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    block = shared_memory.SharedMemory(name=name)
+    # Python < 3.13 在 attach 时也会登记到 resource_tracker，子进程退出时会误删父进程的共享内存
+    try:
+        resource_tracker.unregister(block._name, "shared_memory")
+    except Exception:
+        pass
+    return block
+
+
+class SharedPriceCube(PriceCube):
+    """PriceCube whose field arrays are read-only views into shared memory.
+
+    Attributes:
+        names: {symbol: name} published by the parent
+        series_keys: {symbol: series key} published by the parent
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        self._blocks = [_attach_block(spec["data"]), _attach_block(spec["axes"])]
+        axes = json.loads(bytes(self._blocks[1].buf[:spec["axes_size"]]).decode("utf-8"))
+        n_symbols, n_timestamps = spec["shape"]
+        data = np.ndarray((len(spec["fields"]), n_symbols, n_timestamps), dtype=np.float64, buffer=self._blocks[0].buf)
+        data.flags.writeable = False
+        self.data = data
+        self.names: Dict[str, str] = axes["names"]
+        self.series_keys: Dict[str, str] = axes["series_keys"]
+        self.source_state: Tuple[int, int] = (spec["source_mtime_ns"], spec["source_size"])
+        super().__init__(axes["symbols"], axes["timestamps"], {field: data[i] for i, field in enumerate(spec["fields"])})
+
+
+class CubeBars(Mapping):
+    """Read-only ``{symbol: {timestamp: bar}}`` mapping over a SharedPriceCube.
+
+    A timestamp holds a bar for a symbol when any of its fields is not NaN.
+    Nothing is cached here, so per-process memory only grows with what callers keep.
+    """
+
+    def __init__(self, cube: SharedPriceCube):
+        self._cube = cube
+        self._stacked = cube.data
+
+    def __getitem__(self, symbol: str) -> Dict[str, Dict[str, float]]:
+        row = self._cube.symbol_index[symbol]
+        values = self._stacked[:, row, :]
+        cols = np.flatnonzero(~np.isnan(values).all(axis=0))
+        timestamps = self._cube.timestamps
+        series = {}
+        for col, column in zip(cols.tolist(), values[:, cols].T.tolist()):
+            series[timestamps[col]] = {field: value for field, value in zip(FIELDS, column) if value == value}
+        return series
+
+    def get_bar(self, symbol: str, ts: str) -> Optional[Dict[str, float]]:
+        """Return the bar for symbol at ts, or None if absent."""
+        row = self._cube.symbol_index.get(symbol)
+        col = self._cube.timestamp_index.get(ts)
+        if row is None or col is None:
+            return None
+        bar = {field: value for field, value in zip(FIELDS, self._stacked[:, row, col].tolist()) if value == value}
+        return bar or None
+
+    def __contains__(self, symbol: object) -> bool:
+        return symbol in self._cube.symbol_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._cube.symbols)
+
+    def __len__(self) -> int:
+        return len(self._cube.symbols)
+
+
+_attached: Dict[str, Optional[SharedPriceCube]] = {}
+_attached_lock = threading.Lock()
+
+
+def attach_shared_cube(merged_file: Path, source_state: Tuple[int, int]) -> Optional[SharedPriceCube]:
+    """Attach the cube the parent process shared for merged_file.
+
+    Args:
+        merged_file: Path to merged.jsonl
+        source_state: Current (mtime_ns, size) of merged_file
+
+    Returns:
+        SharedPriceCube, or None if nothing was shared for this file or the file
+        changed since the parent built the cube
+    """
+    raw = os.getenv(SHARED_CUBES_ENV)
+    if not raw:
+        return None
+    key = str(Path(merged_file).resolve())
+    with _attached_lock:
+        if key not in _attached:
+            try:
+                spec = json.loads(raw).get(key)
+            except ValueError:
+                spec = None
+            cube = None
+            if spec is not None:
+                try:
+                    cube = SharedPriceCube(spec)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️  Warning: failed to attach shared price cube for {key}: {e}")
+            _attached[key] = cube
+        cube = _attached[key]
+    if cube is None or cube.source_state != tuple(source_state):
+        return None
+    return cube
@@ -0,0 +1,155 @@
+"""
+Symbol metadata registry shared by the prompt builders and the MCP tools.
+
+Market, exchange and lot size follow from the symbol's exchange suffix and need
+no data; names and index membership are collected once per market from the
+shared PriceStore and the index constituent lists, and rebuilt only when that
+market's merged.jsonl is reloaded.
+"""
+
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from tools.price_store import get_price_store
+
+# 交易所后缀 -> 交易所
+EXCHANGE_SUFFIXES = {
+    ".SH": "SSE",
+    ".SZ": "SZSE",
+}
+
+# 每手股数：A股一手 = 100股
+LOT_SIZES = {
+    "cn": 100,
+    "us": 1,
+}
+
+MARKETS = ("us", "cn")
+
+# 指数 -> 成分股所在市场
+INDEX_MARKETS = {
+    "NASDAQ100": "us",
+    "SSE50": "cn",
+}
+
+
+def market_for_symbol(symbol: str) -> str:
+    """Return "cn" for symbols with an A-share exchange suffix (.SH/.SZ), otherwise "us"."""
+    return "cn" if symbol.endswith(tuple(EXCHANGE_SUFFIXES)) else "us"
+
+
+def exchange_for_symbol(symbol: str) -> str:
+    """Return the exchange of a symbol: SSE/SZSE by suffix, NASDAQ for US symbols."""
+    for suffix, exchange in EXCHANGE_SUFFIXES.items():
+        if symbol.endswith(suffix):
+            return exchange
+    return "NASDAQ"
+
+
+def lot_size_for_symbol(symbol: str) -> int:
+    """Return the minimum trading unit for a symbol."""
+    return LOT_SIZES[market_for_symbol(symbol)]
+
+
+class SymbolRegistry:
+    """Per-symbol metadata for both markets.
+
+    Each entry is a dict:
+        {"symbol", "name", "market", "exchange", "lot_size", "indices": [index names]}
+
+    Each market is built and refreshed on its own, so a lookup only checks the
+    merged.jsonl of the market it asks about.
+    """
+
+    def __init__(self):
+        self._symbols: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._names: Dict[str, Dict[str, str]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, markets: Tuple[str, ...] = MARKETS) -> None:
+        """Rebuild each of markets whose merged.jsonl was reloaded since its last build."""
+        from tools.price_tools import get_merged_file_path
+
+        for market in markets:
+            store = get_price_store(get_merged_file_path(market))
+            store.refresh()
+            if self._versions.get(market) == store.version:
+                continue
+            with self._lock:
+                if self._versions.get(market) != store.version:
+                    self._build(market, store)
+                    self._versions[market] = store.version
+
+    def _build(self, market: str, store) -> None:
+        from tools.price_tools import all_nasdaq_100_symbols, all_sse_50_symbols
+
+        index_members = {"NASDAQ100": all_nasdaq_100_symbols, "SSE50": all_sse_50_symbols}
+        symbols: Dict[str, Dict[str, Any]] = {}
+        for symbol in store.bars:
+            symbols[symbol] = self._entry(symbol, store.names.get(symbol, ""))
+        for index_name, members in index_members.items():
+            if INDEX_MARKETS[index_name] != market:
+                continue
+            for symbol in members:
+                entry = symbols.setdefault(symbol, self._entry(symbol, ""))
+                entry["indices"].append(index_name)
+        self._symbols[market] = symbols
+        self._names[market] = dict(store.names)
+
+    @staticmethod
+    def _entry(symbol: str, name: str) -> Dict[str, Any]:
+        return {
+            "symbol": symbol,
+            "name": name,
+            "market": market_for_symbol(symbol),
+            "exchange": exchange_for_symbol(symbol),
+            "lot_size": lot_size_for_symbol(symbol),
+            "indices": [],
+        }
+
+    def get(self, symbol: str) -> Dict[str, Any]:
+        """Return metadata for symbol; unknown symbols get suffix-derived fields and an empty name."""
+        market = market_for_symbol(symbol)
+        self.refresh((market,))
+        entry = self._symbols.get(market, {}).get(symbol)
+        return dict(entry) if entry is not None else self._entry(symbol, "")
+
+    def names(self, market: str = "us") -> Dict[str, str]:
+        """Return {symbol: name} for the symbols of market that carry a name. Do not mutate."""
+        if market in MARKETS:
+            self.refresh((market,))
+        return self._names.get(market, {})
+
+    def symbols(self, index: Optional[str] = None) -> List[str]:
+        """Return all known symbols, or the members of index ("NASDAQ100", "SSE50")."""
+        if index is not None and index not in INDEX_MARKETS:
+            return []
+        markets = MARKETS if index is None else (INDEX_MARKETS[index],)
+        self.refresh(markets)
+        result = []
+        for market in markets:
+            for symbol, entry in self._symbols.get(market, {}).items():
+                if index is None or index in entry["indices"]:
+                    result.append(symbol)
+        return result
+
+
+_registry: Optional[SymbolRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_symbol_registry() -> SymbolRegistry:
+    """Return the process-wide SymbolRegistry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SymbolRegistry()
+    return _registry
@@ -0,0 +1,80 @@
+"""
+Sorted trading calendar built from the timestamps in merged.jsonl.
+
+Timestamps are zero-padded "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS" strings, so
+lexicographic order is chronological order and lookups can bisect the strings
+directly without any strptime.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional
+
+DAILY = "daily"
+INTRADAY = "intraday"
+
+
+def timestamp_resolution(timestamp: str) -> str:
+    """Return DAILY for "YYYY-MM-DD" timestamps and INTRADAY for ones carrying a time."""
+    return INTRADAY if " " in timestamp else DAILY
+
+
+class TradingCalendar:
+    """Immutable sorted array of trading timestamps with O(log n) lookups."""
+
+    def __init__(self, timestamps: Iterable[str]):
+        self._timestamps: List[str] = sorted(set(timestamps))
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def __iter__(self):
+        return iter(self._timestamps)
+
+    def __bool__(self) -> bool:
+        return bool(self._timestamps)
+
+    @property
+    def timestamps(self) -> List[str]:
+        """All timestamps in ascending order. Do not mutate the returned list."""
+        return self._timestamps
+
+    def contains(self, timestamp: str) -> bool:
+        """Return True if timestamp is a trading timestamp."""
+        i = bisect_left(self._timestamps, timestamp)
+        return i < len(self._timestamps) and self._timestamps[i] == timestamp
+
+    def prev(self, timestamp: str) -> Optional[str]:
+        """Return the latest trading timestamp strictly before timestamp, or None."""
+        i = bisect_left(self._timestamps, timestamp)
+        return self._timestamps[i - 1] if i > 0 else None
+
+    def next(self, timestamp: str) -> Optional[str]:
+        """Return the earliest trading timestamp strictly after timestamp, or None."""
+        i = bisect_right(self._timestamps, timestamp)
+        return self._timestamps[i] if i < len(self._timestamps) else None
+
+    def range(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        include_start: bool = True,
+        include_end: bool = True,
+    ) -> List[str]:
+        """Return trading timestamps between start and end.
+
+        Args:
+            start: Lower bound, None for no lower bound
+            end: Upper bound, None for no upper bound
+            include_start: Whether a timestamp equal to start is included
+            include_end: Whether a timestamp equal to end is included
+
+        Returns:
+            Sorted list of matching timestamps
+        """
+        lo = 0
+        hi = len(self._timestamps)
+        if start is not None:
+            lo = bisect_left(self._timestamps, start) if include_start else bisect_right(self._timestamps, start)
+        if end is not None:
+            hi = bisect_right(self._timestamps, end) if include_end else bisect_left(self._timestamps, end)
+        return self._timestamps[lo:hi]